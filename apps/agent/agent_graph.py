@@ -1,12 +1,31 @@
 from typing import TypedDict, Annotated, Any
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 
-from .rag_query_tool import rag_query_tool
+from .rag_query_tool import rag_query_tool, tool_error
+
+
+# -------------------------
+# Tool execution config
+# -------------------------
+
+# Tool calls of one turn run at once, up to this many
+AGENT_TOOL_CONCURRENCY = int(os.getenv("AGENT_TOOL_CONCURRENCY", "4"))
+
+# A tool call still running this long after it started becomes a
+# refusal (time spent waiting for a free slot does not count)
+AGENT_TOOL_TIMEOUT_SEC = float(os.getenv("AGENT_TOOL_TIMEOUT_SEC", "30"))
 
 
 # -------------------------
@@ -56,51 +75,150 @@ def agent_node(state: AgentState):
     return {"messages": [response]}
 
 
-def tool_node(state: AgentState):
+def format_tool_result(result: dict[str, Any]) -> AIMessage:
     """
-    Execute rag_query_tool and return clean output.
+    Turn a rag_query_tool result into the agent's reply, refusals included.
     """
 
+    if result.get("refused", False):
+        content = (
+            f"{result.get('answer')}\n\n"
+            f"(Refusal reason: "
+            f"{result.get('refusal_reason', 'unknown')})"
+        )
+    else:
+        content = result.get(
+            "answer",
+            "No answer returned."
+        )
+
+    return AIMessage(content=content)
+
+
+def rag_tool_calls(state: AgentState) -> list[dict[str, Any]] | None:
+    """rag_query_tool calls of the last message (None: no tool calls at all)."""
+
     last_msg = state["messages"][-1]
     tool_calls = last_msg.tool_calls or []
 
     if not tool_calls:
-        return {
-            "messages": [
-                AIMessage(
-                    content="I cannot answer this query."
-                )
-            ]
-        }
+        return None
 
-    results = []
+    return [
+        call for call in tool_calls
+        if call["name"] == "rag_query_tool"
+    ]
 
-    for call in tool_calls:
-        if call["name"] == "rag_query_tool":
 
-            result: dict[str, Any] = rag_query_tool.invoke(
-                call["args"]
+def no_tool_call():
+    return {
+        "messages": [
+            AIMessage(
+                content="I cannot answer this query."
             )
+        ]
+    }
 
-            if result.get("refused", False):
-                content = (
-                    f"{result.get('answer')}\n\n"
-                    f"(Refusal reason: "
-                    f"{result.get('refusal_reason', 'unknown')})"
-                )
-            else:
-                content = result.get(
-                    "answer",
-                    "No answer returned."
-                )
 
-            results.append(
-                AIMessage(content=content)
-            )
+def tool_timeout() -> dict[str, Any]:
+    return tool_error(
+        f"timed out after {AGENT_TOOL_TIMEOUT_SEC:g}s",
+        reason="tool_timeout",
+    )
+
+
+def tool_node(state: AgentState):
+    """
+    Execute rag_query_tool and return clean output.
+
+    Several tool calls (a compound question split by the model) run
+    concurrently, at most AGENT_TOOL_CONCURRENCY at a time, on a pool
+    owned by this turn; replies keep the calls' order. Each call's
+    timeout starts when it starts running.
+    """
+
+    calls = rag_tool_calls(state)
+
+    if calls is None:
+        return no_tool_call()
+
+    started = [threading.Event() for _ in calls]
+    start_times = [0.0] * len(calls)
+
+    def run(i: int, args: dict[str, Any]) -> dict[str, Any]:
+        start_times[i] = time.monotonic()
+        started[i].set()
+        return rag_query_tool.invoke(args)
+
+    # A pool per turn, so concurrent graph runs never queue behind each
+    # other. Workers inherit the caller's context, so tool runs stay in
+    # its trace (the pooled HTTP client is thread-safe).
+    pool = ContextThreadPoolExecutor(
+        max_workers=max(1, min(len(calls), AGENT_TOOL_CONCURRENCY)),
+        thread_name_prefix="rag-tool",
+    )
+
+    results = []
+
+    try:
+        futures = [
+            pool.submit(run, i, call["args"])
+            for i, call in enumerate(calls)
+        ]
+
+        for i, future in enumerate(futures):
+            started[i].wait()
+            remaining = start_times[i] + AGENT_TOOL_TIMEOUT_SEC - time.monotonic()
+
+            try:
+                result = future.result(timeout=max(0.0, remaining))
+            except FutureTimeoutError:
+                result = tool_timeout()
+            except Exception as e:
+                result = tool_error(str(e))
+
+            results.append(format_tool_result(result))
+
+    finally:
+        # Timed-out calls are not cancellable once running; don't wait
+        # for them, the HTTP timeout ends them.
+        pool.shutdown(wait=False)
 
     return {"messages": results}
 
 
+async def atool_node(state: AgentState):
+    """
+    Async tool_node (agent.ainvoke): the calls run as tasks on the
+    pooled async client instead of pool threads. Same rules: at most
+    AGENT_TOOL_CONCURRENCY at a time per turn, and each call's timeout
+    starts once it holds a slot.
+    """
+
+    calls = rag_tool_calls(state)
+
+    if calls is None:
+        return no_tool_call()
+
+    semaphore = asyncio.Semaphore(AGENT_TOOL_CONCURRENCY)
+
+    async def run(call: dict[str, Any]) -> dict[str, Any]:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(
+                    rag_query_tool.ainvoke(call["args"]),
+                    timeout=AGENT_TOOL_TIMEOUT_SEC,
+                )
+            except asyncio.TimeoutError:
+                return tool_timeout()
+            except Exception as e:
+                return tool_error(str(e))
+
+    results = await asyncio.gather(*(run(call) for call in calls))
+
+    return {"messages": [format_tool_result(result) for result in results]}
+
+
 # -------------------------
 # Graph
 # -------------------------
@@ -108,7 +226,7 @@ def tool_node(state: AgentState):
 graph = StateGraph(AgentState)
 
 graph.add_node("agent", agent_node)
-graph.add_node("tool", tool_node)
+graph.add_node("tool", RunnableLambda(tool_node, afunc=atool_node, name="tool"))
 
 graph.set_entry_point("agent")
 
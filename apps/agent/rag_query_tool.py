@@ -2,12 +2,20 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from typing import Any, Dict
+import asyncio
+import atexit
+import importlib.util
+import logging
 import os
+import threading
+import weakref
 import httpx
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 from langsmith import traceable
 
 
+logger = logging.getLogger(__name__)
+
 
 # Configurable endpoint
 RAG_API_URL = os.getenv(
@@ -15,18 +23,126 @@ RAG_API_URL = os.getenv(
     "http://127.0.0.1:8000/query"
 )
 
+# Timeouts: connect covers TCP (and TLS) setup, read the RAG pipeline itself
+RAG_API_TIMEOUT_SEC = float(os.getenv("RAG_API_TIMEOUT_SEC", "20"))
+RAG_API_CONNECT_TIMEOUT_SEC = float(os.getenv("RAG_API_CONNECT_TIMEOUT_SEC", "5"))
+
+# Connection pool shared by every tool call in the process
+RAG_API_MAX_CONNECTIONS = int(os.getenv("RAG_API_MAX_CONNECTIONS", "20"))
+RAG_API_MAX_KEEPALIVE = int(os.getenv("RAG_API_MAX_KEEPALIVE", "20"))
+RAG_API_KEEPALIVE_EXPIRY_SEC = float(os.getenv("RAG_API_KEEPALIVE_EXPIRY_SEC", "30"))
+
+# HTTP/2 is negotiated over TLS only (e.g. the API behind a TLS proxy);
+# it needs the h2 package (pip install "httpx[http2]")
+RAG_API_HTTP2 = os.getenv("RAG_API_HTTP2", "false").lower() == "true"
+
+
+# -------------------------
+# Shared clients
+# -------------------------
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+# An AsyncClient's connections belong to the event loop that opened
+# them, so there is one async client per loop. Close it with
+# aclose_clients() before that loop ends.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    http2 = RAG_API_HTTP2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("RAG_API_HTTP2=true but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+
+    return {
+        "timeout": httpx.Timeout(RAG_API_TIMEOUT_SEC, connect=RAG_API_CONNECT_TIMEOUT_SEC),
+        "limits": httpx.Limits(
+            max_connections=RAG_API_MAX_CONNECTIONS,
+            max_keepalive_connections=RAG_API_MAX_KEEPALIVE,
+            keepalive_expiry=RAG_API_KEEPALIVE_EXPIRY_SEC,
+        ),
+        "http2": http2,
+    }
+
+
+def get_client() -> httpx.Client:
+    """The process-wide keep-alive client (httpx.Client is thread-safe)."""
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(**_client_kwargs())
+
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The keep-alive async client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(**_client_kwargs())
+
+    return client
+
+
+def close_clients() -> None:
+    """Close the sync client (each loop closes its own with aclose_clients)."""
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+async def aclose_clients() -> None:
+    """Close the running loop's async client, e.g. at the end of asyncio.run()."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
 
+    if client is not None:
+        await client.aclose()
+
+
+atexit.register(close_clients)
+
+
+# -------------------------
+# Calls
+# -------------------------
 @traceable(name="rag_api_http_call")
 def _call_rag_api(payload: Dict[str, Any]) -> Dict[str, Any]:
     """Low-level HTTP call to RAG API (traced)."""
-    with httpx.Client(timeout=20.0) as client:
-        resp = client.post(RAG_API_URL, json=payload)
-        resp.raise_for_status()
-        return resp.json()
+    resp = get_client().post(RAG_API_URL, json=payload)
+    resp.raise_for_status()
+    return resp.json()
+
+
+@traceable(name="rag_api_http_call")
+async def _acall_rag_api(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Async low-level HTTP call to RAG API (traced)."""
+    resp = await get_async_client().post(RAG_API_URL, json=payload)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def tool_error(error: str, reason: str = "tool_error") -> Dict[str, Any]:
+    """The refusal returned when the RAG API could not answer."""
+    return {
+        "answer": "RAG service unavailable.",
+        "refused": True,
+        "sources": [],
+        "refusal_reason": reason,
+        "error": error,
+    }
 
 
-@tool
-def rag_query_tool(query: str) -> Dict[str, Any]:
+def _rag_query(query: str) -> Dict[str, Any]:
     """
     Query the RAG API for grounded answers from AI engineering documentation.
     """
@@ -37,10 +153,26 @@ def rag_query_tool(query: str) -> Dict[str, Any]:
         return _call_rag_api(payload)
 
     except Exception as e:
-        return {
-            "answer": "RAG service unavailable.",
-            "refused": True,
-            "sources": [],
-            "refusal_reason": "tool_error",
-            "error": str(e),
-        }
+        return tool_error(str(e))
+
+
+async def _arag_query(query: str) -> Dict[str, Any]:
+    """
+    Query the RAG API for grounded answers from AI engineering documentation.
+    """
+
+    payload = {"query": query.strip()}
+
+    try:
+        return await _acall_rag_api(payload)
+
+    except Exception as e:
+        return tool_error(str(e))
+
+
+# invoke() uses the pooled sync client, ainvoke() the async one.
+rag_query_tool = StructuredTool.from_function(
+    func=_rag_query,
+    coroutine=_arag_query,
+    name="rag_query_tool",
+)
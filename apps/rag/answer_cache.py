@@ -0,0 +1,127 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional
+
+from langchain_core.documents import Document
+
+from .embedding_cache import normalize_query
+
+
+# -------------------------
+# Key helpers
+# -------------------------
+def chunk_fingerprint(doc: Document) -> str:
+    """Stable identity of a retrieved chunk: its store id, else a content hash."""
+    if doc.id:
+        return doc.id
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def answer_key(model: str, query: str, docs: List[Document]) -> str:
+    """
+    Key on everything that determines a temperature-0 answer: the model,
+    the normalized query and the ordered set of chunks placed in the prompt.
+    """
+    parts = [model, normalize_query(query)] + [chunk_fingerprint(d) for d in docs]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def vectorstore_version(persist_dir: Path, marker: str = "chroma.sqlite3") -> Hashable:
+    """
+    Cheap fingerprint of a persisted vector store.
+
+    Rebuilding or upserting into the store rewrites the marker file
+    (chroma.sqlite3 for Chroma), which changes its mtime / size.
+    """
+    db_file = persist_dir / marker
+
+    try:
+        stat = db_file.stat()
+    except FileNotFoundError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# -------------------------
+# Cache
+# -------------------------
+class AnswerCache:
+    """
+    In-memory LRU of generated answers.
+
+    Bounded by entry count and by total answer size in bytes, and cleared
+    whenever the vector store version changes.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 8 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._version: Hashable = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def validate(self, version: Hashable) -> None:
+        """Drop every entry if the underlying vector store has changed."""
+        with self._lock:
+            if version == self._version:
+                return
+
+            if self._entries:
+                self.invalidations += 1
+
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            answer = self._entries.get(key)
+
+            if answer is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def put(self, key: str, answer: str) -> None:
+        size = len(answer.encode("utf-8"))
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.encode("utf-8"))
+
+            self._entries[key] = answer
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.encode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
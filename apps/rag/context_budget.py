@@ -0,0 +1,199 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, List, Tuple
+
+import tiktoken
+
+from langchain_core.documents import Document
+
+
+logger = logging.getLogger(__name__)
+
+# Same tokenizer the chunker uses for metadata["token_count"]. gpt-4o-mini
+# uses o200k_base, which yields slightly fewer tokens on English text,
+# so budgets measured here are conservative.
+ENCODING = "cl100k_base"
+
+# Offline estimate: cl100k_base averages about 4 bytes per token on
+# English prose and closer to 3 on code, so 3 overestimates and keeps
+# the packed context within budget.
+BYTES_PER_TOKEN = 3
+
+# A truncated chunk shorter than this is not worth its header.
+MIN_TRUNCATED_TOKENS = 64
+
+FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})")
+
+TokenCounter = Callable[[str], int]
+
+_counter: TokenCounter | None = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count estimated from UTF-8 length; needs no encoding files."""
+    return -(-len(text.encode("utf-8")) // BYTES_PER_TOKEN)
+
+
+def tiktoken_counter() -> TokenCounter:
+    """Exact cl100k_base counter (downloads the encoding on first use)."""
+    enc = tiktoken.get_encoding(ENCODING)
+    return lambda text: len(enc.encode(text, disallowed_special=()))
+
+
+def set_token_counter(counter: TokenCounter | None) -> None:
+    """Install the counter count_tokens uses; None reloads tiktoken on next use."""
+    global _counter
+    _counter = counter
+    count_tokens.cache_clear()
+
+
+def load_token_counter() -> TokenCounter:
+    """
+    The installed counter, loading tiktoken's encoding if none is set.
+
+    rag_api calls this at startup so the download never happens on the
+    request path. If the encoding cannot be loaded (e.g. offline with an
+    empty TIKTOKEN_CACHE_DIR), counts fall back to estimate_tokens.
+    """
+    global _counter
+    if _counter is None:
+        try:
+            _counter = tiktoken_counter()
+        except Exception:
+            logger.warning(
+                "Could not load tiktoken encoding %s; estimating token counts from text length",
+                ENCODING,
+                exc_info=True,
+            )
+            _counter = estimate_tokens
+    return _counter
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    return load_token_counter()(text)
+
+
+def chunk_tokens(doc: Document) -> int:
+    """Token count precomputed at ingestion, or counted (and memoized) for older stores."""
+    precomputed = doc.metadata.get("token_count")
+    if isinstance(precomputed, int):
+        return precomputed
+    return count_tokens(doc.page_content)
+
+
+def split_blocks(text: str) -> List[str]:
+    """Paragraphs separated by blank lines; a fenced code block is one block."""
+    blocks: List[str] = []
+    buf: List[str] = []
+    fence: str | None = None
+
+    for line in text.split("\n"):
+        match = FENCE_RE.match(line)
+
+        if fence is None and match:
+            fence = match.group(1)
+        elif fence is not None and line.strip().startswith(fence) and not line.strip().strip(fence[0]):
+            fence = None
+        elif fence is None and not line.strip():
+            if buf:
+                blocks.append("\n".join(buf))
+                buf = []
+            continue
+
+        buf.append(line)
+
+    if buf:
+        blocks.append("\n".join(buf))
+
+    return blocks
+
+
+def truncate(text: str, budget: int) -> Tuple[str, int]:
+    """
+    Longest prefix of whole blocks that fits the budget.
+
+    Falls back to whole lines only when even the first block is too big,
+    so a single huge code block still contributes its opening lines.
+    """
+    kept: List[str] = []
+    used = 0
+
+    for block in split_blocks(text):
+        tokens = count_tokens(block) + (1 if kept else 0)  # "\n\n" separator
+        if used + tokens > budget:
+            break
+        kept.append(block)
+        used += tokens
+
+    if kept:
+        return "\n\n".join(kept), used
+
+    for line in text.split("\n"):
+        tokens = count_tokens(line) + (1 if kept else 0)
+        if used + tokens > budget:
+            break
+        kept.append(line)
+        used += tokens
+
+    return "\n".join(kept), used
+
+
+@dataclass
+class PackedContext:
+    parts: List[str] = field(default_factory=list)
+    tokens_used: int = 0
+    tokens_dropped: int = 0
+    chunks_truncated: int = 0
+    chunks_dropped: int = 0
+
+    def usage(self) -> dict:
+        return {
+            "context_tokens": self.tokens_used,
+            "context_tokens_dropped": self.tokens_dropped,
+            "context_chunks": len(self.parts),
+            "context_chunks_truncated": self.chunks_truncated,
+            "context_chunks_dropped": self.chunks_dropped,
+        }
+
+
+def pack(
+    docs_and_scores: List[Tuple[Document, float]],
+    header: Callable[[int, Document, float], str],
+    budget: int,
+) -> PackedContext:
+    """
+    Fill the token budget with chunks in relevance order.
+
+    A chunk that does not fit whole is cut at paragraph / code-block
+    boundaries into the remaining budget; once the budget is spent, the
+    remaining chunks are dropped. Dropped tokens are counted for logging.
+    """
+    packed = PackedContext()
+
+    for doc, dist in docs_and_scores:
+        body_tokens = chunk_tokens(doc)
+        head = header(len(packed.parts) + 1, doc, dist)
+        head_tokens = count_tokens(head) + 2  # header newline + "\n\n" between chunks
+        remaining = budget - packed.tokens_used - head_tokens
+
+        if body_tokens <= remaining:
+            packed.parts.append(head + doc.page_content)
+            packed.tokens_used += head_tokens + body_tokens
+            continue
+
+        if remaining >= MIN_TRUNCATED_TOKENS:
+            text, used = truncate(doc.page_content, remaining)
+            if text:
+                packed.parts.append(head + text)
+                packed.tokens_used += head_tokens + used
+                packed.tokens_dropped += max(0, body_tokens - used)
+                packed.chunks_truncated += 1
+                continue
+
+        packed.tokens_dropped += body_tokens
+        packed.chunks_dropped += 1
+
+    return packed
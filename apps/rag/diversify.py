@@ -0,0 +1,78 @@
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from langchain_core.documents import Document
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def diversify(
+    hits: List[Tuple[Document, float]],
+    vectors: Dict[str, np.ndarray],
+    query_embedding: Sequence[float],
+    lambda_mult: float = 0.7,
+    duplicate_similarity: float = 0.95,
+    max_per_source: int = 0,
+) -> List[Tuple[Document, float]]:
+    """
+    Remove redundant chunks from a relevance-ordered hit list (MMR).
+
+    Chunks are picked greedily by maximal marginal relevance:
+
+        lambda_mult * sim(chunk, query) - (1 - lambda_mult) * max sim(chunk, picked)
+
+    A chunk whose cosine similarity to an already picked chunk reaches
+    duplicate_similarity is dropped, as is any chunk beyond
+    max_per_source from one source (0 = no cap). Uses the embeddings the
+    search already returned; hits without one keep their place and are
+    never treated as duplicates.
+    """
+    with_vectors = [i for i, (doc, _) in enumerate(hits) if doc.id in vectors]
+    if len(hits) < 2 or not with_vectors:
+        return hits
+
+    matrix = _unit(np.stack([vectors[hits[i][0].id] for i in with_vectors]).astype(np.float32))
+    query = _unit(np.asarray(query_embedding, dtype=np.float32))
+
+    relevance = matrix @ query
+    similarity = matrix @ matrix.T
+
+    remaining = list(range(len(with_vectors)))
+    picked: List[int] = []
+    per_source: Dict[str, int] = {}
+    order: List[int] = []
+
+    while remaining:
+        if picked:
+            redundancy = similarity[np.ix_(remaining, picked)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+
+        scores = lambda_mult * relevance[remaining] - (1.0 - lambda_mult) * redundancy
+        best = int(np.argmax(scores))
+        candidate = remaining.pop(best)
+
+        if redundancy[best] >= duplicate_similarity:
+            continue
+
+        source = Path(hits[with_vectors[candidate]][0].metadata.get("source", "")).name
+        if max_per_source and per_source.get(source, 0) >= max_per_source:
+            continue
+
+        per_source[source] = per_source.get(source, 0) + 1
+        picked.append(candidate)
+        order.append(with_vectors[candidate])
+
+    kept = set(with_vectors)
+    # Hits without an embedding stay at their original rank.
+    for i in range(len(hits)):
+        if i not in kept:
+            order.insert(min(i, len(order)), i)
+
+    return [hits[i] for i in order]
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+# -------------------------
+# Key helpers
+# -------------------------
+def normalize_query(text: str) -> str:
+    """Collapse whitespace and case so trivially different queries share a key."""
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(model: str, text: str) -> str:
+    raw = f"{model}\x00{normalize_query(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# -------------------------
+# Cache
+# -------------------------
+class EmbeddingCache:
+    """
+    Two-tier query-embedding cache.
+
+    - In-memory LRU bounded by max_size entries
+    - Optional SQLite tier on disk that survives restarts
+
+    Entries older than ttl_sec (if set) are treated as misses in both tiers.
+
+    The tiers can be used separately: get_memory / put_memory never touch
+    the disk and are safe on an event loop, while get_disk / put_disk do
+    the SQLite I/O (async callers run them in a thread). The memory tier
+    has its own lock, so it never waits behind a disk commit.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2048,
+        ttl_sec: float | None = None,
+        disk_path: Path | None = None,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+
+        self._memory: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: sqlite3.Connection | None = None
+
+        if disk_path is not None:
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, created REAL NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_sec is not None and time.time() - created > self.ttl_sec
+
+    def _remember(self, key: str, created: float, vector: List[float]) -> None:
+        self._memory[key] = (created, vector)
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    @property
+    def disk_enabled(self) -> bool:
+        return self._db is not None
+
+    def get_memory(self, key: str) -> Optional[List[float]]:
+        """Memory tier only; a hit is counted, a miss is left to get_disk."""
+        with self._lock:
+            entry = self._memory.get(key)
+
+            if entry is None:
+                return None
+
+            created, vector = entry
+            if self._expired(created):
+                del self._memory[key]
+                return None
+
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def get_disk(self, key: str) -> Optional[List[float]]:
+        """Disk tier (blocking); a hit is promoted to memory. Counts the miss."""
+        row = None
+
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT created, vector FROM embeddings WHERE key = ?",
+                    (key,),
+                ).fetchone()
+
+        with self._lock:
+            if row is not None and not self._expired(row[0]):
+                vector = array("d", row[1]).tolist()
+                self._remember(key, row[0], vector)
+                self.disk_hits += 1
+                return vector
+
+            self.misses += 1
+            return None
+
+    def get(self, key: str) -> Optional[List[float]]:
+        vector = self.get_memory(key)
+        return vector if vector is not None else self.get_disk(key)
+
+    def put_memory(self, key: str, vector: List[float]) -> float:
+        """Store in the memory tier; returns the creation time for put_disk."""
+        created = time.time()
+
+        with self._lock:
+            self._remember(key, created, vector)
+
+        return created
+
+    def put_disk(self, entries: List[Tuple[str, float, List[float]]]) -> None:
+        """Write (key, created, vector) entries to disk in one commit (blocking)."""
+        if self._db is None or not entries:
+            return
+
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, created, vector) "
+                "VALUES (?, ?, ?)",
+                [(key, created, array("d", vector).tobytes()) for key, created, vector in entries],
+            )
+            self._db.commit()
+
+    def put(self, key: str, vector: List[float]) -> None:
+        created = self.put_memory(key, vector)
+        self.put_disk([(key, created, vector)])
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+
+        return {
+            "size": len(self._memory),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "disk_enabled": self._db is not None,
+        }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# -------------------------
+# Embeddings wrapper
+# -------------------------
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings instance and caches query embeddings.
+
+    Document embeddings (ingestion) pass straight through; only
+    embed_query / aembed_query consult the cache.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str) -> None:
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = cache_key(self.model, text)
+        vector = self.cache.get(key)
+
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector)
+
+        return vector
+
+    async def _aget(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Cache lookups with the disk tier (if any) off the event loop."""
+        vectors = [self.cache.get_memory(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            lookup = lambda: [self.cache.get_disk(keys[i]) for i in missing]
+            found = await asyncio.to_thread(lookup) if self.cache.disk_enabled else lookup()
+            for i, vector in zip(missing, found):
+                vectors[i] = vector
+
+        return vectors
+
+    async def _aput(self, entries: Dict[str, List[float]]) -> None:
+        rows = [(key, self.cache.put_memory(key, vector), vector) for key, vector in entries.items()]
+
+        if self.cache.disk_enabled:
+            await asyncio.to_thread(self.cache.put_disk, rows)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = cache_key(self.model, text)
+        [vector] = await self._aget([key])
+
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await self._aput({key: vector})
+
+        return vector
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many queries: cache hits are served locally and all misses
+        go to the provider in a single aembed_documents call.
+        """
+        keys = [cache_key(self.model, text) for text in texts]
+        vectors = await self._aget(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+
+        if missing:
+            embedded = await self.embeddings.aembed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), embedded))
+
+            await self._aput(fresh)
+
+            vectors = [
+                vector if vector is not None else fresh[key]
+                for key, vector in zip(keys, vectors)
+            ]
+
+        return vectors
@@ -0,0 +1,194 @@
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+# -------------------------
+# On-disk layout
+# -------------------------
+# meta.json      header: count, avgdl, k1, b, built_at (written last)
+# vocab.json     term -> [offset, df] into the postings arrays
+# postings.i32   row numbers, grouped by term
+# tfs.f32        term frequency for each posting
+# doc_lens.i32   token count of every row
+# ids.json       chunk id of every row
+META_FILE = "meta.json"
+VOCAB_FILE = "vocab.json"
+POSTINGS_FILE = "postings.i32"
+TFS_FILE = "tfs.f32"
+DOC_LENS_FILE = "doc_lens.i32"
+IDS_FILE = "ids.json"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or "
+    "that the this to use used what when where which why with you your".split()
+)
+
+
+# -------------------------
+# Tokenizer
+# -------------------------
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms, tuned for API names.
+
+    An identifier is indexed whole (with underscores removed) and as its
+    parts, so `create_agent`, `createAgent()` and "create agent" all
+    share the terms "createagent", "create" and "agent".
+    """
+    terms: List[str] = []
+
+    for word in WORD_RE.findall(text):
+        parts = [
+            part.lower()
+            for piece in word.split("_")
+            for part in CAMEL_RE.findall(piece)
+        ]
+        whole = "".join(parts)
+
+        if whole and whole not in STOPWORDS:
+            terms.append(whole)
+
+        if len(parts) > 1:
+            terms.extend(part for part in parts if len(part) > 1 and part not in STOPWORDS)
+
+    return terms
+
+
+# -------------------------
+# Build
+# -------------------------
+def build_index(records: Iterable[Tuple[str, str]], out_dir: Path) -> int:
+    """
+    Build a BM25 index from (chunk_id, text) pairs and save it to out_dir.
+
+    Returns the number of indexed rows.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / META_FILE).unlink(missing_ok=True)
+
+    ids: List[str] = []
+    doc_lens: List[int] = []
+    postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    for row, (doc_id, text) in enumerate(records):
+        terms = tokenize(text)
+        ids.append(doc_id)
+        doc_lens.append(len(terms))
+
+        for term, tf in Counter(terms).items():
+            postings[term].append((row, tf))
+
+    vocab: Dict[str, List[int]] = {}
+    rows: List[int] = []
+    tfs: List[int] = []
+
+    for term in sorted(postings):
+        vocab[term] = [len(rows), len(postings[term])]
+        for row, tf in postings[term]:
+            rows.append(row)
+            tfs.append(tf)
+
+    np.asarray(rows, dtype=np.int32).tofile(out_dir / POSTINGS_FILE)
+    np.asarray(tfs, dtype=np.float32).tofile(out_dir / TFS_FILE)
+    np.asarray(doc_lens, dtype=np.int32).tofile(out_dir / DOC_LENS_FILE)
+    (out_dir / VOCAB_FILE).write_text(json.dumps(vocab), encoding="utf-8")
+    (out_dir / IDS_FILE).write_text(json.dumps(ids), encoding="utf-8")
+
+    # The header goes last: an index without meta.json is incomplete.
+    (out_dir / META_FILE).write_text(json.dumps({
+        "count": len(ids),
+        "avgdl": sum(doc_lens) / len(doc_lens) if doc_lens else 0.0,
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }), encoding="utf-8")
+
+    return len(ids)
+
+
+# -------------------------
+# Search
+# -------------------------
+class LexicalIndex:
+    """
+    BM25 search over an index written by build_index().
+
+    Scoring is vectorized: each query term adds its BM25 contribution to
+    a dense score array through its postings slice.
+    """
+
+    def __init__(self, index_dir: Path) -> None:
+        meta = json.loads((index_dir / META_FILE).read_text(encoding="utf-8"))
+
+        self.index_dir = index_dir
+        self.size = meta["count"]
+        self.avgdl = meta["avgdl"] or 1.0
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+
+        self.vocab: Dict[str, List[int]] = json.loads((index_dir / VOCAB_FILE).read_text(encoding="utf-8"))
+        self.ids: List[str] = json.loads((index_dir / IDS_FILE).read_text(encoding="utf-8"))
+        self.postings = np.fromfile(index_dir / POSTINGS_FILE, dtype=np.int32)
+        self.tfs = np.fromfile(index_dir / TFS_FILE, dtype=np.float32)
+
+        doc_lens = np.fromfile(index_dir / DOC_LENS_FILE, dtype=np.int32).astype(np.float32)
+        # Per-row length normalization is fixed at load time.
+        self.norm = self.k1 * (1.0 - self.b + self.b * doc_lens / self.avgdl)
+
+    def count(self) -> int:
+        return self.size
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, bm25_score) pairs; rows with no matching term are skipped."""
+        scores = np.zeros(self.size, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            entry = self.vocab.get(term)
+            if entry is None:
+                continue
+
+            offset, df = entry
+            rows = self.postings[offset:offset + df]
+            tf = self.tfs[offset:offset + df]
+
+            idf = math.log(1.0 + (self.size - df + 0.5) / (df + 0.5))
+            scores[rows] += idf * tf * (self.k1 + 1.0) / (tf + self.norm[rows])
+
+        matched = np.flatnonzero(scores)
+        if matched.size == 0 or k <= 0:
+            return []
+
+        if matched.size > k:
+            matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self.ids[row], float(scores[row])) for row in order]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int, rrf_k: int = 60) -> List[str]:
+    """
+    Merge ranked id lists: score(id) = sum over lists of 1 / (rrf_k + rank).
+
+    Only ranks are used, so BM25 scores and L2 distances never need to be
+    put on a common scale. Ties keep the order of first appearance.
+    """
+    scores: Dict[str, float] = {}
+
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+
+    return sorted(scores, key=lambda doc_id: -scores[doc_id])[:k]
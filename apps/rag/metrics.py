@@ -0,0 +1,164 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator
+
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+# -------------------------
+# Metrics
+# -------------------------
+# A dedicated registry, so /metrics only carries RAG metrics and the
+# module can be imported more than once (benchmarks, reloads) safely.
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+STAGES = ("embed", "search", "cache", "context", "generate", "log")
+
+# Sub-millisecond stages (search, context) up to multi-second LLM calls.
+STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds",
+    "Time spent in each request stage.",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+    registry=REGISTRY,
+)
+
+REQUEST_SECONDS = Histogram(
+    "rag_request_seconds",
+    "End-to-end request latency.",
+    ["endpoint"],
+    buckets=STAGE_BUCKETS,
+    registry=REGISTRY,
+)
+
+REFUSALS = Counter(
+    "rag_refusals_total",
+    "Refused queries by refusal_reason.",
+    ["reason"],
+    registry=REGISTRY,
+)
+
+ERRORS = Counter(
+    "rag_errors_total",
+    "Exceptions raised inside a request stage.",
+    ["stage"],
+    registry=REGISTRY,
+)
+
+# Label children are resolved once; observe() on a child is a lock and
+# two additions.
+_STAGE_CHILDREN = {stage: STAGE_SECONDS.labels(stage=stage) for stage in STAGES}
+
+
+# -------------------------
+# Per-request stage timer
+# -------------------------
+class StageTimer:
+    """
+    Accumulates wall time per stage for one request.
+
+    Every stage is also observed in the rag_stage_seconds histogram, and
+    an exception escaping a stage is counted in rag_errors_total.
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            ERRORS.labels(stage=name).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            child = _STAGE_CHILDREN.get(name)
+            (child or STAGE_SECONDS.labels(stage=name)).observe(elapsed)
+
+    def rounded(self) -> Dict[str, float]:
+        """Stage times for the JSONL log."""
+        return {name: round(sec, 6) for name, sec in self.stages.items()}
+
+
+_current: ContextVar[StageTimer | None] = ContextVar("rag_stage_timer", default=None)
+
+
+def start_timer() -> StageTimer:
+    """
+    Create a timer and make it current for this request.
+
+    The current timer follows the request into run_in_threadpool and into
+    tasks it creates, so helpers can time themselves with stage().
+    """
+    timer = StageTimer()
+    _current.set(timer)
+    return timer
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block against the current request's timer (no-op outside a request)."""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+
+    with timer.stage(name):
+        yield
+
+
+# -------------------------
+# Cache / log counters
+# -------------------------
+class StatsCollector:
+    """
+    Export the counters the caches and log writer already keep.
+
+    Read at scrape time, so the request path does no extra work.
+    """
+
+    def __init__(self) -> None:
+        self.sources: Dict[str, Callable[[], Dict[str, Any] | None]] = {}
+
+    def add(self, name: str, stats: Callable[[], Dict[str, Any] | None]) -> None:
+        self.sources[name] = stats
+
+    def collect(self):
+        hits = CounterMetricFamily("rag_cache_hits", "Cache hits.", labels=["cache"])
+        misses = CounterMetricFamily("rag_cache_misses", "Cache misses.", labels=["cache"])
+        size = GaugeMetricFamily("rag_cache_entries", "Entries held in memory.", labels=["cache"])
+        log_records = CounterMetricFamily("rag_query_log_records", "Query log records.", labels=["result"])
+
+        for name, stats_fn in self.sources.items():
+            stats = stats_fn()
+            if not stats:
+                continue
+
+            if name == "query_log":
+                log_records.add_metric(["written"], stats["written"])
+                log_records.add_metric(["dropped"], stats["dropped"])
+                log_records.add_metric(["write_error"], stats["write_errors"])
+                continue
+
+            hits.add_metric([name], stats["hits"] + stats.get("disk_hits", 0))
+            misses.add_metric([name], stats["misses"])
+            size.add_metric([name], stats["size"])
+
+        yield hits
+        yield misses
+        yield size
+        yield log_records
+
+
+STATS = StatsCollector()
+REGISTRY.register(STATS)
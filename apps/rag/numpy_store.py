@@ -0,0 +1,381 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+
+# -------------------------
+# On-disk layout
+# -------------------------
+# meta.json          header: count, dim, exported_at (written last)
+# vectors.f32        float32 matrix, row-major, shape (count, dim)
+# vectors.f16        the same matrix as float16 codes
+# vectors.i8         the same matrix as int8 codes
+# scales.f32         int8 scale of every row (row ~= codes * scale)
+# norms.f32          squared L2 norm of every row
+# texts.bin          utf-8 chunk texts, concatenated
+# text_offsets.i64   byte offsets into texts.bin, length count + 1
+# docs.jsonl         one {"id", "metadata"} record per row
+#
+# export_collection() writes each export to a new version directory next
+# to the store path (langchain_numpy.<UTC timestamp>) and then points the
+# store path, a symlink, at it. Files a running API has memory-mapped are
+# never rewritten in place.
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+F16_FILE = "vectors.f16"
+I8_FILE = "vectors.i8"
+SCALES_FILE = "scales.f32"
+NORMS_FILE = "norms.f32"
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "text_offsets.i64"
+DOCS_FILE = "docs.jsonl"
+
+QUANTIZATIONS = ("none", "float16", "int8")
+
+# Rows decoded to float32 at a time when scoring quantized codes. Small
+# blocks stay in CPU cache, so the decode costs about as much as the
+# float32 scan, and the temporary never grows with the corpus.
+SCORE_BLOCK_ROWS = 256
+
+
+# -------------------------
+# Export
+# -------------------------
+class StoreWriter:
+    """
+    Append rows to a store directory in the layout above.
+
+    Every block is written in float32 and in both quantized forms, so one
+    export serves every quantization mode. The files are truncated, so
+    out_dir must not be a store in use (export_collection writes to a
+    fresh version directory).
+    """
+
+    def __init__(self, out_dir: Path) -> None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / META_FILE).unlink(missing_ok=True)
+
+        self.out_dir = out_dir
+        self.count = 0
+        self.dim = 0
+        self.text_offset = 0
+
+        self.files = {
+            name: open(out_dir / name, "wb")
+            for name in (VECTORS_FILE, F16_FILE, I8_FILE, SCALES_FILE, NORMS_FILE, TEXTS_FILE, OFFSETS_FILE)
+        }
+        self.docs_f = open(out_dir / DOCS_FILE, "w", encoding="utf-8")
+
+        self.files[OFFSETS_FILE].write(np.array([0], dtype=np.int64).tobytes())
+
+    def add(
+        self,
+        ids: Sequence[str],
+        matrix: Any,
+        texts: Sequence[str | None],
+        metadatas: Sequence[Dict[str, Any] | None],
+    ) -> None:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        self.dim = matrix.shape[1]
+
+        # Symmetric per-row int8: the largest component maps to +-127.
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+
+        self.files[VECTORS_FILE].write(matrix.tobytes())
+        self.files[F16_FILE].write(matrix.astype(np.float16).tobytes())
+        self.files[I8_FILE].write(codes.tobytes())
+        self.files[SCALES_FILE].write(scales.astype(np.float32).tobytes())
+        self.files[NORMS_FILE].write(np.einsum("ij,ij->i", matrix, matrix).astype(np.float32).tobytes())
+
+        offsets = []
+        for doc_id, text, metadata in zip(ids, texts, metadatas):
+            encoded = (text or "").encode("utf-8")
+            self.files[TEXTS_FILE].write(encoded)
+            self.text_offset += len(encoded)
+            offsets.append(self.text_offset)
+
+            self.docs_f.write(json.dumps({"id": doc_id, "metadata": metadata or {}}) + "\n")
+
+        self.files[OFFSETS_FILE].write(np.array(offsets, dtype=np.int64).tobytes())
+        self.count += len(ids)
+
+    def close(self) -> int:
+        for f in self.files.values():
+            f.close()
+        self.docs_f.close()
+
+        # The header goes last: a store without meta.json is incomplete.
+        (self.out_dir / META_FILE).write_text(json.dumps({
+            "count": self.count,
+            "dim": self.dim,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+        }), encoding="utf-8")
+
+        return self.count
+
+
+def export_collection(collection: Any, out_dir: Path, page_size: int = 1000) -> int:
+    """
+    Stream a Chroma collection into the memory-mappable layout above.
+
+    Pages through collection.get() so the export never holds the whole
+    corpus in memory, then publishes it at out_dir (see publish_store).
+    An empty collection raises ValueError and the current store stays.
+    Returns the number of exported rows.
+    """
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    version_dir = out_dir.with_name(f"{out_dir.name}.{stamp}")
+    writer = StoreWriter(version_dir)
+
+    try:
+        while True:
+            page = collection.get(
+                limit=page_size,
+                offset=writer.count,
+                include=["embeddings", "documents", "metadatas"],
+            )
+
+            if not page["ids"]:
+                break
+
+            writer.add(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+
+        count = writer.close()
+        if count == 0:
+            raise ValueError("collection is empty; nothing to export")
+    except BaseException:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+
+    publish_store(version_dir, out_dir)
+    return count
+
+
+def publish_store(version_dir: Path, out_dir: Path) -> None:
+    """
+    Atomically point the out_dir symlink at version_dir, then delete the
+    older version directories.
+
+    A running API keeps serving the store it opened: its memory-mapped
+    files stay valid after they are unlinked, and rag_api reopens the
+    store once meta.json changes. An out_dir that is still a plain
+    directory (an export from before versioning) is moved aside first.
+    """
+    if out_dir.is_dir() and not out_dir.is_symlink():
+        out_dir.rename(out_dir.with_name(f"{out_dir.name}.legacy"))
+
+    link = out_dir.with_name(f"{out_dir.name}.link-tmp")
+    link.unlink(missing_ok=True)
+    link.symlink_to(version_dir.name)
+    os.replace(link, out_dir)
+
+    for old in out_dir.parent.glob(f"{out_dir.name}.*"):
+        if old.is_dir() and not old.is_symlink() and old.name != version_dir.name:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+# -------------------------
+# Store
+# -------------------------
+class NumpyVectorStore:
+    """
+    Exact top-k search over a memory-mapped float32 matrix.
+
+    Distances are squared L2, the same metric Chroma's default "l2" space
+    returns, so MAX_DISTANCE keeps its meaning. Implements the subset of
+    the Chroma interface the RAG API uses.
+
+    With quantization="float16" or "int8" the scan runs over compact codes
+    (also memory-mapped) instead. The best k * rescore_factor candidates are
+    then rescored exactly against the float32 rows, which stay on disk and
+    are only paged in for those candidates, so returned distances are
+    always exact.
+    """
+
+    def __init__(
+        self,
+        store_dir: Path,
+        embeddings: Embeddings | None = None,
+        quantization: str = "none",
+        rescore_factor: int = 4,
+    ) -> None:
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {QUANTIZATIONS}, got {quantization!r}")
+
+        # Resolve the published symlink once, so every file comes from the
+        # same export even if a new one is published while this opens.
+        files_dir = store_dir.resolve()
+        meta = json.loads((files_dir / META_FILE).read_text(encoding="utf-8"))
+
+        self.store_dir = store_dir
+        self.files_dir = files_dir
+        self.embeddings = embeddings
+        self.dim = meta["dim"]
+        self.size = meta["count"]
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+
+        # Memory-mapped: pages are shared between replicas on one host
+        # through the OS page cache instead of being copied per process.
+        # (np.memmap rejects empty files, so an empty store maps nothing.)
+        self.vectors = np.memmap(
+            files_dir / VECTORS_FILE,
+            dtype=np.float32,
+            mode="r",
+            shape=(self.size, self.dim),
+        ) if self.size else np.zeros((0, self.dim), dtype=np.float32)
+        self.norms = np.fromfile(files_dir / NORMS_FILE, dtype=np.float32)
+        self.offsets = np.fromfile(files_dir / OFFSETS_FILE, dtype=np.int64)
+        self.texts = np.memmap(files_dir / TEXTS_FILE, dtype=np.uint8, mode="r") \
+            if self.offsets[-1] > 0 else np.zeros(0, dtype=np.uint8)
+
+        # Quantized codes are what every query scans. They are mapped
+        # like the float32 matrix, so replicas share them through the
+        # page cache; the float32 rows are only touched to rescore.
+        self.codes: np.ndarray | None = None
+        self.scales: np.ndarray | None = None
+
+        if quantization != "none" and self.size:
+            code_file, code_dtype = (F16_FILE, np.float16) if quantization == "float16" else (I8_FILE, np.int8)
+            self.codes = np.memmap(files_dir / code_file, dtype=code_dtype, mode="r", shape=(self.size, self.dim))
+            if quantization == "int8":
+                self.scales = np.memmap(files_dir / SCALES_FILE, dtype=np.float32, mode="r", shape=(self.size,))
+
+        self.ids: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+
+        with open(files_dir / DOCS_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                self.ids.append(row["id"])
+                self.metadatas.append(row["metadata"])
+
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+    def count(self) -> int:
+        return self.size
+
+    def stats(self) -> Dict[str, Any]:
+        """Bytes of vector data every query scans, against the float32 baseline."""
+        scanned = self.vectors.nbytes if self.codes is None else self.codes.nbytes
+        if self.scales is not None:
+            scanned += self.scales.nbytes
+
+        return {
+            "quantization": self.quantization,
+            "rescore_factor": self.rescore_factor if self.codes is not None else None,
+            "scan_bytes": int(scanned + self.norms.nbytes),
+            "float32_bytes": int(self.vectors.nbytes + self.norms.nbytes),
+        }
+
+    def _document(self, row: int) -> Document:
+        text = bytes(self.texts[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+        return Document(
+            id=self.ids[row],
+            page_content=text,
+            metadata=self.metadatas[row],
+        )
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Dot product of every row with every query, shape (count, n_queries)."""
+        if self.size == 0:
+            return np.zeros((0, len(queries)), dtype=np.float32)
+
+        if self.codes is None:
+            return np.asarray(self.vectors @ queries.T)
+
+        scores = np.empty((self.size, len(queries)), dtype=np.float32)
+
+        for start in range(0, self.size, SCORE_BLOCK_ROWS):
+            block = self.codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + len(block)] = block @ queries.T
+
+        if self.scales is not None:
+            scores *= self.scales[:, None]
+
+        return scores
+
+    def _top_k(self, query: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2; the constant ||q||^2 does
+        # not change the ranking, so it is left out until the final rows.
+        ranking = self.norms - 2.0 * scores
+        k = min(k, self.size)
+
+        if k <= 0:
+            return []
+
+        # Quantized scores are approximate: keep a wider candidate list
+        # for the exact rescore below.
+        candidates = k if self.codes is None else min(self.size, k * self.rescore_factor)
+
+        if candidates < self.size:
+            top = np.sort(np.argpartition(ranking, candidates - 1)[:candidates])
+        else:
+            top = np.arange(self.size)
+
+        # Exact float32 distances for the candidates only.
+        diff = np.asarray(self.vectors[top]) - query
+        distances = np.einsum("ij,ij->i", diff, diff)
+
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(int(top[i]), float(distances[i])) for i in order]
+
+    def search_by_vector(self, embedding: Sequence[float], k: int) -> List[Tuple[Document, float]]:
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = self._scores(query[None, :])[:, 0]
+
+        return [(self._document(row), dist) for row, dist in self._top_k(query, scores, k)]
+
+    def search_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Batch search: one matrix-matrix product for all queries."""
+        queries = np.asarray(embeddings, dtype=np.float32)
+        scores = self._scores(queries)
+
+        return [
+            [(self._document(row), dist) for row, dist in self._top_k(queries[i], scores[:, i], k)]
+            for i in range(len(queries))
+        ]
+
+    def vectors_for(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """float32 rows of the given ids, keyed by id (read from the memmap)."""
+        return {doc_id: np.asarray(self.vectors[self.rows[doc_id]]) for doc_id in ids if doc_id in self.rows}
+
+    def score_ids(self, ids: Sequence[str], embedding: Sequence[float]) -> List[Tuple[Document, float]]:
+        """Documents for the given ids with their distance to embedding; unknown ids are skipped."""
+        rows = [self.rows[doc_id] for doc_id in ids if doc_id in self.rows]
+        if not rows:
+            return []
+
+        diff = np.asarray(self.vectors[rows]) - np.asarray(embedding, dtype=np.float32)
+        distances = np.einsum("ij,ij->i", diff, diff)
+
+        return [(self._document(row), float(dist)) for row, dist in zip(rows, distances)]
+
+    # Chroma-compatible entry points, for code written against the LangChain
+    # API. Scores are squared L2 distances (lower is closer), as from
+    # Chroma's *_with_score methods, not 0-1 relevance scores.
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = 4,
+    ) -> List[Tuple[Document, float]]:
+        return self.search_by_vector(embedding, k)
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        if self.embeddings is None:
+            raise ValueError("NumpyVectorStore needs an embeddings instance for text queries")
+        return self.search_by_vector(self.embeddings.embed_query(query), k)
@@ -0,0 +1,587 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BufferedLogWriter:
+    """
+    Append-only JSONL writer with an in-memory queue and one background thread.
+
+    Callers only enqueue a payload; the writer thread serializes records and
+    appends them in batches, flushing when batch_size records are pending or
+    flush_interval_sec has passed. Because a single thread owns the file,
+    lines never interleave.
+
+    When the queue is full the policy decides what happens:
+    - "drop":  the record is discarded immediately (never slows a request)
+    - "block": the caller waits up to block_timeout_sec, then drops
+
+    Async callers use awrite(), which never waits on the event loop: with
+    "block" a full queue is waited on in a worker thread instead.
+
+    Every discarded or unwritable record is counted in stats().
+
+    With max_bytes or rotate_interval_sec set, the file is rotated before
+    a batch is appended (see rotate_if_due).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_queue: int = 10_000,
+        batch_size: int = 256,
+        flush_interval_sec: float = 1.0,
+        policy: str = "drop",
+        block_timeout_sec: float = 1.0,
+        max_bytes: int = 0,
+        rotate_interval_sec: float = 0.0,
+    ) -> None:
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown log queue policy: {policy!r}")
+
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.policy = policy
+        self.block_timeout_sec = block_timeout_sec
+        self.max_bytes = max_bytes
+        self.rotate_interval_sec = rotate_interval_sec
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.rotations = 0
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="query-log-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush everything still queued and stop the writer thread."""
+        if self._thread is None:
+            return
+
+        # The stop marker must get through even when the queue is full.
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+        lost = self.dropped + self.write_errors
+        if lost:
+            logger.warning(
+                "Query log writer lost %d records (%d dropped, %d write errors)",
+                lost,
+                self.dropped,
+                self.write_errors,
+            )
+
+    # -------------------------
+    # Producer side
+    # -------------------------
+    def write(self, payload: Dict[str, Any]) -> bool:
+        """Enqueue one record. Returns False if it was dropped."""
+        try:
+            if self.policy == "block":
+                self._queue.put(payload, timeout=self.block_timeout_sec)
+            else:
+                self._queue.put_nowait(payload)
+            return True
+
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    async def awrite(self, payload: Dict[str, Any]) -> bool:
+        """Enqueue one record from an event loop. Returns False if it was dropped."""
+        if self.policy == "block":
+            try:
+                self._queue.put_nowait(payload)
+                return True
+            except queue.Full:
+                return await asyncio.to_thread(self.write, payload)
+
+        return self.write(payload)
+
+    # -------------------------
+    # Writer thread
+    # -------------------------
+    def _run(self) -> None:
+        stopping = False
+
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+
+            try:
+                item = self._queue.get(timeout=self.flush_interval_sec)
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self.flush_interval_sec
+
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+
+                batch.append(item)
+
+                if len(batch) >= self.batch_size:
+                    break
+
+                remaining = deadline - time.monotonic()
+
+                try:
+                    item = self._queue.get(timeout=max(0.0, remaining))
+                except queue.Empty:
+                    break
+
+            if stopping:
+                # Drain whatever producers enqueued before shutdown.
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+
+            self._flush(batch)
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+
+        lines = []
+        for payload in batch:
+            try:
+                lines.append(json.dumps(payload, ensure_ascii=False) + "\n")
+            except (TypeError, ValueError):
+                self.write_errors += 1
+
+        try:
+            if rotate_if_due(self.path, self.max_bytes, self.rotate_interval_sec):
+                self.rotations += 1
+
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            self.written += len(lines)
+
+        except OSError:
+            logger.exception("Failed to write %d query log records", len(lines))
+            self.write_errors += len(lines)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "rotations": self.rotations,
+            "policy": self.policy,
+        }
+
+
+# -------------------------
+# Rotation
+# -------------------------
+def rotate_if_due(
+    path: Path,
+    max_bytes: int = 0,
+    interval_sec: float = 0.0,
+    now: float | None = None,
+) -> Path | None:
+    """
+    Rename a log to path.<UTC timestamp> when it is due, before appending.
+
+    Due means the file has reached max_bytes, or its last write fell in an
+    earlier interval_sec period (e.g. 86400: one file per UTC day). 0
+    disables either check. The check is stateless (size and mtime), so it
+    also covers a file left over from a previous run. Returns the rotated
+    path, or None.
+    """
+    if not max_bytes and not interval_sec:
+        return None
+
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+
+    now = time.time() if now is None else now
+
+    due = st.st_size > 0 and (
+        (max_bytes and st.st_size >= max_bytes)
+        or (interval_sec and int(st.st_mtime // interval_sec) != int(now // interval_sec))
+    )
+    if not due:
+        return None
+
+    stamp = datetime.fromtimestamp(now, timezone.utc).strftime("%Y%m%dT%H%M%S")
+    target = path.with_name(f"{path.name}.{stamp}")
+    n = 1
+    while target.exists():
+        target = path.with_name(f"{path.name}.{stamp}-{n}")
+        n += 1
+
+    try:
+        path.rename(target)
+    except FileNotFoundError:
+        # Another process (uvicorn worker) rotated it first.
+        return None
+
+    return target
+
+
+# -------------------------
+# Columnar archive
+# -------------------------
+# A rotated log compacts into one compressed .npz with a typed array per
+# field, so scans read numbers instead of parsing JSON:
+#
+#   bool fields         int8   (0 / 1)
+#   int / float fields  int64 / float64
+#   "ts"                float64 epoch seconds (ISO strings restored on read)
+#   repeated strings    int32 codes + a category table
+#   free text           utf-8 bytes + int64 offsets
+#   dict of numbers     one float64 column per key (stage_sec.embed, ...)
+#   list of records     per-key columns + int64 row offsets (sources)
+#   anything else       JSON text
+#
+# Missing and null values share one boolean mask per field and both read
+# back as None. The answer text is dropped unless keep_answers is set.
+ARCHIVE_SUFFIX = ".npz"
+SCHEMA_KEY = "__schema__"
+DROPPED_FIELDS = ("answer",)
+
+# A string field is stored as categories when it has at most this many
+# distinct values, or one per 8 records, whichever is more.
+MAX_CATEGORIES = 4096
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _parse_iso(value: str) -> float | None:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _text_arrays(texts: List[str]) -> Dict[str, np.ndarray]:
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return {
+        "bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "offsets": offsets,
+    }
+
+
+def _encode_column(name: str, values: List[Any], arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Add the arrays of one field to arrays and return its schema entry."""
+    present = [v for v in values if v is not None]
+    missing = np.array([v is None for v in values], dtype=bool)
+
+    if missing.any():
+        arrays[f"{name}.missing"] = missing
+
+    if not present:
+        return {"name": name, "kind": "null"}
+
+    if all(isinstance(v, bool) for v in present):
+        arrays[name] = np.array([bool(v) if v is not None else False for v in values], dtype=np.int8)
+        return {"name": name, "kind": "bool"}
+
+    if all(_is_number(v) for v in present):
+        if all(isinstance(v, int) for v in present):
+            arrays[name] = np.array([v if v is not None else 0 for v in values], dtype=np.int64)
+            return {"name": name, "kind": "int"}
+        arrays[name] = np.array([v if v is not None else np.nan for v in values], dtype=np.float64)
+        return {"name": name, "kind": "float"}
+
+    if all(isinstance(v, str) for v in present):
+        if name == "ts":
+            # Only UTC timestamps that format back identically (what
+            # log_response writes); anything else stays a string.
+            epochs = [_parse_iso(v) if v is not None else np.nan for v in values]
+            if all(
+                e is not None and (v is None or datetime.fromtimestamp(e, timezone.utc).isoformat() == v)
+                for v, e in zip(values, epochs)
+            ):
+                arrays[name] = np.array(epochs, dtype=np.float64)
+                return {"name": name, "kind": "iso_ts"}
+
+        categories = sorted(set(present))
+        if len(categories) <= max(MAX_CATEGORIES, len(values) // 8):
+            index = {c: i for i, c in enumerate(categories)}
+            arrays[name] = np.array([index[v] if v is not None else -1 for v in values], dtype=np.int32)
+            arrays[f"{name}.categories"] = np.array(categories, dtype=str)
+            return {"name": name, "kind": "category"}
+
+        text = _text_arrays([v if v is not None else "" for v in values])
+        arrays[f"{name}.bytes"] = text["bytes"]
+        arrays[f"{name}.offsets"] = text["offsets"]
+        return {"name": name, "kind": "text"}
+
+    if all(isinstance(v, dict) and all(_is_number(x) for x in v.values()) for v in present):
+        keys = sorted({key for v in present for key in v})
+        for key in keys:
+            arrays[f"{name}.{key}"] = np.array(
+                [(v or {}).get(key, np.nan) for v in values],
+                dtype=np.float64,
+            )
+        return {"name": name, "kind": "dict", "keys": keys}
+
+    if all(isinstance(v, list) and all(isinstance(x, dict) for x in v) for v in present):
+        rows = [row for v in values for row in (v or [])]
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(v or []) for v in values])
+        arrays[f"{name}.offsets"] = offsets
+
+        keys = list(dict.fromkeys(key for row in rows for key in row))
+        fields = [
+            _encode_column(f"{name}.{key}", [row.get(key) for row in rows], arrays)
+            for key in keys
+        ]
+        return {"name": name, "kind": "records", "fields": fields}
+
+    text = _text_arrays([json.dumps(v, ensure_ascii=False) if v is not None else "null" for v in values])
+    arrays[f"{name}.bytes"] = text["bytes"]
+    arrays[f"{name}.offsets"] = text["offsets"]
+    return {"name": name, "kind": "json"}
+
+
+def _decode_column(entry: Dict[str, Any], arrays: Any, count: int) -> List[Any]:
+    """Python values of one field, one per row (None where missing)."""
+    name, kind = entry["name"], entry["kind"]
+
+    if kind == "null":
+        return [None] * count
+
+    if kind in ("bool", "int", "float"):
+        values = arrays[name].tolist()
+        if kind == "bool":
+            values = [bool(v) for v in values]
+    elif kind == "iso_ts":
+        # NaN marks a record without ts (the missing mask then applies).
+        values = [
+            datetime.fromtimestamp(v, timezone.utc).isoformat() if v == v else None
+            for v in arrays[name].tolist()
+        ]
+    elif kind == "category":
+        categories = arrays[f"{name}.categories"].tolist()
+        values = [categories[code] if code >= 0 else None for code in arrays[name].tolist()]
+    elif kind in ("text", "json"):
+        blob = arrays[f"{name}.bytes"].tobytes()
+        offsets = arrays[f"{name}.offsets"].tolist()
+        values = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(count)]
+        if kind == "json":
+            values = [json.loads(v) for v in values]
+    elif kind == "dict":
+        columns = {key: arrays[f"{name}.{key}"].tolist() for key in entry["keys"]}
+        values = [
+            {key: column[i] for key, column in columns.items() if column[i] == column[i]}  # NaN = absent
+            for i in range(count)
+        ]
+    else:  # records
+        offsets = arrays[f"{name}.offsets"].tolist()
+        total = offsets[-1]
+        columns = {
+            field["name"][len(name) + 1:]: _decode_column(field, arrays, total)
+            for field in entry["fields"]
+        }
+        values = [
+            [{key: column[j] for key, column in columns.items()} for j in range(offsets[i], offsets[i + 1])]
+            for i in range(count)
+        ]
+
+    missing_key = f"{name}.missing"
+    if missing_key in arrays:
+        values = [None if gone else v for v, gone in zip(values, arrays[missing_key].tolist())]
+
+    return values
+
+
+def compact_log(path: Path, keep_answers: bool = False, remove_source: bool = True) -> Path:
+    """
+    Convert one rotated JSONL log (plain or .gz) into a columnar .npz archive.
+
+    The archive is written under a temporary name and renamed into place
+    before the source is removed, so a crash never loses records;
+    log_files() skips a JSONL file whose archive already exists.
+    """
+    # One value list per field, so only the kept fields are in memory.
+    columns: Dict[str, List[Any]] = {}
+    count = 0
+
+    for record in iter_log_records([path]):
+        for name, value in record.items():
+            if name in DROPPED_FIELDS and not keep_answers:
+                continue
+            if name not in columns:
+                columns[name] = [None] * count
+            columns[name].append(value)
+
+        count += 1
+        for values in columns.values():
+            if len(values) < count:
+                values.append(None)
+
+    arrays: Dict[str, np.ndarray] = {}
+    schema = {
+        "count": count,
+        "source": path.name,
+        "fields": [_encode_column(name, values, arrays) for name, values in columns.items()],
+    }
+    arrays[SCHEMA_KEY] = np.array(json.dumps(schema))
+
+    target = archive_path(path)
+    tmp = target.with_name(target.name + ".tmp")
+
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **arrays)
+
+    # Keep the source's mtime, which log_files() orders rotated files by.
+    source_stat = path.stat()
+    os.utime(tmp, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    os.replace(tmp, target)
+
+    if remove_source:
+        path.unlink()
+
+    return target
+
+
+def archive_path(path: Path) -> Path:
+    """rag_queries_v1.jsonl.<stamp>[.gz] -> rag_queries_v1.jsonl.<stamp>.npz"""
+    name = path.name[:-3] if path.name.endswith(".gz") else path.name
+    return path.with_name(name + ARCHIVE_SUFFIX)
+
+
+def read_archive(path: Path) -> Dict[str, np.ndarray]:
+    """All arrays of an archive by name (plus the parsed schema under SCHEMA_KEY)."""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    arrays[SCHEMA_KEY] = json.loads(str(arrays[SCHEMA_KEY]))
+    return arrays
+
+
+def iter_archive_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """Rebuild the JSONL records of an archive, field order preserved."""
+    arrays = read_archive(path)
+    schema = arrays[SCHEMA_KEY]
+    count = schema["count"]
+
+    names = [entry["name"] for entry in schema["fields"]]
+    columns = [_decode_column(entry, arrays, count) for entry in schema["fields"]]
+
+    for row in zip(*columns):
+        yield dict(zip(names, row))
+
+
+# -------------------------
+# Reading
+# -------------------------
+def log_files(path: Path) -> List[Path]:
+    """
+    Every file that belongs to a log, oldest first.
+
+    - a directory: all *.jsonl files in it and their rotated, compressed
+      or archived siblings (*.jsonl.*)
+    - a log file: the file plus its rotated siblings (name.*, e.g.
+      rag_queries_v1.jsonl.20261018T120000, .gz or its .npz archive)
+
+    A rotated file whose archive exists is skipped (compaction was
+    interrupted before the source was removed), as are temporary files.
+    Rotated files are ordered by modification time, i.e. their last write
+    (compact_log gives an archive its source's mtime); the live file is
+    last.
+    """
+    if path.is_dir():
+        files = [
+            p for p in path.iterdir()
+            if p.is_file() and (p.name.endswith(".jsonl") or ".jsonl." in p.name)
+        ]
+    elif path.suffix == ARCHIVE_SUFFIX or path.suffix == ".gz":
+        files = [path] if path.exists() else []
+    else:
+        files = [p for p in path.parent.glob(f"{path.name}.*") if p.is_file()]
+
+    files = [
+        p for p in files
+        if not p.name.endswith(".tmp")
+        and (p.suffix == ARCHIVE_SUFFIX or not archive_path(p).exists())
+    ]
+    files.sort(key=lambda p: (p.stat().st_mtime, p.name))
+
+    if path.is_file() and path.suffix not in (ARCHIVE_SUFFIX, ".gz"):
+        files.append(path)
+
+    return files
+
+
+def iter_log_records(
+    paths: Iterable[Path],
+    errors: Dict[str, int] | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from JSONL files (gzip-compressed or not) and archives.
+
+    One line is in memory at a time; an archive is read whole, one
+    rotated file at most. Lines that are not valid JSON (a record cut off
+    by a crash, or one still being written) are skipped and counted in
+    errors["bad_lines"] when a dict is passed.
+    """
+    for path in paths:
+        if path.suffix == ARCHIVE_SUFFIX:
+            yield from iter_archive_records(path)
+            continue
+
+        opener = gzip.open if path.suffix == ".gz" else open
+
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    if errors is not None:
+                        errors["bad_lines"] = errors.get("bad_lines", 0) + 1
+                    continue
+                if isinstance(record, dict):
+                    yield record
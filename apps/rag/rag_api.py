@@ -1,7 +1,11 @@
+import asyncio
 import json
+import logging
+import os
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Annotated, Any, AsyncIterator, Callable, Dict, List, Tuple
 
 import time
 import uuid
@@ -10,11 +14,29 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel, Field
 
+import numpy as np
+
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from .answer_cache import AnswerCache, answer_key, vectorstore_version
+from .context_budget import load_token_counter, pack
+from .diversify import diversify
+from .embedding_cache import CachedEmbeddings, EmbeddingCache
+from .lexical_index import META_FILE as LEXICAL_META_FILE, LexicalIndex, reciprocal_rank_fusion
+from .metrics import REFUSALS, REGISTRY, REQUEST_SECONDS, STATS, stage, start_timer
+from .numpy_store import META_FILE, NumpyVectorStore
+from .query_log import BufferedLogWriter, rotate_if_due
+
+
+logger = logging.getLogger(__name__)
 
 
 # -------------------------
@@ -22,6 +44,8 @@ from langchain_core.documents import Document
 # -------------------------
 BASE_DIR = Path(__file__).resolve().parents[2]  # repo root
 PERSIST_DIR = BASE_DIR / "data/vectorstore/langchain_db"
+NUMPY_STORE_DIR = BASE_DIR / "data/vectorstore/langchain_numpy"
+LEXICAL_INDEX_DIR = BASE_DIR / "data/vectorstore/lexical_index"
 LOG_DIR = BASE_DIR / "logs"
 LOG_FILE = LOG_DIR / "rag_queries_v1.jsonl"
 
@@ -33,16 +57,79 @@ LOG_FILE = LOG_DIR / "rag_queries_v1.jsonl"
 K = 5
 MAX_DISTANCE = 1.05
 
+# "chroma" or "numpy" (exact search over a memory-mapped export of the
+# Chroma collection; build it with scripts/export_numpy_store.py)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma")
+
+# numpy backend only: scan "float16" or "int8" codes instead of float32,
+# then rescore the best K * RESCORE_FACTOR candidates exactly
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+
+# Hybrid retrieval: BM25 hits from the lexical index (built by
+# scripts/build_lexical_index.py) are fused with the vector hits using
+# reciprocal rank fusion. Skipped when the index has not been built.
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # per ranking, before fusion
+RRF_K = 60
+
+# Redundancy removal on the retrieved chunks (MMR over the embeddings the
+# search already returned). A chunk this similar (cosine) to a kept one is
+# dropped; MAX_CHUNKS_PER_SOURCE=0 means no per-source cap. MMR picks K
+# from a pool of K * DIVERSIFY_FETCH_MULT candidates, so dropped chunks
+# are replaced by the next best ones.
+DIVERSIFY = os.getenv("DIVERSIFY", "1") == "1"
+DIVERSIFY_FETCH_MULT = int(os.getenv("DIVERSIFY_FETCH_MULT", "3"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+DUPLICATE_SIMILARITY = float(os.getenv("DUPLICATE_SIMILARITY", "0.95"))
+MAX_CHUNKS_PER_SOURCE = int(os.getenv("MAX_CHUNKS_PER_SOURCE", "0"))
+
+# Prompt context is filled in relevance order up to this many tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
 EMBED_MODEL = "text-embedding-3-small"
 LLM_MODEL = "gpt-4o-mini"
 REFUSAL_TEXT = "I don't have enough relevant context to answer confidently."
+ERROR_TEXT = "Could not generate an answer for this query."
+
+# Query-embedding cache (EMBED_CACHE_TTL_SEC=0 disables expiry,
+# EMBED_CACHE_PATH enables the on-disk tier)
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_TTL_SEC = float(os.getenv("EMBED_CACHE_TTL_SEC", "86400")) or None
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "")
+
+# Answer cache (generation is deterministic at temperature=0)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# /query/batch limits
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "64"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# Background query-log writer ("drop" or "block" when the queue is full)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+LOG_FLUSH_INTERVAL_SEC = float(os.getenv("LOG_FLUSH_INTERVAL_SEC", "1.0"))
+LOG_FULL_POLICY = os.getenv("LOG_FULL_POLICY", "drop")
+
+# Rotate the query log at this size or once per interval (0 disables);
+# scripts/compact_query_logs.py archives the rotated files
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(100 * 1024 * 1024)))
+LOG_ROTATE_INTERVAL_SEC = float(os.getenv("LOG_ROTATE_INTERVAL_SEC", "86400"))
 
 # -------------------------
 # App + globals
 # -------------------------
 app = FastAPI(title="RAG API v1", version="0.1.0")
 
-_vectordb: Chroma | None = None
+_vectordb: Chroma | NumpyVectorStore | None = None
+_vectordb_version: Any = None
+_vectordb_lock = threading.Lock()
+_lexical_index: LexicalIndex | None = None
+_embeddings: CachedEmbeddings | None = None
+_embedding_cache: EmbeddingCache | None = None
+_answer_cache: AnswerCache | None = None
+_log_writer: BufferedLogWriter | None = None
 _llm: ChatOpenAI | None = None
 
 
@@ -67,30 +154,273 @@ class QueryResponse(BaseModel):
     refusal_reason: str | None = None
 
 
+class BatchQueryRequest(BaseModel):
+    queries: List[Annotated[str, Field(min_length=1)]] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_QUERIES,
+    )
+
+
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
+
+
 # -------------------------
 # Helpers
 # -------------------------
+def pool_k(k: int) -> int:
+    """Hits kept after fusion: a deeper pool when diversify() picks k from it."""
+    return max(k, k * DIVERSIFY_FETCH_MULT) if DIVERSIFY else k
+
+
+def candidate_k(k: int) -> int:
+    """Vector hits to fetch: a deeper pool when it will be re-ranked by fusion or MMR."""
+    depth = pool_k(k)
+    return max(depth, HYBRID_CANDIDATES) if _lexical_index is not None else depth
+
+
+def score_ids(
+    vectordb: Chroma | NumpyVectorStore,
+    ids: List[str],
+    query_embedding: List[float],
+) -> Tuple[List[Tuple[Document, float]], Dict[str, np.ndarray]]:
+    """
+    Fetch chunks by id with their squared L2 distance to the query.
+
+    Also returns the fetched embeddings, keyed by chunk id.
+    """
+    if isinstance(vectordb, NumpyVectorStore):
+        hits = vectordb.score_ids(ids, query_embedding)
+        return hits, vectordb.vectors_for([doc.id for doc, _ in hits])
+
+    results = vectordb._collection.get(
+        ids=ids,
+        include=["documents", "metadatas", "embeddings"],
+    )
+    query = np.asarray(query_embedding, dtype=np.float32)
+
+    hits: List[Tuple[Document, float]] = []
+    vectors: Dict[str, np.ndarray] = {}
+
+    for doc_id, text, metadata, vector in zip(
+        results["ids"],
+        results["documents"],
+        results["metadatas"],
+        results["embeddings"],
+    ):
+        vectors[doc_id] = np.asarray(vector, dtype=np.float32)
+        diff = vectors[doc_id] - query
+        hits.append((
+            Document(page_content=text or "", metadata=metadata or {}, id=doc_id),
+            float(diff @ diff),
+        ))
+
+    return hits, vectors
+
+
+def fuse(
+    vectordb: Chroma | NumpyVectorStore,
+    query: str,
+    query_embedding: List[float],
+    vector_hits: List[Tuple[Document, float]],
+    vectors: Dict[str, np.ndarray],
+    k: int = K,
+) -> List[Tuple[Document, float]]:
+    """
+    Merge thresholded vector hits with BM25 hits using reciprocal rank fusion.
+
+    - Refusal stays a vector decision: no hits within MAX_DISTANCE means
+      no hits at all, whatever the lexical index matches
+    - BM25-only chunks are fetched by id and reported with their real
+      distance, but are not dropped by MAX_DISTANCE, since an exact API
+      name match is what vector search tends to miss
+
+    Embeddings of fetched BM25-only chunks are added to vectors.
+    """
+    if _lexical_index is None or not vector_hits:
+        return vector_hits[:k]
+
+    lexical_hits = _lexical_index.search(query, HYBRID_CANDIDATES)
+
+    fused_ids = reciprocal_rank_fusion(
+        [
+            [doc.id for doc, _ in vector_hits],
+            [doc_id for doc_id, _ in lexical_hits],
+        ],
+        k,
+        rrf_k=RRF_K,
+    )
+
+    by_id = {doc.id: (doc, dist) for doc, dist in vector_hits}
+    missing = [doc_id for doc_id in fused_ids if doc_id not in by_id]
+
+    if missing:
+        fetched, fetched_vectors = score_ids(vectordb, missing, query_embedding)
+        by_id.update({doc.id: (doc, dist) for doc, dist in fetched})
+        vectors.update(fetched_vectors)
+
+    return [by_id[doc_id] for doc_id in fused_ids if doc_id in by_id]
+
+
+def search_by_vectors(
+    vectordb: Chroma | NumpyVectorStore,
+    query_embeddings: List[List[float]],
+    k: int = K,
+) -> Tuple[List[List[Tuple[Document, float]]], Dict[str, np.ndarray]]:
+    """
+    Run several vector searches in one store call.
+
+    Returns one thresholded (doc, distance) list per query embedding, and
+    the embeddings of every returned chunk keyed by chunk id (read in the
+    same call, for diversify()).
+    """
+    if isinstance(vectordb, NumpyVectorStore):
+        batched = [
+            [(doc, dist) for doc, dist in results if dist <= MAX_DISTANCE]
+            for results in vectordb.search_by_vectors(query_embeddings, k)
+        ]
+        return batched, vectordb.vectors_for([doc.id for hits in batched for doc, _ in hits])
+
+    results = vectordb._collection.query(
+        query_embeddings=query_embeddings,
+        n_results=k,
+        include=["documents", "metadatas", "distances", "embeddings"],
+    )
+
+    batched: List[List[Tuple[Document, float]]] = []
+    vectors: Dict[str, np.ndarray] = {}
+
+    for ids, texts, metadatas, distances, embeddings in zip(
+        results["ids"],
+        results["documents"],
+        results["metadatas"],
+        results["distances"],
+        results["embeddings"],
+    ):
+        hits: List[Tuple[Document, float]] = []
+
+        for doc_id, text, metadata, dist, vector in zip(ids, texts, metadatas, distances, embeddings):
+            if text is None or dist > MAX_DISTANCE:
+                continue
+            hits.append((Document(page_content=text, metadata=metadata or {}, id=doc_id), dist))
+            vectors[doc_id] = np.asarray(vector, dtype=np.float32)
+
+        batched.append(hits)
+
+    return batched, vectors
+
+
+def search_batch(
+    vectordb: Chroma | NumpyVectorStore,
+    queries: List[str],
+    query_embeddings: List[List[float]],
+    k: int = K,
+) -> List[List[Tuple[Document, float]]]:
+    """
+    Vector search plus threshold for every query in one store call, then
+    per query: fusion with BM25 (when the lexical index is loaded) and
+    redundancy removal (when DIVERSIFY is on), which picks k from a deeper
+    pool of candidates.
+    """
+    candidates, vectors = search_by_vectors(vectordb, query_embeddings, candidate_k(k))
+
+    results: List[List[Tuple[Document, float]]] = []
+
+    for query, query_embedding, hits in zip(queries, query_embeddings, candidates):
+        hits = fuse(vectordb, query, query_embedding, hits, vectors, pool_k(k))
+
+        if DIVERSIFY:
+            hits = diversify(
+                hits,
+                vectors,
+                query_embedding,
+                lambda_mult=MMR_LAMBDA,
+                duplicate_similarity=DUPLICATE_SIMILARITY,
+                max_per_source=MAX_CHUNKS_PER_SOURCE,
+            )[:k]
+
+        results.append(hits)
+
+    return results
+
+
+def search(
+    vectordb: Chroma | NumpyVectorStore,
+    query: str,
+    query_embedding: List[float],
+    k: int = K,
+) -> List[Tuple[Document, float]]:
+    return search_batch(vectordb, [query], [query_embedding], k)[0]
+
+
 def retrieve(
-    vectordb: Chroma,
+    vectordb: Chroma | NumpyVectorStore,
     query: str,
     k: int = K,
 ) -> List[Tuple[Document, float]]:
-    results = vectordb.similarity_search_with_score(query, k=k)
-    filtered = [(doc, dist) for doc, dist in results if dist <= MAX_DISTANCE]
-    return filtered
+    with stage("embed"):
+        query_embedding = vectordb.embeddings.embed_query(query)
 
+    with stage("search"):
+        return search(vectordb, query, query_embedding, k)
 
-def format_context(docs_and_scores: List[Tuple[Document, float]]) -> str:
-    parts: List[str] = []
 
-    for idx, (doc, dist) in enumerate(docs_and_scores, 1):
-        source = Path(doc.metadata.get("source", "unknown")).name
-        parts.append(
-            f"[Chunk {idx} | Source: {source} | distance={dist:.3f}]\n"
-            f"{doc.page_content}"
-        )
+async def aretrieve(
+    vectordb: Chroma | NumpyVectorStore,
+    embeddings: CachedEmbeddings,
+    query: str,
+    k: int = K,
+) -> List[Tuple[Document, float]]:
+    """
+    Async variant of retrieve().
+
+    The query is embedded with the async OpenAI client, and the search
+    (local, blocking) runs in the threadpool so the event loop stays
+    free. Distances are identical to similarity_search_with_score.
+    """
+    with stage("embed"):
+        query_embedding = await embeddings.aembed_query(query)
 
-    return "\n\n".join(parts)
+    with stage("search"):
+        return await run_in_threadpool(search, vectordb, query, query_embedding, k)
+
+
+async def aretrieve_batch(
+    vectordb: Chroma | NumpyVectorStore,
+    embeddings: CachedEmbeddings,
+    queries: List[str],
+    k: int = K,
+) -> List[List[Tuple[Document, float]]]:
+    """Embed all queries in one call, then search them together."""
+    with stage("embed"):
+        query_embeddings = await embeddings.aembed_queries(queries)
+
+    with stage("search"):
+        return await run_in_threadpool(search_batch, vectordb, queries, query_embeddings, k)
+
+
+def chunk_header(idx: int, doc: Document, dist: float) -> str:
+    source = Path(doc.metadata.get("source", "unknown")).name
+    return f"[Chunk {idx} | Source: {source} | distance={dist:.3f}]\n"
+
+
+def format_context(
+    docs_and_scores: List[Tuple[Document, float]],
+    budget: int | None = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Assemble the prompt context within a token budget.
+
+    Returns (context, usage); usage holds the context tokens used and
+    dropped and is added to the query log.
+    """
+    packed = pack(
+        docs_and_scores,
+        chunk_header,
+        CONTEXT_TOKEN_BUDGET if budget is None else budget,
+    )
+    return "\n\n".join(packed.parts), packed.usage()
 
 
 def build_sources(docs_and_scores: List[Tuple[Document, float]]) -> List[SourceHit]:
@@ -111,8 +441,213 @@ def build_sources(docs_and_scores: List[Tuple[Document, float]]) -> List[SourceH
     return sources
 
 
+def build_prompt(query: str, context: str) -> str:
+    return f"""
+You are a careful RAG assistant.
+
+Answer the user's question using ONLY the provided context.
+
+If the context is insufficient, respond with exactly:
+"{REFUSAL_TEXT}"
+
+Question:
+{query}
+
+Context:
+{context}
+
+Answer:
+""".strip()
+
+
+def build_response(
+    query: str,
+    answer: str,
+    retrieved: List[Tuple[Document, float]],
+) -> QueryResponse:
+    if not retrieved:
+        return QueryResponse(
+            query=query,
+            refused=True,
+            answer=REFUSAL_TEXT,
+            sources=[],
+            refusal_reason="no_relevant_chunks",
+        )
+
+    refused = answer.strip() == REFUSAL_TEXT
+
+    return QueryResponse(
+        query=query,
+        refused=refused,
+        answer=answer,
+        sources=build_sources(retrieved),
+        refusal_reason="llm_self_refusal" if refused else None,
+    )
+
+
+def error_response(query: str) -> QueryResponse:
+    """The refusal returned for a query whose generation failed."""
+    return QueryResponse(
+        query=query,
+        refused=True,
+        answer=ERROR_TEXT,
+        sources=[],
+        refusal_reason="generation_error",
+    )
+
+
+def lookup_answer(
+    query: str,
+    retrieved: List[Tuple[Document, float]],
+) -> Tuple[str, str | None]:
+    """
+    Return (cache key, cached answer or None) for a query and its chunks.
+
+    The cache is cleared first if the vector store has been rebuilt.
+    """
+    key = answer_key(LLM_MODEL, query, [doc for doc, _ in retrieved])
+
+    if _answer_cache is None:
+        return key, None
+
+    if RETRIEVAL_BACKEND == "numpy":
+        _answer_cache.validate(vectorstore_version(NUMPY_STORE_DIR, marker=META_FILE))
+    else:
+        _answer_cache.validate(vectorstore_version(PERSIST_DIR))
+    return key, _answer_cache.get(key)
+
+
+def store_answer(key: str, answer: str) -> None:
+    if _answer_cache is not None:
+        _answer_cache.put(key, answer)
+
+
+def generate(
+    query: str,
+    retrieved: List[Tuple[Document, float]],
+) -> Tuple[str, bool, Dict[str, Any]]:
+    """
+    Answer from the cache or the LLM.
+
+    Returns (answer, cache_hit, context usage); usage is empty when no
+    prompt was built.
+    """
+    if not retrieved:
+        return REFUSAL_TEXT, False, {}
+
+    with stage("cache"):
+        key, cached = lookup_answer(query, retrieved)
+    if cached is not None:
+        return cached, True, {}
+
+    with stage("context"):
+        context, usage = format_context(retrieved)
+
+    with stage("generate"):
+        answer = _llm.invoke(build_prompt(query, context)).content.strip()
+
+    store_answer(key, answer)
+
+    return answer, False, usage
+
+
+async def agenerate(
+    query: str,
+    retrieved: List[Tuple[Document, float]],
+) -> Tuple[str, bool, Dict[str, Any]]:
+    """Async variant of generate()."""
+    if not retrieved:
+        return REFUSAL_TEXT, False, {}
+
+    with stage("cache"):
+        key, cached = lookup_answer(query, retrieved)
+    if cached is not None:
+        return cached, True, {}
+
+    with stage("context"):
+        context, usage = format_context(retrieved)
+
+    with stage("generate"):
+        answer = (await _llm.ainvoke(build_prompt(query, context))).content.strip()
+
+    store_answer(key, answer)
+
+    return answer, False, usage
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def log_record(
+    request_id: str,
+    response: QueryResponse,
+    latency: float,
+    endpoint: str,
+    stages: Dict[str, float] | None = None,
+    **extra: Any,
+) -> Dict[str, Any]:
+    """Build the query log record and update the request metrics."""
+    REQUEST_SECONDS.labels(endpoint=endpoint).observe(latency)
+
+    if response.refused:
+        REFUSALS.labels(reason=response.refusal_reason or "unknown").inc()
+
+    payload = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "request_id": request_id,
+        "endpoint": endpoint,
+        "query": response.query,
+        "answer": response.answer,
+        "refused": response.refused,
+        "refusal_reason": response.refusal_reason,
+        "sources": [
+            {"source": s.source, "distance": s.distance}
+            for s in response.sources
+        ],
+        "num_chunks": len(response.sources),
+        "latency_sec": latency,
+        "stage_sec": stages or {},
+        "embed_model": EMBED_MODEL,
+        "llm_model": LLM_MODEL,
+        "k": K,
+        "max_distance": MAX_DISTANCE,
+        "context_token_budget": CONTEXT_TOKEN_BUDGET,
+        "hybrid": _lexical_index is not None,
+        **extra,
+    }
+
+    return payload
+
+
+def log_response(*args: Any, **kwargs: Any) -> None:
+    """Write the query log record and update the request metrics."""
+    payload = log_record(*args, **kwargs)
+
+    with stage("log"):
+        log_query(payload)
+
+
+async def alog_response(*args: Any, **kwargs: Any) -> None:
+    """log_response for the async endpoints; never waits on the event loop."""
+    payload = log_record(*args, **kwargs)
+
+    with stage("log"):
+        if _log_writer is not None:
+            await _log_writer.awrite(payload)
+        else:
+            await run_in_threadpool(log_query, payload)
+
+
 def log_query(payload: Dict[str, Any]) -> None:
+    if _log_writer is not None:
+        _log_writer.write(payload)
+        return
+
+    # No background writer (app not started, e.g. scripts): write inline.
     LOG_DIR.mkdir(parents=True, exist_ok=True)
+    rotate_if_due(LOG_FILE, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL_SEC)
 
     with open(LOG_FILE, "a", encoding="utf-8") as f:
         f.write(json.dumps(payload, ensure_ascii=False) + "\n")
@@ -121,22 +656,147 @@ def log_query(payload: Dict[str, Any]) -> None:
 # -------------------------
 # Startup
 # -------------------------
-@app.on_event("startup")
-def startup() -> None:
-    global _vectordb, _llm
-
-    embeddings = OpenAIEmbeddings(model=EMBED_MODEL)
+def open_vectordb(embeddings: CachedEmbeddings) -> Chroma | NumpyVectorStore:
+    if RETRIEVAL_BACKEND == "numpy":
+        return NumpyVectorStore(
+            NUMPY_STORE_DIR,
+            embeddings=embeddings,
+            quantization=VECTOR_QUANTIZATION,
+            rescore_factor=RESCORE_FACTOR,
+        )
 
-    _vectordb = Chroma(
+    return Chroma(
         persist_directory=str(PERSIST_DIR),
         embedding_function=embeddings,
     )
 
-    _llm = ChatOpenAI(
-        model=LLM_MODEL,
-        temperature=0.0,
+
+def numpy_store_stale() -> bool:
+    """True once a new NumPy export has replaced the one that is open."""
+    if not isinstance(_vectordb, NumpyVectorStore):
+        return False
+
+    version = vectorstore_version(_vectordb.store_dir, marker=META_FILE)
+    return version is not None and version != _vectordb_version
+
+
+def refresh_vectordb() -> None:
+    """
+    Reopen the NumPy store after scripts.export_numpy_store publishes a
+    new export (meta.json changed). Requests already holding the old
+    store finish on it; its mapped files stay valid after deletion.
+    """
+    global _vectordb, _vectordb_version
+
+    if not numpy_store_stale():
+        return
+
+    with _vectordb_lock:
+        if not numpy_store_stale():
+            return
+
+        old = _vectordb
+        store = NumpyVectorStore(
+            old.store_dir,
+            embeddings=old.embeddings,
+            quantization=old.quantization,
+            rescore_factor=old.rescore_factor,
+        )
+
+        _vectordb_version = vectorstore_version(store.files_dir, marker=META_FILE)
+        _vectordb = store
+
+    logger.info("Reopened NumPy store %s (%d rows)", store.files_dir, store.count())
+
+
+async def arefresh_vectordb() -> None:
+    # The staleness check is one stat(); reopening reads docs.jsonl, so
+    # it runs off the event loop.
+    if numpy_store_stale():
+        await run_in_threadpool(refresh_vectordb)
+
+
+def init_services(
+    base_embeddings: Embeddings,
+    llm: Any,
+    make_vectordb: Callable[[CachedEmbeddings], Chroma | NumpyVectorStore] = open_vectordb,
+) -> None:
+    """
+    Build the caches, log writer, vector store and lexical index around
+    the given models.
+
+    startup() passes the OpenAI clients; the load-test app in benchmarks/
+    passes offline stand-ins and its own vector store. A token counter
+    installed with context_budget.set_token_counter() beforehand is kept.
+    """
+    global _vectordb, _vectordb_version, _lexical_index, _embeddings, _embedding_cache, _answer_cache, _log_writer, _llm
+
+    _log_writer = BufferedLogWriter(
+        LOG_FILE,
+        max_queue=LOG_QUEUE_SIZE,
+        batch_size=LOG_BATCH_SIZE,
+        flush_interval_sec=LOG_FLUSH_INTERVAL_SEC,
+        policy=LOG_FULL_POLICY,
+        max_bytes=LOG_MAX_BYTES,
+        rotate_interval_sec=LOG_ROTATE_INTERVAL_SEC,
+    )
+    _log_writer.start()
+
+    _embedding_cache = EmbeddingCache(
+        max_size=EMBED_CACHE_SIZE,
+        ttl_sec=EMBED_CACHE_TTL_SEC,
+        disk_path=Path(EMBED_CACHE_PATH) if EMBED_CACHE_PATH else None,
+    )
+
+    _answer_cache = AnswerCache(
+        max_entries=ANSWER_CACHE_SIZE,
+        max_bytes=ANSWER_CACHE_MAX_BYTES,
     )
 
+    _embeddings = CachedEmbeddings(
+        base_embeddings,
+        cache=_embedding_cache,
+        model=EMBED_MODEL,
+    )
+
+    _vectordb = make_vectordb(_embeddings)
+
+    if isinstance(_vectordb, NumpyVectorStore):
+        _vectordb_version = vectorstore_version(_vectordb.files_dir, marker=META_FILE)
+
+    if HYBRID_RETRIEVAL and (LEXICAL_INDEX_DIR / LEXICAL_META_FILE).exists():
+        _lexical_index = LexicalIndex(LEXICAL_INDEX_DIR)
+
+    _llm = llm
+
+    # Load the tokenizer now rather than on the first request (it may
+    # download the encoding, or fall back to an estimate when offline).
+    load_token_counter()
+
+    STATS.add("embedding", lambda: _embedding_cache.stats() if _embedding_cache else None)
+    STATS.add("answer", lambda: _answer_cache.stats() if _answer_cache else None)
+    STATS.add("query_log", lambda: _log_writer.stats() if _log_writer else None)
+
+
+@app.on_event("startup")
+def startup() -> None:
+    init_services(
+        OpenAIEmbeddings(model=EMBED_MODEL),
+        ChatOpenAI(
+            model=LLM_MODEL,
+            temperature=0.0,
+        ),
+    )
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    if _log_writer is not None:
+        _log_writer.close()
+
+    if _embedding_cache is not None:
+        _embedding_cache.close()
+
 
 # -------------------------
 # Endpoints
@@ -144,117 +804,277 @@ def startup() -> None:
 @app.get("/health")
 def health() -> Dict[str, Any]:
     ok = _vectordb is not None and _llm is not None
-    count = _vectordb._collection.count() if _vectordb else 0
+    if isinstance(_vectordb, NumpyVectorStore):
+        count = _vectordb.count()
+        vector_memory = _vectordb.stats()
+    else:
+        count = _vectordb._collection.count() if _vectordb else 0
+        vector_memory = None
 
     return {
         "ok": ok,
+        "retrieval_backend": RETRIEVAL_BACKEND,
         "collection_count": count,
+        "lexical_index_count": _lexical_index.count() if _lexical_index else None,
+        "vector_memory": vector_memory,
+        "embedding_cache": _embedding_cache.stats() if _embedding_cache else None,
+        "answer_cache": _answer_cache.stats() if _answer_cache else None,
+        "query_log": _log_writer.stats() if _log_writer else None,
     }
 
 
-@app.post("/query", response_model=QueryResponse)
-def query_endpoint(req: QueryRequest) -> QueryResponse:
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus metrics: stage and request latency histograms, refusals, errors, cache counters."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
 
-    if _vectordb is None or _llm is None:
+
+@app.post("/query", response_model=QueryResponse)
+async def query_endpoint(req: QueryRequest) -> QueryResponse:
+    """
+    Async request path: embedding and generation are awaited, and the
+    Chroma search runs in the threadpool, so a single worker can keep
+    many requests in flight while they wait on OpenAI.
+    """
+
+    if _vectordb is None or _embeddings is None or _llm is None:
         raise HTTPException(status_code=503, detail="Service not ready")
 
     start_time = time.time()
     request_id = str(uuid.uuid4())
+    timer = start_timer()
 
     q = req.query.strip()
-    retrieved = retrieve(_vectordb, q, k=K)
+    await arefresh_vectordb()
+    retrieved = await aretrieve(_vectordb, _embeddings, q, k=K)
 
-    # -------------------------
-    # Refusal: no retrieval
-    # -------------------------
-    if not retrieved:
+    answer, cache_hit, usage = await agenerate(q, retrieved)
 
-        latency = time.time() - start_time
+    response = build_response(q, answer, retrieved)
 
-        refusal_reason = "no_relevant_chunks"
+    await alog_response(
+        request_id,
+        response,
+        time.time() - start_time,
+        endpoint="/query",
+        stages=timer.rounded(),
+        cache_hit=cache_hit,
+        **usage,
+    )
 
-        response = QueryResponse(
-            query=q,
-            refused=True,
-            answer=REFUSAL_TEXT,
-            sources=[],
-            refusal_reason=refusal_reason,
-        )
+    return response
+
+
+@app.post("/query/stream")
+async def query_stream_endpoint(req: QueryRequest) -> StreamingResponse:
+    """
+    Stream the answer as server-sent events.
+
+    Events, in order:
+    - sources: retrieved sources, sent before generation starts
+    - token: answer text as the LLM produces it (one or more)
+    - error: only if generation fails; the done event then reports a
+      "generation_error" refusal
+    - done: refusal flags, cache hit, time to first token and latency
+    """
 
-        log_query({
-            "ts": datetime.now(timezone.utc).isoformat(),
+    if _vectordb is None or _embeddings is None or _llm is None:
+        raise HTTPException(status_code=503, detail="Service not ready")
+
+    start_time = time.time()
+    request_id = str(uuid.uuid4())
+    timer = start_timer()
+
+    q = req.query.strip()
+    await arefresh_vectordb()
+    retrieved = await aretrieve(_vectordb, _embeddings, q, k=K)
+
+    async def events() -> AsyncIterator[str]:
+        yield sse_event("sources", {
             "request_id": request_id,
             "query": q,
-            "answer": response.answer,
-            "refused": True,
-            "refusal_reason": refusal_reason,
-            "sources": [],
-            "num_chunks": 0,
+            "sources": [s.model_dump() for s in build_sources(retrieved)],
+        })
+
+        ttft: float | None = None
+        cache_hit = False
+        usage: Dict[str, Any] = {}
+        error: str | None = None
+
+        if not retrieved:
+            answer = REFUSAL_TEXT
+        else:
+            with timer.stage("cache"):
+                key, cached = lookup_answer(q, retrieved)
+
+            if cached is not None:
+                answer = cached
+                cache_hit = True
+            else:
+                parts: List[str] = []
+                with timer.stage("context"):
+                    context, usage = format_context(retrieved)
+
+                try:
+                    # Includes handing each token to the response, which only
+                    # waits when the client stops reading.
+                    with timer.stage("generate"):
+                        async for chunk in _llm.astream(build_prompt(q, context)):
+                            if not chunk.content:
+                                continue
+
+                            if ttft is None:
+                                ttft = time.time() - start_time
+
+                            parts.append(chunk.content)
+                            yield sse_event("token", {"text": chunk.content})
+
+                except Exception as e:
+                    logger.exception("Stream %s: generation failed", request_id)
+                    error = str(e)
+                    yield sse_event("error", {"error": error})
+
+                answer = "".join(parts).strip()
+                if error is None:
+                    store_answer(key, answer)
+
+        if error is not None:
+            response = error_response(q)
+            usage = {**usage, "error": error}
+        else:
+            if ttft is None:
+                # Refusal or cache hit: the whole answer goes out as one token.
+                ttft = time.time() - start_time
+                yield sse_event("token", {"text": answer})
+
+            response = build_response(q, answer, retrieved)
+
+        latency = time.time() - start_time
+
+        yield sse_event("done", {
+            "refused": response.refused,
+            "refusal_reason": response.refusal_reason,
+            "cache_hit": cache_hit,
+            "ttft_sec": ttft,
             "latency_sec": latency,
-            "embed_model": EMBED_MODEL,
-            "llm_model": LLM_MODEL,
-            "k": K,
-            "max_distance": MAX_DISTANCE,
         })
 
-        return response
+        await alog_response(
+            request_id,
+            response,
+            latency,
+            endpoint="/query/stream",
+            stages=timer.rounded(),
+            cache_hit=cache_hit,
+            stream=True,
+            ttft_sec=ttft,
+            **usage,
+        )
 
-    # -------------------------
-    # Generation
-    # -------------------------
-    context = format_context(retrieved)
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    prompt = f"""
-You are a careful RAG assistant.
 
-Answer the user's question using ONLY the provided context.
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch_endpoint(req: BatchQueryRequest) -> BatchQueryResponse:
+    """
+    Answer many queries in one request.
 
-If the context is insufficient, respond with exactly:
-"I don't have enough relevant context to answer confidently."
+    All queries are embedded in a single call and searched together;
+    generations run concurrently, at most BATCH_MAX_CONCURRENCY at a time.
+    Each query is logged exactly like a /query request. A query whose
+    generation fails is returned as a refusal with refusal_reason
+    "generation_error"; the rest of the batch is still answered.
+    """
 
-Question:
-{q}
+    if _vectordb is None or _embeddings is None or _llm is None:
+        raise HTTPException(status_code=503, detail="Service not ready")
 
-Context:
-{context}
+    start_time = time.time()
+    batch_id = str(uuid.uuid4())
+    batch_timer = start_timer()
+
+    queries = [q.strip() for q in req.queries]
+    await arefresh_vectordb()
+    retrieved_per_query = await aretrieve_batch(_vectordb, _embeddings, queries, k=K)
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def answer_one(
+        q: str,
+        retrieved: List[Tuple[Document, float]],
+    ) -> QueryResponse:
+        # Each task runs in a copy of the request context, so this timer
+        # only sees this query's stages; embed and search are shared.
+        timer = start_timer()
+
+        try:
+            async with semaphore:
+                answer, cache_hit, usage = await agenerate(q, retrieved)
+
+            response = build_response(q, answer, retrieved)
+
+        except Exception as e:
+            logger.exception("Batch %s: generation failed for one query", batch_id)
+            response = error_response(q)
+            cache_hit, usage = False, {"error": str(e)}
+
+        await alog_response(
+            str(uuid.uuid4()),
+            response,
+            time.time() - start_time,
+            endpoint="/query/batch",
+            stages={**batch_timer.rounded(), **timer.rounded()},
+            cache_hit=cache_hit,
+            batch_id=batch_id,
+            **usage,
+        )
 
-Answer:
-""".strip()
+        return response
 
-    answer = _llm.invoke(prompt).content.strip()
+    results = await asyncio.gather(*(
+        answer_one(q, retrieved)
+        for q, retrieved in zip(queries, retrieved_per_query)
+    ))
 
-    sources = build_sources(retrieved)
+    return BatchQueryResponse(results=list(results))
 
-    refused = answer.strip() == REFUSAL_TEXT
-    refusal_reason = "llm_self_refusal" if refused else None
 
-    latency = time.time() - start_time
+@app.post("/query/sync", response_model=QueryResponse)
+def query_sync_endpoint(req: QueryRequest) -> QueryResponse:
+    """
+    Original blocking request path, kept as a baseline for benchmarks.
 
-    response = QueryResponse(
-        query=q,
-        refused=refused,
-        answer=answer,
-        sources=sources,
-        refusal_reason=refusal_reason,
-    )
+    Each request holds a threadpool worker for the full embedding,
+    search and generation round trip.
+    """
 
-    log_query({
-        "ts": datetime.now(timezone.utc).isoformat(),
-        "request_id": request_id,
-        "query": q,
-        "answer": answer,
-        "refused": refused,
-        "refusal_reason": refusal_reason,
-        "sources": [
-            {"source": s.source, "distance": s.distance}
-            for s in sources
-        ],
-        "num_chunks": len(sources),
-        "latency_sec": latency,
-        "embed_model": EMBED_MODEL,
-        "llm_model": LLM_MODEL,
-        "k": K,
-        "max_distance": MAX_DISTANCE,
-    })
+    if _vectordb is None or _llm is None:
+        raise HTTPException(status_code=503, detail="Service not ready")
+
+    start_time = time.time()
+    request_id = str(uuid.uuid4())
+    timer = start_timer()
+
+    q = req.query.strip()
+    refresh_vectordb()
+    retrieved = retrieve(_vectordb, q, k=K)
+
+    answer, cache_hit, usage = generate(q, retrieved)
+
+    response = build_response(q, answer, retrieved)
+
+    log_response(
+        request_id,
+        response,
+        time.time() - start_time,
+        endpoint="/query/sync",
+        stages=timer.rounded(),
+        cache_hit=cache_hit,
+        **usage,
+    )
 
-    return response
\ No newline at end of file
+    return response
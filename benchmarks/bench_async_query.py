@@ -0,0 +1,133 @@
+"""
+Benchmark: async /query vs the blocking /query/sync baseline.
+
+Runs the real FastAPI app in-process (ASGI transport, no sockets) with
+fake embeddings / LLM that sleep to simulate OpenAI latency, and token
+counts estimated from text length, then fires N requests with a fixed
+number in flight against each path. Runs fully offline.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_async_query --requests 400 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+from typing import List
+
+import httpx
+
+from apps.rag import context_budget, rag_api
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, build_fake_vectordb
+
+
+QUERIES = [
+    "What is a retriever in LangChain?",
+    "How do agents decide which tool to call?",
+    "What is a vector store used for?",
+    "How does streaming work for chat models?",
+]
+
+
+def install_fakes(embed_latency: float, llm_latency: float, jitter: float) -> None:
+    embeddings = FakeEmbeddings()
+    vectordb = build_fake_vectordb(embeddings)
+
+    # Latency is switched on after the corpus is indexed.
+    embeddings.latency = embed_latency
+    embeddings.jitter = jitter
+
+    rag_api._embeddings = embeddings
+    rag_api._vectordb = vectordb
+    rag_api._llm = FakeChatModel(latency=llm_latency, jitter=jitter)
+
+    # Fake vectors are not calibrated to the real threshold; let every
+    # query reach generation so the full pipeline is exercised.
+    rag_api.MAX_DISTANCE = 4.0
+
+    # Count tokens without tiktoken, so nothing is downloaded.
+    context_budget.set_token_counter(context_budget.estimate_tokens)
+
+    log_dir = Path(tempfile.mkdtemp(prefix="rag_bench_"))
+    rag_api.LOG_DIR = log_dir
+    rag_api.LOG_FILE = log_dir / "rag_queries_v1.jsonl"
+
+
+async def run_path(path: str, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    transport = httpx.ASGITransport(app=rag_api.app)
+
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        timeout=None,
+    ) as client:
+
+        async def one(i: int) -> None:
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                resp = await client.post(
+                    path,
+                    json={"query": QUERIES[i % len(QUERIES)]},
+                )
+                latencies.append(time.perf_counter() - start)
+                if resp.status_code != 200:
+                    errors += 1
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+
+    return {
+        "path": path,
+        "wall_sec": wall,
+        "throughput_rps": total / wall,
+        "p50_sec": median(latencies),
+        "p95_sec": latencies[int(0.95 * (len(latencies) - 1))],
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    args = parser.parse_args()
+
+    install_fakes(args.embed_latency, args.llm_latency, args.jitter)
+
+    print("\n==== Async vs sync /query ====\n")
+    print(
+        f"requests={args.requests} concurrency={args.concurrency} "
+        f"embed_latency={args.embed_latency}s llm_latency={args.llm_latency}s\n"
+    )
+
+    for path in ["/query/sync", "/query"]:
+        result = asyncio.run(run_path(path, args.requests, args.concurrency))
+        print(
+            f"{result['path']:<12} "
+            f"wall={result['wall_sec']:.2f}s "
+            f"throughput={result['throughput_rps']:.1f} req/s "
+            f"p50={result['p50_sec']:.3f}s "
+            f"p95={result['p95_sec']:.3f}s "
+            f"errors={result['errors']}"
+        )
+
+    print("\n==============================\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: prompt savings from redundancy removal (MMR / per-source cap).
+
+Runs every query in evals/rag_eval_queries_v1.json through
+apps.rag.rag_api.retrieve() under several diversification settings and
+reports, per answerable query, the chunks and context size that would
+go into the prompt (tokens via format_context with no budget, so the
+budget does not hide the savings) and the retrieval hit rate.
+
+By default the vector side uses offline fake embeddings (no distance
+threshold) and token counts are estimated from text length. Pass
+--openai to use the persisted Chroma store, OpenAI embeddings and
+tiktoken's cl100k_base encoding.
+
+    python -m benchmarks.bench_diversify
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from apps.rag import context_budget, rag_api
+from benchmarks.bench_hybrid_retrieval import EVAL_FILE, open_vectordb
+
+
+SETTINGS = [
+    ("off", {"DIVERSIFY": False}),
+    ("mmr", {"DIVERSIFY": True}),
+    ("mmr dup>=0.9", {"DIVERSIFY": True, "DUPLICATE_SIMILARITY": 0.9}),
+    ("mmr cap=2", {"DIVERSIFY": True, "MAX_CHUNKS_PER_SOURCE": 2}),
+    ("mmr cap=1", {"DIVERSIFY": True, "MAX_CHUNKS_PER_SOURCE": 1}),
+]
+
+
+def run(vectordb, eval_data: list, overrides: Dict[str, Any]) -> Dict[str, float]:
+    defaults = {name: getattr(rag_api, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(rag_api, name, value)
+
+    chunks = chars = tokens = hits = 0
+    answerable = [case for case in eval_data if not case["must_refuse"]]
+
+    try:
+        for case in answerable:
+            results = rag_api.retrieve(vectordb, case["query"], k=rag_api.K)
+            context, usage = rag_api.format_context(results, budget=10 ** 9)
+
+            chunks += len(results)
+            chars += len(context)
+            tokens += usage["context_tokens"]
+
+            retrieved = {Path(doc.metadata.get("source", "")).name for doc, _ in results}
+            hits += bool(set(case["expected_sources"]) & retrieved)
+    finally:
+        for name, value in defaults.items():
+            setattr(rag_api, name, value)
+
+    n = len(answerable)
+    return {
+        "chunks": chunks / n,
+        "chars": chars / n,
+        "tokens": tokens / n,
+        "hits": hits,
+        "n": n,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--openai", action="store_true")
+    args = parser.parse_args()
+
+    with open(EVAL_FILE, "r", encoding="utf-8") as f:
+        eval_data = json.load(f)
+
+    if not args.openai:
+        context_budget.set_token_counter(context_budget.estimate_tokens)
+
+    vectordb = open_vectordb(args.openai)
+
+    print("\n==== Redundancy removal ====\n")
+    print(
+        f"k={rag_api.K} fetch_mult={rag_api.DIVERSIFY_FETCH_MULT} "
+        f"mmr_lambda={rag_api.MMR_LAMBDA} duplicate_similarity={rag_api.DUPLICATE_SIMILARITY}\n"
+    )
+
+    baseline = None
+
+    for label, overrides in SETTINGS:
+        result = run(vectordb, eval_data, overrides)
+        baseline = baseline or result
+
+        saved = 1 - result["tokens"] / baseline["tokens"] if baseline["tokens"] else 0.0
+        print(
+            f"{label:<14} chunks/query={result['chunks']:.2f} "
+            f"chars/query={result['chars']:.0f} "
+            f"tokens/query={result['tokens']:.0f} ({saved:+.0%} saved) "
+            f"hit_rate={result['hits']}/{result['n']}"
+        )
+
+    print("\n============================\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: ingestion embedding scheduler against a rate-limited fake server.
+
+Starts benchmarks.fake_embedding_server in-process on a free port, then
+embeds chunks.jsonl with the adaptive scheduler and reports throughput,
+429s and how concurrency adapted. With --crash-after the first run is
+aborted mid-way and a second run resumes from the checkpoint.
+
+    python -m benchmarks.bench_embedding_scheduler --rps 10 --concurrency 16
+"""
+
+import argparse
+import os
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+
+def start_server(port: int) -> None:
+    import uvicorn
+
+    from benchmarks.fake_embedding_server import app
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.05)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--random-429", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--crash-after", type=int, default=0)
+    args = parser.parse_args()
+
+    # Server config is read at import time.
+    os.environ["FAKE_EMBED_RPS"] = str(args.rps)
+    os.environ["FAKE_EMBED_429_RATE"] = str(args.random_429)
+
+    from benchmarks.fakes import load_chunk_texts
+    from scripts.embed_langchain_chunks import chunk_id
+    from scripts.embedding_scheduler import EmbeddingBatch, EmbeddingScheduler
+
+    port = free_port()
+    start_server(port)
+
+    rows = load_chunk_texts()
+    batches = [
+        EmbeddingBatch(
+            ids=[chunk_id(r["metadata"].get("source", ""), r["text"]) for r in chunk],
+            texts=[r["text"] for r in chunk],
+            metadatas=[r["metadata"] for r in chunk],
+        )
+        for chunk in (
+            rows[i:i + args.batch_size]
+            for i in range(0, len(rows), args.batch_size)
+        )
+    ]
+
+    checkpoint = Path(tempfile.mkdtemp(prefix="ingest_bench_")) / "checkpoint.jsonl"
+    written: List[int] = []
+    crash = {"armed": args.crash_after > 0}
+
+    def write_batch(batch: EmbeddingBatch, vectors: List[List[float]]) -> None:
+        if crash["armed"] and len(written) >= args.crash_after:
+            raise RuntimeError("simulated crash")
+        written.append(len(vectors))
+
+    def run(label: str) -> None:
+        scheduler = EmbeddingScheduler(
+            model="text-embedding-3-small",
+            write_batch=write_batch,
+            base_url=f"http://127.0.0.1:{port}/v1",
+            api_key="fake",
+            max_concurrency=args.concurrency,
+            checkpoint_path=checkpoint,
+        )
+
+        try:
+            stats = scheduler.run(batches)
+        except RuntimeError as e:
+            print(f"{label:<8} aborted: {e} ({sum(written)} chunks stored)")
+            return
+
+        print(
+            f"{label:<8} embedded={stats.embedded} skipped={stats.skipped} "
+            f"time={stats.elapsed_sec:.2f}s "
+            f"throughput={stats.embedded / stats.elapsed_sec:.0f} chunks/s "
+            f"429s={stats.rate_limited} retries={stats.retries} "
+            f"concurrency={stats.min_concurrency_seen}-{stats.max_concurrency_seen} "
+            f"(final {stats.final_concurrency})"
+        )
+
+    print("\n==== Embedding scheduler ====\n")
+    print(
+        f"chunks={len(rows)} batches={len(batches)} server_rps={args.rps} "
+        f"random_429={args.random_429} max_concurrency={args.concurrency}\n"
+    )
+
+    run("run")
+
+    if args.crash_after:
+        crash["armed"] = False
+        run("resume")
+
+    print("\n=============================\n")
+
+
+if __name__ == "__main__":
+    main()
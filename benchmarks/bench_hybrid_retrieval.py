@@ -0,0 +1,122 @@
+"""
+Benchmark: hybrid BM25 + vector retrieval vs vector-only retrieval.
+
+Builds the lexical index from chunks.jsonl into a temp dir, then reports:
+
+- BM25 lookup latency (p50/p95) over the eval queries
+- retrieval hit rate on evals/rag_eval_queries_v1.json at several k,
+  with and without fusion, through apps.rag.rag_api.retrieve()
+
+By default the vector side uses offline fake embeddings (no distance
+threshold, since fake distances are not on the OpenAI scale). Pass
+--openai to use the persisted Chroma store and OpenAI embeddings.
+
+    python -m benchmarks.bench_hybrid_retrieval --ks 3,5
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from apps.rag import rag_api
+from apps.rag.lexical_index import LexicalIndex
+from benchmarks.fakes import CHUNKS_FILE, FakeEmbeddings, build_fake_vectordb
+from scripts.build_lexical_index import build
+
+
+EVAL_FILE = Path(rag_api.BASE_DIR) / "evals/rag_eval_queries_v1.json"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def open_vectordb(use_openai: bool):
+    if not use_openai:
+        rag_api.MAX_DISTANCE = 4.0  # squared L2 between unit vectors never exceeds 4
+        return build_fake_vectordb(FakeEmbeddings())
+
+    from langchain_chroma import Chroma
+    from langchain_openai import OpenAIEmbeddings
+
+    return Chroma(
+        persist_directory=str(rag_api.PERSIST_DIR),
+        embedding_function=OpenAIEmbeddings(model=rag_api.EMBED_MODEL),
+    )
+
+
+def hit_rate(vectordb, eval_data: List[dict], k: int) -> tuple:
+    hits = 0
+    refusals_ok = 0
+
+    for case in eval_data:
+        results = rag_api.retrieve(vectordb, case["query"], k=k)
+        retrieved = {Path(doc.metadata.get("source", "")).name for doc, _ in results}
+
+        if case["must_refuse"]:
+            refusals_ok += not results
+        elif set(case["expected_sources"]) & retrieved:
+            hits += 1
+
+    return hits, refusals_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ks", default="3,5")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--openai", action="store_true")
+    args = parser.parse_args()
+
+    with open(EVAL_FILE, "r", encoding="utf-8") as f:
+        eval_data = json.load(f)
+
+    index_dir = Path(tempfile.mkdtemp(prefix="lexical_index_"))
+
+    start = time.perf_counter()
+    count = build(CHUNKS_FILE, index_dir)
+    build_sec = time.perf_counter() - start
+
+    index = LexicalIndex(index_dir)
+
+    print("\n==== Hybrid retrieval ====\n")
+    print(f"chunks={count} index_build={build_sec * 1000:.0f}ms\n")
+
+    # ---------- BM25 latency ----------
+    latencies: List[float] = []
+    for _ in range(args.repeats):
+        for case in eval_data:
+            start = time.perf_counter()
+            index.search(case["query"], rag_api.HYBRID_CANDIDATES)
+            latencies.append(time.perf_counter() - start)
+
+    print(
+        f"BM25 lookup: p50={percentile(latencies, 50) * 1000:.3f}ms "
+        f"p95={percentile(latencies, 95) * 1000:.3f}ms "
+        f"({len(latencies)} lookups)\n"
+    )
+
+    # ---------- Hit rate ----------
+    vectordb = open_vectordb(args.openai)
+    answerable = sum(not case["must_refuse"] for case in eval_data)
+    must_refuse = len(eval_data) - answerable
+
+    for k in [int(k) for k in args.ks.split(",")]:
+        for label, lexical in (("vector", None), ("hybrid", index)):
+            rag_api._lexical_index = lexical
+            hits, refusals_ok = hit_rate(vectordb, eval_data, k)
+            print(
+                f"k={k} {label:<7} hit_rate={hits}/{answerable} "
+                f"correct_refusals={refusals_ok}/{must_refuse}"
+            )
+
+    rag_api._lexical_index = None
+    print("\n==========================\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: peak memory of ingestion, eager list vs streaming generators.
+
+Generates a synthetic chunks.jsonl of the requested size, then runs the
+ingestion read -> batch -> embed -> write pipeline twice, each in a fresh
+subprocess, and reports peak RSS:
+
+- eager:     materialize every Document first (the old embed script)
+- streaming: iter_chunks -> make_batches -> EmbeddingScheduler
+
+Embedding is stubbed (no network) so only the pipeline's own memory shows.
+
+    python -m benchmarks.bench_ingest_memory --size-gb 2
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+
+WORDS = (
+    "agent retriever vector store embedding chunk token prompt model tool "
+    "graph node edge state memory context query answer source document "
+    "index search score distance threshold batch stream cache latency"
+).split()
+
+
+def generate_corpus(path: Path, size_bytes: int, seed: int = 0) -> int:
+    """Write synthetic ~3 KB chunks until the file reaches size_bytes."""
+    rng = random.Random(seed)
+    pool = [" ".join(rng.choices(WORDS, k=450)) for _ in range(256)]
+
+    rows = 0
+    written = 0
+
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size_bytes:
+            line = json.dumps({
+                "text": f"{pool[rows % len(pool)]} #{rows}",
+                "metadata": {"source": f"synthetic/doc_{rows // 20}.mdx"},
+            }) + "\n"
+            f.write(line)
+            written += len(line)
+            rows += 1
+
+    return rows
+
+
+def run_child(mode: str, corpus: Path) -> None:
+    from scripts.embed_langchain_chunks import iter_chunks, make_batches
+    from scripts.embedding_scheduler import EmbeddingBatch, EmbeddingScheduler
+
+    class OfflineScheduler(EmbeddingScheduler):
+        async def _embed(self, client, texts: List[str]) -> List[List[float]]:
+            return [[0.0] * 8 for _ in texts]
+
+    written = 0
+
+    def write_batch(batch: EmbeddingBatch, vectors: List[List[float]]) -> None:
+        nonlocal written
+        written += len(vectors)
+
+    start = time.perf_counter()
+
+    docs = iter_chunks(corpus)
+    if mode == "eager":
+        docs = list(docs)
+
+    scheduler = OfflineScheduler(
+        model="fake",
+        write_batch=write_batch,
+        base_url="http://127.0.0.1:1",
+        api_key="fake",
+    )
+    scheduler.run(make_batches(docs))
+
+    print(json.dumps({
+        "mode": mode,
+        "chunks": written,
+        "elapsed_sec": time.perf_counter() - start,
+        # Linux reports ru_maxrss in KiB.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-gb", type=float, default=2.0)
+    parser.add_argument("--corpus", type=Path, default=None)
+    parser.add_argument("--modes", default="streaming,eager")
+    parser.add_argument("--child", choices=["eager", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.corpus)
+        return
+
+    corpus = args.corpus
+    generated = corpus is None
+
+    if generated:
+        corpus = Path(tempfile.mkdtemp(prefix="ingest_mem_")) / "chunks.jsonl"
+        print(f"Generating {args.size_gb:.1f} GB synthetic corpus → {corpus}")
+        rows = generate_corpus(corpus, int(args.size_gb * 1024 ** 3))
+        print(f"Wrote {rows} chunks\n")
+
+    print("==== Ingestion peak memory ====\n")
+    print(f"corpus={corpus} size={corpus.stat().st_size / 1024 ** 2:.0f} MB\n")
+
+    for mode in args.modes.split(","):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_ingest_memory",
+             "--child", mode, "--corpus", str(corpus)],
+            capture_output=True,
+            text=True,
+        )
+
+        if proc.returncode != 0:
+            print(f"{mode:<10} failed (exit {proc.returncode}): {proc.stderr.strip()[-200:]}")
+            continue
+
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(
+            f"{mode:<10} chunks={result['chunks']} "
+            f"time={result['elapsed_sec']:.1f}s "
+            f"peak_rss={result['peak_rss_mb']:.0f} MB"
+        )
+
+    print("\n===============================\n")
+
+    if generated:
+        corpus.unlink()
+
+
+if __name__ == "__main__":
+    main()
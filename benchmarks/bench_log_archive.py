@@ -0,0 +1,200 @@
+"""
+Benchmark: disk size and scan speed of query-log formats.
+
+Writes one deterministic synthetic query log shaped like the records
+rag_api.log_response() writes (sources, stage timings, model settings,
+answer text), then stores it as:
+
+- jsonl          the live / freshly rotated format
+- jsonl.gz       gzip-compressed JSONL
+- npz            columnar archive from compact_log() (answers dropped)
+- npz+answers    the same, with the answer text kept
+
+and reports, per format, the size on disk, the time to write it, and
+two scans:
+
+- analyze   the full evals.analyze_query_logs pass over the records
+- columns   latency p50/p95/p99 and refusal rate only: JSON formats parse
+            every line, the archive loads just those two arrays
+
+    python -m benchmarks.bench_log_archive --records 200000
+"""
+
+import argparse
+import gzip
+import json
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+from apps.rag.query_log import compact_log, iter_log_records
+from evals.analyze_query_logs import analyze
+
+
+WORDS = (
+    "the a to of and in is for with on retriever chain agent tool model "
+    "prompt vector store embedding chunk document query memory callback "
+    "runnable stream async batch output parser message chat llm index"
+).split()
+
+REFUSAL_REASONS = ["low_relevance", "no_results", "empty_query"]
+
+
+# -------------------------
+# Synthetic log
+# -------------------------
+def synthetic_records(n: int, seed: int) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    queries = [" ".join(rng.choices(WORDS, k=rng.randint(4, 12))) + "?" for _ in range(2000)]
+    docs = [f"data/raw/langchain_docs/page_{i}.md" for i in range(300)]
+    start = datetime(2026, 10, 1, tzinfo=timezone.utc).timestamp()
+
+    for i in range(n):
+        refused = rng.random() < 0.1
+        sources = [] if refused else [
+            {"source": doc, "distance": round(rng.uniform(0.5, 1.05), 6)}
+            for doc in rng.sample(docs, 5)
+        ]
+        stages = {"embed": rng.uniform(0.02, 0.2), "retrieve": rng.uniform(0.001, 0.02)}
+        if not refused:
+            stages["generate"] = rng.lognormvariate(0, 0.5)
+        stages["log"] = rng.uniform(0.00001, 0.0001)
+
+        yield {
+            "ts": datetime.fromtimestamp(start + i * 0.25, timezone.utc).isoformat(),
+            "request_id": f"{rng.getrandbits(64):016x}",
+            "endpoint": "/query" if rng.random() < 0.8 else "/query/stream",
+            "query": rng.choice(queries),
+            "answer": "I don't have enough relevant context to answer that." if refused
+            else " ".join(rng.choices(WORDS, k=rng.randint(40, 160))),
+            "refused": refused,
+            "refusal_reason": rng.choice(REFUSAL_REASONS) if refused else None,
+            "sources": sources,
+            "num_chunks": len(sources),
+            "latency_sec": sum(stages.values()),
+            "stage_sec": stages,
+            "embed_model": "text-embedding-3-small",
+            "llm_model": "gpt-4o-mini",
+            "k": 5,
+            "max_distance": 1.05,
+            "context_token_budget": 3000,
+            "hybrid": True,
+            "cache_hit": rng.random() < 0.2,
+        }
+
+
+# -------------------------
+# Formats
+# -------------------------
+def write_jsonl(records: List[Dict[str, Any]], path: Path) -> Path:
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
+
+
+def write_gzip(jsonl: Path, path: Path) -> Path:
+    with open(jsonl, "rb") as src, gzip.open(path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    return path
+
+
+def write_archive(jsonl: Path, work: Path, keep_answers: bool) -> Path:
+    copy = work / ("answers" if keep_answers else "plain") / jsonl.name
+    copy.parent.mkdir()
+    shutil.copy(jsonl, copy)
+    return compact_log(copy, keep_answers=keep_answers)
+
+
+# -------------------------
+# Scans
+# -------------------------
+def scan_analyze(path: Path) -> int:
+    return analyze(iter_log_records([path]), group_by=["endpoint"], window_sec=60.0, top=10)["overall"].count
+
+
+def scan_columns(path: Path) -> Dict[str, float]:
+    if path.suffix == ".npz":
+        # NpzFile decompresses only the members that are accessed.
+        with np.load(path) as data:
+            latency = data["latency_sec"]
+            refused = data["refused"].astype(bool)
+    else:
+        latency_list, refused_list = [], []
+        for record in iter_log_records([path]):
+            latency_list.append(record["latency_sec"])
+            refused_list.append(record["refused"])
+        latency = np.array(latency_list)
+        refused = np.array(refused_list)
+
+    p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "refusal_rate": float(refused.mean())}
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+# -------------------------
+# Main
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Query-log format size and scan benchmark.")
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    records = list(synthetic_records(args.records, args.seed))
+    work = Path(tempfile.mkdtemp(prefix="bench_log_archive_"))
+
+    try:
+        jsonl, jsonl_sec = timed(write_jsonl, records, work / "rag_queries_v1.jsonl.20261001T000000")
+        del records
+
+        formats = [("jsonl", jsonl, jsonl_sec)]
+        for name, fn, fn_args in [
+            ("jsonl.gz", write_gzip, (jsonl, work / (jsonl.name + ".gz"))),
+            ("npz", write_archive, (jsonl, work, False)),
+            ("npz+answers", write_archive, (jsonl, work, True)),
+        ]:
+            path, sec = timed(fn, *fn_args)
+            formats.append((name, path, sec))
+
+        print(f"\n==== Query log formats ({args.records} records) ====\n")
+        print(f"{'format':<12} {'size':>10} {'ratio':>7} {'write':>8} {'analyze':>9} {'columns':>9}")
+
+        base = jsonl.stat().st_size
+        reference = None
+
+        for name, path, write_sec in formats:
+            count, analyze_sec = timed(scan_analyze, path)
+            stats, columns_sec = timed(scan_columns, path)
+
+            assert count == args.records, f"{name}: read {count} records"
+            reference = reference or stats
+            assert all(abs(stats[key] - reference[key]) < 1e-9 for key in stats), f"{name}: results differ"
+
+            size = path.stat().st_size
+            print(
+                f"{name:<12} {size / 1e6:>8.1f}MB {base / size:>6.1f}x {write_sec:>7.2f}s "
+                f"{analyze_sec:>8.2f}s {columns_sec:>8.3f}s"
+            )
+
+        print(
+            f"\nlatency p50/p95/p99 = {reference['p50']:.3f}/{reference['p95']:.3f}/{reference['p99']:.3f}s "
+            f"refusal rate = {reference['refusal_rate']:.1%} (identical across formats)"
+        )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
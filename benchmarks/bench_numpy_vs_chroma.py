@@ -0,0 +1,120 @@
+"""
+Benchmark: NumPy exact-search backend vs Chroma, single-query latency.
+
+For each corpus size, synthetic unit vectors are loaded into an in-memory
+Chroma collection, exported with apps.rag.numpy_store.export_collection,
+and the same perturbed-corpus queries are run through both backends.
+Also reports top-k agreement and the largest distance difference, to
+confirm MAX_DISTANCE keeps its meaning.
+
+    python -m benchmarks.bench_numpy_vs_chroma --sizes 675,10000,50000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from apps.rag.numpy_store import NumpyVectorStore, export_collection
+
+
+def synthetic_vectors(n: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def percentile(values: List[float], pct: float) -> float:
+    return float(np.percentile(np.asarray(values), pct))
+
+
+def build_chroma(vectors: np.ndarray, name: str):
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(name)
+
+    for start in range(0, len(vectors), 5000):
+        batch = vectors[start:start + 5000]
+        collection.add(
+            ids=[f"chunk-{i}" for i in range(start, start + len(batch))],
+            embeddings=batch.tolist(),
+            documents=[f"synthetic chunk {i}" for i in range(start, start + len(batch))],
+            metadatas=[{"source": f"doc_{i // 20}.mdx"} for i in range(start, start + len(batch))],
+        )
+
+    return collection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="675,10000,50000")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    print("\n==== NumPy vs Chroma retrieval ====\n")
+    print(f"dim={args.dim} queries={args.queries} k={args.k}\n")
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        vectors = synthetic_vectors(size, args.dim, seed=size)
+
+        rng = np.random.default_rng(0)
+        picks = rng.integers(0, size, args.queries)
+        # Noise of norm ~0.5 keeps each query near, but not on, a corpus row.
+        noise = rng.standard_normal((args.queries, args.dim), dtype=np.float32) * (0.5 / np.sqrt(args.dim))
+        queries = vectors[picks] + noise
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        collection = build_chroma(vectors, f"bench_{size}_{int(time.time())}")
+
+        store_dir = Path(tempfile.mkdtemp(prefix="numpy_store_"))
+        export_collection(collection, store_dir)
+        store = NumpyVectorStore(store_dir)
+
+        chroma_lat: List[float] = []
+        numpy_lat: List[float] = []
+        agreement = 0
+        max_diff = 0.0
+
+        for query in queries:
+            start = time.perf_counter()
+            chroma = collection.query(
+                query_embeddings=[query.tolist()],
+                n_results=args.k,
+                include=["documents", "metadatas", "distances"],
+            )
+            chroma_lat.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            exact = store.search_by_vector(query, args.k)
+            numpy_lat.append(time.perf_counter() - start)
+
+            chroma_hits = dict(zip(chroma["ids"][0], chroma["distances"][0]))
+            exact_hits = {doc.id: dist for doc, dist in exact}
+
+            shared = chroma_hits.keys() & exact_hits.keys()
+            agreement += len(shared)
+            for doc_id in shared:
+                max_diff = max(max_diff, abs(chroma_hits[doc_id] - exact_hits[doc_id]))
+
+        print(
+            f"n={size:<8} "
+            f"chroma p50={percentile(chroma_lat, 50) * 1000:.2f}ms "
+            f"p95={percentile(chroma_lat, 95) * 1000:.2f}ms | "
+            f"numpy p50={percentile(numpy_lat, 50) * 1000:.2f}ms "
+            f"p95={percentile(numpy_lat, 95) * 1000:.2f}ms | "
+            f"top-{args.k} agreement={agreement / (args.queries * args.k):.1%} "
+            f"max |Δdistance|={max_diff:.2e}"
+        )
+
+    print("\n===================================\n")
+
+
+if __name__ == "__main__":
+    main()
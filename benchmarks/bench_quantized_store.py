@@ -0,0 +1,106 @@
+"""
+Benchmark: float16 / int8 quantized NumPy store vs the float32 baseline.
+
+Writes a synthetic store (unit vectors, dim 1536) for each corpus size
+and runs the same perturbed-corpus queries through every quantization
+mode. Reports the vector memory each query scans, p50 latency and
+recall@k against exact float32 search. Returned distances are always
+exact (rescored in float32); recall shows how often the quantized scan
+still put the true top-k inside the rescoring window.
+
+    python -m benchmarks.bench_quantized_store --sizes 10000,100000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from apps.rag.numpy_store import QUANTIZATIONS, NumpyVectorStore, StoreWriter
+
+
+def write_synthetic_store(out_dir: Path, n: int, dim: int, seed: int) -> np.ndarray:
+    """
+    Clustered unit vectors (like embeddings of related docs), written in
+    blocks. Returns the queries' source rows for reuse.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 50), dim), dtype=np.float32)
+    writer = StoreWriter(out_dir)
+
+    for start in range(0, n, 10000):
+        rows = min(10000, n - start)
+        block = centers[rng.integers(0, len(centers), rows)] \
+            + 0.6 * rng.standard_normal((rows, dim), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+
+        writer.add(
+            ids=[f"chunk-{i}" for i in range(start, start + rows)],
+            matrix=block,
+            texts=[f"synthetic chunk {i}" for i in range(start, start + rows)],
+            metadatas=[{"source": f"doc_{i // 20}.mdx"} for i in range(start, start + rows)],
+        )
+
+    writer.close()
+    return centers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    print("\n==== Quantized vector store ====\n")
+    print(f"dim={args.dim} queries={args.queries} k={args.k} rescore_factor={args.rescore_factor}\n")
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        store_dir = Path(tempfile.mkdtemp(prefix="quantized_store_"))
+        centers = write_synthetic_store(store_dir, size, args.dim, seed=size)
+
+        rng = np.random.default_rng(0)
+        queries = centers[rng.integers(0, len(centers), args.queries)] \
+            + 0.6 * rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        baseline = NumpyVectorStore(store_dir)
+        expected = [
+            {doc.id for doc, _ in baseline.search_by_vector(query, args.k)}
+            for query in queries
+        ]
+
+        for quantization in QUANTIZATIONS:
+            store = NumpyVectorStore(store_dir, quantization=quantization, rescore_factor=args.rescore_factor)
+
+            latencies: List[float] = []
+            recall = 0.0
+
+            for query, truth in zip(queries, expected):
+                start = time.perf_counter()
+                hits = store.search_by_vector(query, args.k)
+                latencies.append(time.perf_counter() - start)
+
+                recall += len(truth & {doc.id for doc, _ in hits}) / len(truth)
+
+            stats = store.stats()
+            print(
+                f"n={size:<8} {quantization:<8} "
+                f"scan={stats['scan_bytes'] / 1024 ** 2:8.1f} MB "
+                f"({stats['scan_bytes'] / stats['float32_bytes']:.0%} of float32) "
+                f"p50={np.percentile(latencies, 50) * 1000:7.2f}ms "
+                f"recall@{args.k}={recall / len(queries):.3f}"
+            )
+
+        print()
+
+    print("================================\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Benchmark: rag_query_tool latency with a per-call client vs the pooled one.
+
+Starts a local stub of the RAG API (uvicorn in a subprocess, canned
+/query response after --server-latency) and calls it through:
+
+- per-call   a new httpx.Client for every call (the tool before pooling)
+- pooled     rag_query_tool.invoke() on the shared keep-alive client
+- async      rag_query_tool.ainvoke() on the loop's keep-alive client
+
+each sequentially and from --threads concurrent callers (asyncio tasks
+for the async variant), and reports per-call p50/p95/p99 and throughput.
+
+    python -m benchmarks.bench_rag_tool_client --calls 500 --threads 8
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.load_test import SERVER_START_TIMEOUT_SEC, free_port, percentile
+
+# The package re-exports nothing, so import the module by name (the
+# tool object shares its name).
+tool_module = importlib.import_module("apps.agent.rag_query_tool")
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+STUB_LATENCY = float(os.getenv("STUB_RAG_LATENCY", "0.0"))
+
+
+# -------------------------
+# Stub RAG API
+# -------------------------
+stub_app = FastAPI(title="Stub RAG API")
+
+
+@stub_app.get("/health")
+async def health():
+    return {"ok": True}
+
+
+@stub_app.post("/query")
+async def query(payload: Dict[str, Any]):
+    if STUB_LATENCY:
+        await asyncio.sleep(STUB_LATENCY)
+    return {
+        "query": payload.get("query", ""),
+        "answer": "Use a retriever.",
+        "refused": False,
+        "refusal_reason": None,
+        "sources": [{"source": "retrievers.md", "distance": 0.42}],
+    }
+
+
+class StubServer:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.port = free_port()
+        self.proc: subprocess.Popen | None = None
+
+    def __enter__(self) -> str:
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "benchmarks.bench_rag_tool_client:stub_app",
+                "--host", "127.0.0.1",
+                "--port", str(self.port),
+                "--log-level", "warning",
+                "--no-access-log",
+            ],
+            cwd=BASE_DIR,
+            env={**os.environ, "STUB_RAG_LATENCY": str(self.latency)},
+        )
+
+        base_url = f"http://127.0.0.1:{self.port}"
+        deadline = time.monotonic() + SERVER_START_TIMEOUT_SEC
+
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{base_url}/health", timeout=1.0).json().get("ok"):
+                    return base_url
+            except (httpx.HTTPError, ValueError):
+                pass
+            time.sleep(0.25)
+
+        self.__exit__()
+        raise RuntimeError(f"stub server not ready after {SERVER_START_TIMEOUT_SEC:.0f}s")
+
+    def __exit__(self, *exc) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            self.proc.wait(timeout=10)
+
+
+# -------------------------
+# Callers
+# -------------------------
+def per_call(query: str) -> Dict[str, Any]:
+    """The tool's HTTP call before pooling: one client (and TCP connection) per call."""
+    with httpx.Client(timeout=20.0) as client:
+        resp = client.post(tool_module.RAG_API_URL, json={"query": query})
+        resp.raise_for_status()
+        return resp.json()
+
+
+def pooled(query: str) -> Dict[str, Any]:
+    return tool_module.rag_query_tool.invoke({"query": query})
+
+
+async def pooled_async(query: str) -> Dict[str, Any]:
+    return await tool_module.rag_query_tool.ainvoke({"query": query})
+
+
+def timed_call(fn: Callable[[str], Dict[str, Any]], i: int) -> float:
+    start = time.perf_counter()
+    result = fn(f"query {i}")
+    if result.get("refused"):
+        raise RuntimeError(f"call failed: {result.get('error')}")
+    return time.perf_counter() - start
+
+
+def run_sync(fn: Callable[[str], Dict[str, Any]], calls: int, threads: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    if threads == 1:
+        latencies = [timed_call(fn, i) for i in range(calls)]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(lambda i: timed_call(fn, i), range(calls)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_async(calls: int, concurrency: int) -> Dict[str, float]:
+    async def main() -> Dict[str, float]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i: int) -> float:
+            async with semaphore:
+                start = time.perf_counter()
+                result = await pooled_async(f"query {i}")
+                if result.get("refused"):
+                    raise RuntimeError(f"call failed: {result.get('error')}")
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            latencies = await asyncio.gather(*(one(i) for i in range(calls)))
+            wall = time.perf_counter() - start
+        finally:
+            await tool_module.aclose_clients()
+        return summarize(list(latencies), wall)
+
+    return asyncio.run(main())
+
+
+def summarize(latencies: List[float], wall: float) -> Dict[str, float]:
+    latencies.sort()
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "rps": len(latencies) / wall,
+    }
+
+
+# -------------------------
+# Main
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="rag_query_tool HTTP client benchmark.")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8, help="concurrent callers in the second round")
+    parser.add_argument("--server-latency", type=float, default=0.0, help="stub /query latency in seconds")
+    args = parser.parse_args()
+
+    with StubServer(args.server_latency) as base_url:
+        tool_module.RAG_API_URL = f"{base_url}/query"
+
+        # Warm up the server and the pooled clients.
+        run_sync(per_call, 20, 1)
+        run_sync(pooled, 20, 1)
+
+        print(f"\n==== rag_query_tool client ({args.calls} calls, server latency {args.server_latency * 1000:.0f}ms) ====\n")
+        print(f"{'client':<10} {'callers':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'calls/s':>9}")
+
+        for callers in (1, args.threads):
+            for name, run in [
+                ("per-call", lambda: run_sync(per_call, args.calls, callers)),
+                ("pooled", lambda: run_sync(pooled, args.calls, callers)),
+                ("async", lambda: run_async(args.calls, callers)),
+            ]:
+                r = run()
+                print(
+                    f"{name:<10} {callers:>7} {r['p50'] * 1000:>7.2f}ms {r['p95'] * 1000:>7.2f}ms "
+                    f"{r['p99'] * 1000:>7.2f}ms {r['rps']:>9.0f}"
+                )
+
+    tool_module.close_clients()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""
+Benchmark: retrieve() latency and memory as the corpus grows.
+
+For each corpus size, deterministic synthetic chunks (clustered unit
+vectors, regenerated identically on every run) are written to each
+vector store, then queried through apps.rag.rag_api.retrieve(). Build
+and query each run in a fresh subprocess, so resident memory belongs to
+one store only. Reported per size and backend:
+
+- build time and peak RSS of the build, on-disk size
+- open time, RSS after open and after the queries (split into private
+  and shared file-backed pages), peak RSS
+- retrieve() latency p50/p95/p99 at every --ks value
+- recall@k of the store's vector search against exact search
+
+Backends: chroma (persistent HNSW), numpy, numpy-float16, numpy-int8
+(the NumPy backends share one store directory). retrieve() runs with the
+API's defaults (DIVERSIFY etc.) but no distance threshold and no lexical
+index, so every query returns k chunks.
+
+    python -m benchmarks.bench_retrieval_scaling --sizes 675,10000,100000 --output scaling.json
+    python -m benchmarks.bench_retrieval_scaling --sizes 1000000 --dim 384 --backends numpy,numpy-int8
+    python -m benchmarks.bench_retrieval_scaling --output new.json --baseline scaling.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+BACKENDS = ("chroma", "numpy", "numpy-float16", "numpy-int8")
+
+GEN_BLOCK_ROWS = 10000
+CHROMA_BATCH = 5000
+MAX_CENTERS = 4096
+COLLECTION = "scaling"
+
+
+# -------------------------
+# Synthetic corpus
+# -------------------------
+def centers_for(n: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng([seed, n])
+    return rng.standard_normal((min(MAX_CENTERS, max(1, n // 50)), dim), dtype=np.float32)
+
+
+def synthetic_blocks(n: int, dim: int, seed: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    (start, block) pairs of clustered unit vectors.
+
+    Every block has its own seed, so any block can be regenerated without
+    the ones before it and the corpus never has to fit in memory.
+    """
+    centers = centers_for(n, dim, seed)
+
+    for start in range(0, n, GEN_BLOCK_ROWS):
+        rows = min(GEN_BLOCK_ROWS, n - start)
+        rng = np.random.default_rng([seed, n, start])
+        block = centers[rng.integers(0, len(centers), rows)] \
+            + 0.6 * rng.standard_normal((rows, dim), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        yield start, block
+
+
+def chunk_ids(start: int, rows: int) -> List[str]:
+    return [f"chunk-{i}" for i in range(start, start + rows)]
+
+
+def chunk_texts(start: int, rows: int) -> List[str]:
+    return [f"synthetic chunk {i} " + "lorem ipsum " * 40 for i in range(start, start + rows)]
+
+
+def chunk_metadatas(start: int, rows: int) -> List[Dict[str, str]]:
+    return [{"source": f"synthetic/doc_{i // 20}.mdx"} for i in range(start, start + rows)]
+
+
+def make_queries(n: int, dim: int, seed: int, count: int, max_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Perturbed corpus rows and the exact top-max_k row indices for each."""
+    # Block seeds use starts < n, so [seed, n, n] never collides with one.
+    rng = np.random.default_rng([seed, n, n])
+    picks = np.sort(rng.integers(0, n, count))
+    queries = np.empty((count, dim), dtype=np.float32)
+
+    for start, block in synthetic_blocks(n, dim, seed):
+        inside = (picks >= start) & (picks < start + len(block))
+        queries[inside] = block[picks[inside] - start]
+
+    # Noise of norm ~0.5 keeps each query near, but not on, a corpus row.
+    queries += rng.standard_normal((count, dim), dtype=np.float32) * (0.5 / np.sqrt(dim))
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    # Exact top-k by streaming over the blocks again (vectors are unit
+    # length, so the smallest L2 distance is the largest dot product).
+    best_scores = np.full((count, 0), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((count, 0), dtype=np.int64)
+
+    for start, block in synthetic_blocks(n, dim, seed):
+        scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+        rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + len(block)), (count, len(block)))], axis=1)
+        keep = np.argsort(-scores, axis=1, kind="stable")[:, :max_k]
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_rows = np.take_along_axis(rows, keep, axis=1)
+
+    return queries, best_rows
+
+
+# -------------------------
+# Memory helpers
+# -------------------------
+def rss_bytes() -> int | None:
+    """Current resident set size (Linux /proc), None elsewhere."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def rss_split_bytes() -> Dict[str, int | None]:
+    """
+    Private (anonymous) and file-backed resident memory (Linux).
+
+    File-backed pages of a memory-mapped store are shared by every
+    replica on the host; private pages are paid once per process.
+    """
+    split: Dict[str, int | None] = {"anon": None, "file": None}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(("RssAnon:", "RssFile:")):
+                    key, value = line.split(":", 1)
+                    split[key[3:].lower()] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return split
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports ru_maxrss in KiB, macOS in bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+# -------------------------
+# Children
+# -------------------------
+def build_store(store: str, n: int, dim: int, seed: int, out_dir: Path) -> dict:
+    start_time = time.perf_counter()
+
+    if store == "numpy":
+        from apps.rag.numpy_store import StoreWriter
+
+        writer = StoreWriter(out_dir)
+        for start, block in synthetic_blocks(n, dim, seed):
+            rows = len(block)
+            writer.add(chunk_ids(start, rows), block, chunk_texts(start, rows), chunk_metadatas(start, rows))
+        writer.close()
+    else:
+        import chromadb
+
+        collection = chromadb.PersistentClient(path=str(out_dir)).create_collection(COLLECTION)
+        for start, block in synthetic_blocks(n, dim, seed):
+            for offset in range(0, len(block), CHROMA_BATCH):
+                part = block[offset:offset + CHROMA_BATCH]
+                first = start + offset
+                collection.add(
+                    ids=chunk_ids(first, len(part)),
+                    embeddings=part,
+                    documents=chunk_texts(first, len(part)),
+                    metadatas=chunk_metadatas(first, len(part)),
+                )
+
+    return {
+        "build_sec": time.perf_counter() - start_time,
+        "build_peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def query_store(backend: str, store_dir: Path, work_dir: Path, ks: List[int]) -> dict:
+    from langchain_core.embeddings import Embeddings
+
+    from apps.rag import rag_api
+
+    queries = np.load(work_dir / "queries.npy")
+    truth = np.load(work_dir / "truth.npy")
+    texts = [f"synthetic query {i}" for i in range(len(queries))]
+
+    class QueryVectors(Embeddings):
+        """Looks up the precomputed vector of each synthetic query."""
+
+        def __init__(self) -> None:
+            self.by_text = {text: queries[i].tolist() for i, text in enumerate(texts)}
+
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            return [self.by_text[text] for text in texts]
+
+        def embed_query(self, text: str) -> List[float]:
+            return self.by_text[text]
+
+    # Synthetic distances are not calibrated to the real threshold.
+    rag_api.MAX_DISTANCE = float("inf")
+
+    rss_start = rss_bytes()
+    start_time = time.perf_counter()
+
+    if backend == "chroma":
+        import chromadb
+        from langchain_chroma import Chroma
+
+        vectordb = Chroma(
+            client=chromadb.PersistentClient(path=str(store_dir)),
+            collection_name=COLLECTION,
+            embedding_function=QueryVectors(),
+        )
+        vectordb._collection.count()
+    else:
+        from apps.rag.numpy_store import NumpyVectorStore
+
+        vectordb = NumpyVectorStore(
+            store_dir,
+            embeddings=QueryVectors(),
+            quantization=backend.split("-", 1)[1] if "-" in backend else "none",
+            rescore_factor=rag_api.RESCORE_FACTOR,
+        )
+
+    open_sec = time.perf_counter() - start_time
+    rss_open = rss_bytes()
+
+    # Warm-up: first queries page in the index / matrix.
+    for text in texts[:10]:
+        rag_api.retrieve(vectordb, text, k=max(ks))
+
+    latency: Dict[str, Dict[str, float]] = {}
+    recall: Dict[str, float] = {}
+
+    for k in ks:
+        timings = []
+        for text in texts:
+            start_time = time.perf_counter()
+            rag_api.retrieve(vectordb, text, k=k)
+            timings.append(time.perf_counter() - start_time)
+
+        latency[str(k)] = {
+            "p50_ms": float(np.percentile(timings, 50) * 1000),
+            "p95_ms": float(np.percentile(timings, 95) * 1000),
+            "p99_ms": float(np.percentile(timings, 99) * 1000),
+            "mean_ms": float(np.mean(timings) * 1000),
+        }
+
+        # Recall of the raw vector search, before fusion / diversification.
+        found = 0
+        batched, _ = rag_api.search_by_vectors(vectordb, queries.tolist(), k)
+        for i, hits in enumerate(batched):
+            expected = {f"chunk-{row}" for row in truth[i, :k]}
+            found += len(expected & {doc.id for doc, _ in hits})
+        recall[str(k)] = found / (len(queries) * k)
+
+    rss_split = rss_split_bytes()
+
+    return {
+        "open_sec": open_sec,
+        "rss_before_open_bytes": rss_start,
+        "rss_after_open_bytes": rss_open,
+        "rss_after_queries_bytes": rss_bytes(),
+        "rss_after_queries_private_bytes": rss_split["anon"],
+        "rss_after_queries_shared_bytes": rss_split["file"],
+        "query_peak_rss_bytes": peak_rss_bytes(),
+        "latency": latency,
+        "recall": recall,
+    }
+
+
+def run_child(args: argparse.Namespace) -> dict:
+    cmd = [
+        sys.executable, "-m", "benchmarks.bench_retrieval_scaling",
+        "--child", args.child, "--child-target", args.target,
+        "--work-dir", str(args.size_dir),
+        "--size", str(args.size), "--dim", str(args.dim), "--seed", str(args.seed),
+        "--ks", args.ks,
+    ]
+    proc = subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True)
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"{args.child} {args.target} failed (exit {proc.returncode}): {proc.stderr.strip()[-500:]}")
+
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# -------------------------
+# Reporting
+# -------------------------
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def package_version(name: str) -> str | None:
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+
+def compare(results: List[dict], baseline_path: Path, k: str, tolerance: float) -> None:
+    """Print p50 and build time against a previous run; flag slowdowns past tolerance."""
+    baseline = {
+        (row["size"], row["backend"]): row
+        for row in json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    }
+
+    print(f"\n---- vs {baseline_path} (k={k}, flag > {tolerance:.0%} slower) ----\n")
+
+    for row in results:
+        old = baseline.get((row["size"], row["backend"]))
+        if old is None or k not in old["latency"] or k not in row["latency"]:
+            continue
+
+        p50 = row["latency"][k]["p50_ms"] / old["latency"][k]["p50_ms"]
+        build = row["build_sec"] / old["build_sec"] if old["build_sec"] else 1.0
+        flag = "  REGRESSION" if max(p50, build) > 1 + tolerance else ""
+
+        print(f"n={row['size']:<9} {row['backend']:<14} p50 x{p50:.2f}  build x{build:.2f}{flag}")
+
+
+def mb(value: int | None) -> str:
+    return f"{value / 1024 ** 2:.0f}MB" if value is not None else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="675,10000,100000")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--backends", default="chroma,numpy,numpy-int8")
+    parser.add_argument("--ks", default="1,5,20")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, default=None, help="where stores are built (default: temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep the built stores")
+    parser.add_argument("--output", type=Path, default=None, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, default=None, help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--child", choices=["build", "query"], help=argparse.SUPPRESS)
+    parser.add_argument("--child-target", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    ks = [int(k) for k in args.ks.split(",")]
+
+    if args.child == "build":
+        print(json.dumps(build_store(args.child_target, args.size, args.dim, args.seed, args.work_dir / args.child_target)))
+        return
+    if args.child == "query":
+        store = "chroma" if args.child_target == "chroma" else "numpy"
+        print(json.dumps(query_store(args.child_target, args.work_dir / store, args.work_dir, ks)))
+        return
+
+    backends = args.backends.split(",")
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"unknown backends {sorted(unknown)}; choose from {BACKENDS}")
+
+    work_root = args.work_dir or Path(tempfile.mkdtemp(prefix="retrieval_scaling_"))
+    results: List[dict] = []
+
+    print("\n==== Retrieval scaling ====\n")
+    print(f"dim={args.dim} queries={args.queries} ks={args.ks} backends={args.backends}\n")
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        size_dir = work_root / f"n{size}_d{args.dim}"
+        size_dir.mkdir(parents=True, exist_ok=True)
+
+        queries, truth = make_queries(size, args.dim, args.seed, args.queries, max(ks))
+        np.save(size_dir / "queries.npy", queries)
+        np.save(size_dir / "truth.npy", truth)
+
+        child_args = argparse.Namespace(**vars(args), size_dir=size_dir)
+        child_args.size = size
+        builds: Dict[str, dict] = {}
+
+        for backend in backends:
+            store = "chroma" if backend == "chroma" else "numpy"
+
+            if store not in builds:
+                child_args.child, child_args.target = "build", store
+                shutil.rmtree(size_dir / store, ignore_errors=True)
+                builds[store] = run_child(child_args)
+                builds[store]["disk_bytes"] = dir_bytes(size_dir / store)
+
+            child_args.child, child_args.target = "query", backend
+            row = {"size": size, "dim": args.dim, "backend": backend, **builds[store], **run_child(child_args)}
+            results.append(row)
+
+            print(
+                f"n={size:<9} {backend:<14} "
+                f"build={row['build_sec']:.1f}s disk={mb(row['disk_bytes'])} "
+                f"rss_open={mb(row['rss_after_open_bytes'])} peak={mb(row['query_peak_rss_bytes'])} "
+                f"private={mb(row.get('rss_after_queries_private_bytes'))} "
+                f"shared={mb(row.get('rss_after_queries_shared_bytes'))} | "
+                + " ".join(
+                    f"k={k}: p50={row['latency'][str(k)]['p50_ms']:.2f}ms "
+                    f"p99={row['latency'][str(k)]['p99_ms']:.2f}ms "
+                    f"recall={row['recall'][str(k)]:.3f}"
+                    for k in ks
+                )
+            )
+
+        if not args.keep:
+            shutil.rmtree(size_dir, ignore_errors=True)
+
+    print("\n===========================\n")
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "git_commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "numpy": package_version("numpy"),
+                "chromadb": package_version("chromadb"),
+                "args": {k: str(v) for k, v in vars(args).items() if not k.startswith("child")},
+            },
+            "results": results,
+        }, indent=2), encoding="utf-8")
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        compare(results, args.baseline, str(ks[len(ks) // 2]), args.tolerance)
+
+    if args.work_dir is None and not args.keep:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
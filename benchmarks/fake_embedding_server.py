@@ -0,0 +1,114 @@
+"""
+Local OpenAI-compatible /v1/embeddings server that injects rate limits.
+
+Used to exercise the ingestion scheduler offline. It enforces a token
+bucket of FAKE_EMBED_RPS requests per second, answers over-limit requests
+with 429 + retry-after headers, and can also reject a random fraction of
+requests (FAKE_EMBED_429_RATE) and fail some with 500s
+(FAKE_EMBED_500_RATE).
+
+    uvicorn benchmarks.fake_embedding_server:app --port 8100
+    python -m scripts.embed_langchain_chunks --base-url http://127.0.0.1:8100/v1
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from benchmarks.fakes import FakeEmbeddings
+
+
+FAKE_EMBED_RPS = float(os.getenv("FAKE_EMBED_RPS", "20"))
+FAKE_EMBED_BURST = float(os.getenv("FAKE_EMBED_BURST", "5"))
+FAKE_EMBED_429_RATE = float(os.getenv("FAKE_EMBED_429_RATE", "0.0"))
+FAKE_EMBED_500_RATE = float(os.getenv("FAKE_EMBED_500_RATE", "0.0"))
+FAKE_EMBED_LATENCY = float(os.getenv("FAKE_EMBED_LATENCY", "0.05"))
+
+
+app = FastAPI(title="Fake embeddings")
+
+_embedder = FakeEmbeddings()
+_rng = random.Random(0)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consume one token; return 0 on success, else seconds until one is free."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+
+_bucket = TokenBucket(FAKE_EMBED_RPS, FAKE_EMBED_BURST)
+
+stats = {"requests": 0, "rate_limited": 0, "errors": 0, "inputs": 0}
+
+
+class EmbeddingRequest(BaseModel):
+    model: str
+    input: List[str] | str
+
+
+def _rate_limited(wait: float) -> JSONResponse:
+    stats["rate_limited"] += 1
+    return JSONResponse(
+        status_code=429,
+        content={"error": {"message": "Rate limit reached", "type": "requests"}},
+        headers={
+            "retry-after": str(max(1, round(wait))),
+            "retry-after-ms": str(int(wait * 1000)),
+        },
+    )
+
+
+@app.post("/v1/embeddings")
+async def embeddings(req: EmbeddingRequest):
+    stats["requests"] += 1
+
+    wait = _bucket.take()
+    if wait > 0:
+        return _rate_limited(wait)
+
+    if _rng.random() < FAKE_EMBED_429_RATE:
+        return _rate_limited(0.5)
+
+    if _rng.random() < FAKE_EMBED_500_RATE:
+        stats["errors"] += 1
+        return JSONResponse(status_code=500, content={"error": {"message": "boom"}})
+
+    texts = [req.input] if isinstance(req.input, str) else req.input
+    stats["inputs"] += len(texts)
+
+    await asyncio.sleep(FAKE_EMBED_LATENCY)
+
+    return {
+        "object": "list",
+        "model": req.model,
+        "data": [
+            {"object": "embedding", "index": i, "embedding": _embedder._embed(text)}
+            for i, text in enumerate(texts)
+        ],
+    }
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
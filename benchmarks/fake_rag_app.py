@@ -0,0 +1,74 @@
+"""
+The RAG API wired to offline stand-ins, for load testing.
+
+Same app as apps.rag.rag_api (routes, caches, log writer, metrics); only
+startup differs: FakeEmbeddings / FakeChatModel replace the OpenAI
+clients, an in-memory Chroma collection of chunks.jsonl replaces the
+persisted store, and context packing counts tokens with the offline
+estimate instead of tiktoken. Each uvicorn worker builds its own copy.
+
+    FAKE_LLM_LATENCY=0.5 uvicorn benchmarks.fake_rag_app:app --workers 4
+
+Config (env):
+    FAKE_EMBED_LATENCY   seconds per embedding call (default 0.05)
+    FAKE_LLM_LATENCY     seconds per LLM call (default 0.5)
+    FAKE_JITTER          +- fraction of latency, uniform (default 0.2)
+    FAKE_LLM_ERROR_RATE  fraction of LLM calls that raise (default 0)
+    FAKE_TOKENIZER       "estimate" (default) or "tiktoken" for exact
+                         counts; the latter needs cl100k_base cached
+
+The app's own settings still apply, e.g. EMBED_CACHE_SIZE=0 and
+ANSWER_CACHE_SIZE=0 run it uncached.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from apps.rag import context_budget, rag_api
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, build_fake_vectordb
+
+
+FAKE_EMBED_LATENCY = float(os.getenv("FAKE_EMBED_LATENCY", "0.05"))
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+FAKE_JITTER = float(os.getenv("FAKE_JITTER", "0.2"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_TOKENIZER = os.getenv("FAKE_TOKENIZER", "estimate")
+
+app = rag_api.app
+
+
+def startup() -> None:
+    embeddings = FakeEmbeddings(jitter=FAKE_JITTER, seed=os.getpid())
+
+    # Fake vectors are not calibrated to the real threshold; let every
+    # query reach generation so the full pipeline is exercised.
+    rag_api.MAX_DISTANCE = 4.0
+
+    log_dir = Path(tempfile.mkdtemp(prefix="rag_load_"))
+    rag_api.LOG_DIR = log_dir
+    rag_api.LOG_FILE = log_dir / "rag_queries_v1.jsonl"
+
+    # init_services() keeps an installed counter, so nothing is downloaded.
+    if FAKE_TOKENIZER == "estimate":
+        context_budget.set_token_counter(context_budget.estimate_tokens)
+
+    rag_api.init_services(
+        embeddings,
+        FakeChatModel(
+            latency=FAKE_LLM_LATENCY,
+            jitter=FAKE_JITTER,
+            error_rate=FAKE_LLM_ERROR_RATE,
+            seed=os.getpid(),
+        ),
+        make_vectordb=build_fake_vectordb,
+    )
+
+    # Latency is switched on after the corpus is indexed.
+    embeddings.latency = FAKE_EMBED_LATENCY
+
+
+app.router.on_startup = [
+    startup if handler is rag_api.startup else handler
+    for handler in app.router.on_startup
+]
@@ -0,0 +1,163 @@
+"""
+Offline stand-ins for the OpenAI models used by the RAG API.
+
+They mimic the parts of the LangChain interfaces the API relies on and
+sleep for a configurable latency (with jitter) instead of calling the
+network, so benchmarks can run fully offline.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import AsyncIterator, List
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CHUNKS_FILE = BASE_DIR / "data/processed/langchain/chunks.jsonl"
+
+FAKE_DIM = 256
+FAKE_ANSWER = (
+    "A retriever is an interface that returns documents given an "
+    "unstructured query. It is more general than a vector store."
+)
+
+
+def _jittered(latency: float, jitter: float, rng: random.Random) -> float:
+    if latency <= 0:
+        return 0.0
+    return max(0.0, latency * (1 + rng.uniform(-jitter, jitter)))
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words hashing embeddings.
+
+    Similar texts get similar vectors, so retrieval over a fake-embedded
+    corpus still behaves like retrieval (not like random noise).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        dim: int = FAKE_DIM,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.dim = dim
+        self._rng = random.Random(seed)
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vec[index] += 1.0 if digest[4] & 1 else -1.0
+
+        norm = sum(v * v for v in vec) ** 0.5 or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(_jittered(self.latency, self.jitter, self._rng))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(_jittered(self.latency, self.jitter, self._rng))
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeChatModel:
+    """
+    Minimal ChatOpenAI stand-in: invoke / ainvoke return a fixed answer
+    after sleeping for the configured latency. astream spends a quarter
+    of it before the first token and spreads the rest over the tokens.
+
+    With error_rate > 0, that fraction of calls raises after the latency,
+    like an upstream 5xx.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        answer: str = FAKE_ANSWER,
+        seed: int = 0,
+        error_rate: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.answer = answer
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate > 0 and self._rng.random() < self.error_rate:
+            raise RuntimeError("fake LLM error")
+
+    def invoke(self, prompt: str) -> AIMessage:
+        time.sleep(_jittered(self.latency, self.jitter, self._rng))
+        self._maybe_fail()
+        return AIMessage(content=self.answer)
+
+    async def ainvoke(self, prompt: str) -> AIMessage:
+        await asyncio.sleep(_jittered(self.latency, self.jitter, self._rng))
+        self._maybe_fail()
+        return AIMessage(content=self.answer)
+
+    async def astream(self, prompt: str) -> AsyncIterator[AIMessageChunk]:
+        latency = _jittered(self.latency, self.jitter, self._rng)
+        tokens = re.findall(r"\S+\s*", self.answer)
+
+        await asyncio.sleep(latency * 0.25)
+        self._maybe_fail()
+
+        for token in tokens:
+            yield AIMessageChunk(content=token)
+            await asyncio.sleep(latency * 0.75 / len(tokens))
+
+
+def load_chunk_texts(path: Path = CHUNKS_FILE) -> List[dict]:
+    rows = []
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            rows.append(json.loads(line))
+
+    return rows
+
+
+def build_fake_vectordb(embeddings: Embeddings, path: Path = CHUNKS_FILE):
+    """
+    In-memory Chroma collection over chunks.jsonl using fake vectors.
+
+    Chunks get the same content-hash ids as the real ingestion, so they
+    line up with a lexical index built from the same file.
+    """
+    from langchain_chroma import Chroma
+
+    from scripts.embed_langchain_chunks import iter_chunks
+
+    docs = list(iter_chunks(path))
+
+    return Chroma.from_texts(
+        texts=[doc.page_content for doc in docs],
+        metadatas=[doc.metadata for doc in docs],
+        ids=[doc.id for doc in docs],
+        embedding=embeddings,
+        collection_name=f"bench_{int(time.time() * 1000)}",
+    )
@@ -0,0 +1,319 @@
+"""
+Load test: /query throughput and tail latency across serving setups.
+
+Starts benchmarks.fake_rag_app (the real app with fake OpenAI models that
+sleep for a configurable latency) once per setup and drives it over HTTP,
+fully offline. Every combination of --workers, --paths and --cache runs
+in turn:
+
+    workers   uvicorn worker processes; 0 runs the app in-process over
+              the ASGI transport (no sockets, one event loop)
+    paths     /query (async) and/or /query/sync (threadpool)
+    cache     "off" sets EMBED_CACHE_SIZE=0 and ANSWER_CACHE_SIZE=0
+
+Load is closed-loop with --concurrency requests in flight, or open-loop
+at a fixed --rate (req/s). In open-loop mode latency is measured from
+each request's scheduled start, so queueing inside the server counts.
+
+Queries cycle through --unique-queries distinct strings, so with the
+cache on, the repeat rate is 1 - unique / requests. Context packing
+estimates token counts from text length (FAKE_TOKENIZER=tiktoken counts
+exactly, with cl100k_base cached in TIKTOKEN_CACHE_DIR).
+
+    python -m benchmarks.load_test --workers 0,1,4 --concurrency 64
+    python -m benchmarks.load_test --paths /query --rate 100 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from itertools import product
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+EVAL_FILE = BASE_DIR / "evals/rag_eval_queries_v1.json"
+
+SERVER_START_TIMEOUT_SEC = 120.0
+
+
+# -------------------------
+# Queries
+# -------------------------
+def make_queries(unique: int) -> List[str]:
+    """Answerable eval queries, suffixed to get `unique` distinct strings."""
+    with open(EVAL_FILE, "r", encoding="utf-8") as f:
+        base = [case["query"] for case in json.load(f) if not case["must_refuse"]]
+
+    return [
+        base[i % len(base)] if i < len(base) else f"{base[i % len(base)]} ({i // len(base)})"
+        for i in range(unique)
+    ]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+# -------------------------
+# Servers
+# -------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def app_env(args: argparse.Namespace, cache: str) -> Dict[str, str]:
+    env = {
+        "FAKE_EMBED_LATENCY": str(args.embed_latency),
+        "FAKE_LLM_LATENCY": str(args.llm_latency),
+        "FAKE_JITTER": str(args.jitter),
+        "FAKE_LLM_ERROR_RATE": str(args.error_rate),
+        "EMBED_CACHE_PATH": "",
+    }
+
+    if cache == "off":
+        env["EMBED_CACHE_SIZE"] = "0"
+        env["ANSWER_CACHE_SIZE"] = "0"
+
+    return env
+
+
+class InProcessApp:
+    """fake_rag_app in this process, reached through httpx.ASGITransport."""
+
+    def __init__(self, env: Dict[str, str]) -> None:
+        self.env = env
+
+    def __enter__(self) -> httpx.AsyncBaseTransport:
+        # Both modules read their settings at import; apply the env to
+        # the module constants instead.
+        from apps.rag import rag_api
+        from benchmarks import fake_rag_app
+
+        self.rag_api = rag_api
+        self.defaults = {
+            "EMBED_CACHE_SIZE": rag_api.EMBED_CACHE_SIZE,
+            "ANSWER_CACHE_SIZE": rag_api.ANSWER_CACHE_SIZE,
+        }
+
+        for name, value in self.env.items():
+            if hasattr(fake_rag_app, name):
+                setattr(fake_rag_app, name, float(value))
+            elif name in self.defaults:
+                setattr(rag_api, name, int(value))
+
+        fake_rag_app.startup()
+        # Unhandled app errors become 500s, as they would behind uvicorn.
+        return httpx.ASGITransport(app=fake_rag_app.app, raise_app_exceptions=False)
+
+    def __exit__(self, *exc) -> None:
+        self.rag_api.shutdown()
+        for name, value in self.defaults.items():
+            setattr(self.rag_api, name, value)
+
+
+class UvicornServer:
+    """uvicorn benchmarks.fake_rag_app:app --workers N in a subprocess."""
+
+    def __init__(self, workers: int, env: Dict[str, str]) -> None:
+        self.workers = workers
+        self.env = env
+        self.port = free_port()
+        self.proc: subprocess.Popen | None = None
+
+    def __enter__(self) -> str:
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "benchmarks.fake_rag_app:app",
+                "--host", "127.0.0.1",
+                "--port", str(self.port),
+                "--workers", str(self.workers),
+                "--log-level", "warning",
+                "--no-access-log",
+            ],
+            cwd=BASE_DIR,
+            env={**os.environ, **self.env},
+        )
+
+        base_url = f"http://127.0.0.1:{self.port}"
+        deadline = time.monotonic() + SERVER_START_TIMEOUT_SEC
+
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {self.proc.returncode}")
+            try:
+                if httpx.get(f"{base_url}/health", timeout=1.0).json().get("ok"):
+                    return base_url
+            except (httpx.HTTPError, ValueError):
+                pass
+            time.sleep(0.25)
+
+        self.__exit__()
+        raise RuntimeError(f"server not ready after {SERVER_START_TIMEOUT_SEC:.0f}s")
+
+    def __exit__(self, *exc) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+# -------------------------
+# Load generation
+# -------------------------
+async def drive(
+    client: httpx.AsyncClient,
+    path: str,
+    queries: List[str],
+    total: int,
+    concurrency: int,
+    rate: float,
+) -> dict:
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+
+    async def send(i: int, scheduled: float) -> None:
+        try:
+            resp = await client.post(path, json={"query": queries[i % len(queries)]})
+            outcomes[str(resp.status_code)] += 1
+        except httpx.HTTPError as e:
+            outcomes[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - scheduled)
+
+    wall_start = time.perf_counter()
+
+    if rate > 0:
+        # Open loop: request i starts at i / rate whether or not earlier
+        # ones have finished.
+        tasks = []
+        for i in range(total):
+            scheduled = wall_start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(i, scheduled)))
+        await asyncio.gather(*tasks)
+    else:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def closed(i: int) -> None:
+            async with semaphore:
+                await send(i, time.perf_counter())
+
+        await asyncio.gather(*(closed(i) for i in range(total)))
+
+    wall = time.perf_counter() - wall_start
+    latencies.sort()
+    errors = total - outcomes.get("200", 0)
+
+    return {
+        "requests": total,
+        "wall_sec": wall,
+        "throughput_rps": total / wall,
+        "p50_sec": percentile(latencies, 50),
+        "p95_sec": percentile(latencies, 95),
+        "p99_sec": percentile(latencies, 99),
+        "error_rate": errors / total,
+        "outcomes": dict(outcomes),
+    }
+
+
+async def run_setup(target, path: str, queries: List[str], args: argparse.Namespace) -> dict:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    if isinstance(target, str):
+        client = httpx.AsyncClient(base_url=target, timeout=args.timeout, limits=limits)
+    else:
+        client = httpx.AsyncClient(transport=target, base_url="http://load", timeout=args.timeout)
+
+    async with client:
+        # A few untimed requests open connections and warm every worker;
+        # the warm-up query is not in the measured set.
+        await asyncio.gather(*(
+            client.post(path, json={"query": "load test warm-up"})
+            for _ in range(max(4, args.concurrency // 4))
+        ))
+
+        return await drive(client, path, queries, args.total, args.concurrency, args.rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1", help="comma-separated; 0 = in-process")
+    parser.add_argument("--paths", default="/query/sync,/query")
+    parser.add_argument("--cache", default="off,on", help="comma-separated: off, on")
+    parser.add_argument("--concurrency", type=int, default=64, help="closed loop: requests in flight")
+    parser.add_argument("--rate", type=float, default=0.0, help="open loop: requests per second")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--duration", type=float, default=0.0, help="open loop: seconds (overrides --requests)")
+    parser.add_argument("--unique-queries", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of LLM calls that fail")
+    parser.add_argument("--json", type=Path, help="also write results to this file")
+    args = parser.parse_args()
+
+    args.total = int(args.rate * args.duration) if args.rate > 0 and args.duration > 0 else args.requests
+    queries = make_queries(args.unique_queries)
+
+    load = f"rate={args.rate:g} req/s" if args.rate > 0 else f"concurrency={args.concurrency}"
+    print("\n==== /query load test ====\n")
+    print(
+        f"requests={args.total} {load} unique_queries={args.unique_queries} "
+        f"embed_latency={args.embed_latency}s llm_latency={args.llm_latency}s "
+        f"jitter={args.jitter} error_rate={args.error_rate}\n"
+    )
+
+    results = []
+
+    for workers, cache, path in product(
+        [int(w) for w in args.workers.split(",")],
+        args.cache.split(","),
+        args.paths.split(","),
+    ):
+        env = app_env(args, cache)
+        server = InProcessApp(env) if workers == 0 else UvicornServer(workers, env)
+
+        with server as target:
+            result = asyncio.run(run_setup(target, path, queries, args))
+
+        result.update({"workers": workers, "cache": cache, "path": path})
+        results.append(result)
+
+        label = "in-proc" if workers == 0 else f"{workers} worker{'s' if workers > 1 else ''}"
+        print(
+            f"{label:<10} cache={cache:<3} {path:<12} "
+            f"throughput={result['throughput_rps']:7.1f} req/s "
+            f"p50={result['p50_sec']:.3f}s "
+            f"p95={result['p95_sec']:.3f}s "
+            f"p99={result['p99_sec']:.3f}s "
+            f"errors={result['error_rate']:.1%}"
+        )
+
+    print("\n==========================\n")
+
+    if args.json:
+        args.json.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()}, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
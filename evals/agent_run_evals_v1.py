@@ -1,13 +1,19 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import argparse
+import asyncio
 import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, Dict, List
 
 from langchain_core.messages import HumanMessage
 
 from apps.agent.agent_graph import agent
+from apps.agent.rag_query_tool import aclose_clients
 
 
 # -------------------------
@@ -18,6 +24,12 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 EVAL_CASE_FILE = BASE_DIR / "evals/agent_eval_queries_v1.json"
 EVAL_LOG_FILE = BASE_DIR / "evals/agent_eval_results_v1.jsonl"
 
+# Cases run at once; each one holds an agent LLM call and a RAG API call
+AGENT_EVAL_CONCURRENCY = int(os.getenv("AGENT_EVAL_CONCURRENCY", "8"))
+
+# A case still running after this is recorded as failed
+CASE_TIMEOUT_SEC = float(os.getenv("AGENT_EVAL_CASE_TIMEOUT_SEC", "120"))
+
 
 # -------------------------
 # Logging helper
@@ -29,17 +41,108 @@ def log_eval_result(payload: dict):
         f.write(json.dumps(payload) + "\n")
 
 
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
 # -------------------------
-# Main
+# Agent call
 # -------------------------
-def main():
+async def run_case(query: str, semaphore: asyncio.Semaphore, timeout: float) -> Dict[str, Any]:
+    """
+    Run the agent on one query, bounded by the semaphore and the timeout.
+
+    ainvoke runs the graph's sync nodes in worker threads, so cases
+    overlap on the network waits. On timeout the case stops being
+    awaited; a node already in flight finishes in its thread.
+    """
+    async with semaphore:
+        start = time.perf_counter()
+        error = None
+
+        try:
+            result = await asyncio.wait_for(
+                agent.ainvoke({"messages": [HumanMessage(content=query)]}),
+                timeout=timeout,
+            )
+            answer = result["messages"][-1].content
+        except asyncio.TimeoutError:
+            error = f"timed out after {timeout:g}s"
+            answer = f"Agent error: {error}"
+        except Exception as e:
+            error = str(e)
+            answer = f"Agent error: {error}"
+
+        return {
+            "answer": answer,
+            "error": error,
+            "latency": time.perf_counter() - start,
+        }
+
+
+# -------------------------
+# Evaluation logic
+# -------------------------
+def evaluate(case: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Print one case and build its log record."""
+    eval_id = case["id"]
+    query = case["query"]
+    must_refuse = case["must_refuse"]
+    category = case.get("category", "unknown")
+
+    answer = result["answer"]
+    latency = result["latency"]
+
+    print(f"--- {eval_id} ({category}) ---")
+    print(f"Query: {query}")
+    print(f"Answer: {answer}")
+    print(f"Latency: {latency:.2f}s")
 
     # -------------------------
-    # Load evaluation cases
+    # Refusal detection heuristic
+    # (string-based for v1 simplicity)
     # -------------------------
-    with open(EVAL_CASE_FILE, "r") as f:
-        eval_data = json.load(f)
+    lower = answer.lower()
+
+    refused = (
+        "don't have enough relevant context" in lower
+        or "not enough relevant context" in lower
+    )
+
+    if result["error"] is not None:
+        passed = False
+        print("✗ Agent error\n")
+    elif must_refuse:
+        passed = refused
+        print("✓ Correct refusal\n" if passed else "✗ Should have refused\n")
+    else:
+        passed = not refused
+        print("✓ Pass\n" if passed else "✗ Unexpected refusal\n")
+
+    record = {
+        "ts": time.time(),
+        "eval_id": eval_id,
+        "query": query,
+        "category": category,
+        "answer": answer,
+        "must_refuse": must_refuse,
+        "refused": refused,
+        "passed": passed,
+        "latency_sec": latency,
+    }
+
+    if result["error"] is not None:
+        record["error"] = result["error"]
+
+    return record
 
+
+# -------------------------
+# Main
+# -------------------------
+async def run(eval_data: List[Dict[str, Any]], concurrency: int, timeout: float) -> None:
     total = len(eval_data)
 
     # -------------------------
@@ -48,90 +151,42 @@ def main():
     correct_refusals = 0
     unexpected_refusals = 0
     total_passes = 0
-    total_latency = 0.0
+    errors = 0
+    latencies: List[float] = []
 
     print("\n==== Agent Eval v1 ====\n")
-
-    # -------------------------
-    # Main evaluation loop
-    # -------------------------
-    for case in eval_data:
-
-        eval_id = case["id"]
-        query = case["query"]
-        must_refuse = case["must_refuse"]
-        category = case.get("category", "unknown")
-
-        print(f"--- {eval_id} ({category}) ---")
-        print(f"Query: {query}")
-
-        # ---- Invoke agent and time execution ----
-        start = time.time()
-
-        try:
-            result = agent.invoke(
-                {"messages": [HumanMessage(content=query)]}
-            )
-            answer = result["messages"][-1].content
-        except Exception as e:
-            answer = f"Agent error: {str(e)}"
-
-        latency = time.time() - start
-        total_latency += latency
-
-        print(f"Answer: {answer}")
-        print(f"Latency: {latency:.2f}s")
-
-        # -------------------------
-        # Refusal detection heuristic
-        # (string-based for v1 simplicity)
-        # -------------------------
-        lower = answer.lower()
-
-        refused = (
-            "don't have enough relevant context" in lower
-            or "not enough relevant context" in lower
-        )
-
-        # -------------------------
-        # Evaluation logic
-        # -------------------------
-        if must_refuse:
-
-            if refused:
-                correct_refusals += 1
-                total_passes += 1
-                passed = True
-                print("✓ Correct refusal\n")
-            else:
-                passed = False
-                print("✗ Should have refused\n")
-
-        else:
-
-            if refused:
-                unexpected_refusals += 1
-                passed = False
-                print("✗ Unexpected refusal\n")
-            else:
-                total_passes += 1
-                passed = True
-                print("✓ Pass\n")
-
-        # -------------------------
-        # Log structured result
-        # -------------------------
-        log_eval_result({
-            "ts": time.time(),
-            "eval_id": eval_id,
-            "query": query,
-            "category": category,
-            "answer": answer,
-            "must_refuse": must_refuse,
-            "refused": refused,
-            "passed": passed,
-            "latency_sec": latency,
-        })
+    print(f"concurrency={concurrency} case_timeout={timeout:g}s\n")
+
+    # Sync nodes run on the default executor; size it so every case in
+    # flight gets a thread (the stock pool is only cpu_count + 4).
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    wall_start = time.perf_counter()
+
+    tasks = [
+        asyncio.create_task(run_case(case["query"], semaphore, timeout))
+        for case in eval_data
+    ]
+
+    # Awaiting in case order keeps the log in dataset order, whatever
+    # order the cases finish in.
+    try:
+        for case, task in zip(eval_data, tasks):
+            record = evaluate(case, await task)
+            log_eval_result(record)
+
+            latencies.append(record["latency_sec"])
+            errors += "error" in record
+            total_passes += record["passed"]
+            correct_refusals += record["must_refuse"] and record["refused"]
+            unexpected_refusals += (not record["must_refuse"]) and record["refused"]
+    finally:
+        # The RAG tool's async client belongs to this loop.
+        await aclose_clients()
+
+    wall = time.perf_counter() - wall_start
+    latencies.sort()
 
     # -------------------------
     # Summary report
@@ -140,10 +195,32 @@ def main():
     print(f"Total queries: {total}")
     print(f"Correct refusals: {correct_refusals}")
     print(f"Unexpected refusals: {unexpected_refusals}")
+    print(f"Agent errors / timeouts: {errors}")
     print(f"Overall passes: {total_passes}/{total}")
-    print(f"Avg latency: {total_latency/total:.2f}s")
+    print(f"Wall time: {wall:.2f}s (sum of latencies: {sum(latencies):.2f}s)")
+    print(f"Avg latency: {sum(latencies)/total:.2f}s")
+    print(
+        f"Latency p50/p95/p99: {percentile(latencies, 50):.2f}s / "
+        f"{percentile(latencies, 95):.2f}s / {percentile(latencies, 99):.2f}s"
+    )
     print("==================\n")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Run the agent eval set.")
+    parser.add_argument("--concurrency", type=int, default=AGENT_EVAL_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=CASE_TIMEOUT_SEC, help="seconds per case")
+    parser.add_argument("--cases", type=Path, default=EVAL_CASE_FILE)
+    args = parser.parse_args()
+
+    # -------------------------
+    # Load evaluation cases
+    # -------------------------
+    with open(args.cases, "r") as f:
+        eval_data = json.load(f)
+
+    asyncio.run(run(eval_data, max(1, args.concurrency), args.timeout))
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,324 @@
+"""
+Streaming analysis of RAG query logs (production or eval).
+
+Reads any number of JSONL logs (plain, gzip, rotated) in one pass with
+bounded memory, and reports latency percentiles, throughput per time
+window, refusal reasons, stage timings, the slowest queries and
+per-group breakdowns.
+
+    python -m evals.analyze_query_logs
+    python -m evals.analyze_query_logs logs/ --group-by llm_model,k,max_distance
+    python -m evals.analyze_query_logs evals/rag_api_eval_results_v1.jsonl --window 1
+"""
+
+import argparse
+import heapq
+import json
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from apps.rag.query_log import iter_log_records, log_files
+
+
+# -------------------------
+# Config
+# -------------------------
+BASE_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_LOG = BASE_DIR / "logs/rag_queries_v1.jsonl"
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+# -------------------------
+# Streaming aggregates
+# -------------------------
+class LatencySketch:
+    """
+    Quantiles with bounded relative error in bounded memory.
+
+    Values go into logarithmic buckets (each bucket spans a factor of
+    gamma), so any quantile is within relative_error of the true value
+    and memory grows with log(max / min), not with the number of values.
+    Sketches with the same relative_error can be merged.
+    """
+
+    def __init__(self, relative_error: float = 0.01) -> None:
+        self.gamma = (1 + relative_error) / (1 - relative_error)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: Counter = Counter()
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+        if value <= 0:
+            self.zeros += 1
+        else:
+            self.buckets[math.ceil(math.log(value) / self.log_gamma)] += 1
+
+    def merge(self, other: "LatencySketch") -> None:
+        self.buckets.update(other.buckets)
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return float("nan")
+
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+
+        seen = self.zeros
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Bucket midpoint: within relative_error of any value in it.
+                return min(self.max, 2 * self.gamma ** index / (self.gamma + 1))
+
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else float("nan")
+
+
+class Summary:
+    """Counts, refusals and latency for one slice of the log."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.refused = 0
+        self.reasons: Counter = Counter()
+        self.latency = LatencySketch()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.count += 1
+
+        if record.get("refused"):
+            self.refused += 1
+            self.reasons[record.get("refusal_reason") or "unknown"] += 1
+
+        latency = record.get("latency_sec")
+        if isinstance(latency, (int, float)):
+            self.latency.add(float(latency))
+
+    def percentiles(self) -> Dict[str, float]:
+        return {f"p{p}": self.latency.quantile(p / 100) for p in PERCENTILES}
+
+
+def parse_ts(value: Any) -> float | None:
+    """Epoch seconds from an ISO timestamp (API logs) or a float (eval logs)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return None
+
+
+def fmt_ts(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+# -------------------------
+# Analysis
+# -------------------------
+def analyze(
+    records,
+    group_by: List[str],
+    window_sec: float,
+    top: int,
+) -> Dict[str, Any]:
+    overall = Summary()
+    groups: Dict[Tuple, Summary] = {}
+    stages: Dict[str, LatencySketch] = {}
+    windows: Counter = Counter()
+    slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+    first_ts = last_ts = None
+
+    for seq, record in enumerate(records):
+        overall.add(record)
+
+        if group_by:
+            key = tuple(record.get(field) for field in group_by)
+            groups.setdefault(key, Summary()).add(record)
+
+        for name, sec in (record.get("stage_sec") or {}).items():
+            stages.setdefault(name, LatencySketch()).add(sec)
+
+        ts = parse_ts(record.get("ts"))
+        if ts is not None:
+            windows[int(ts // window_sec)] += 1
+            first_ts = ts if first_ts is None else min(first_ts, ts)
+            last_ts = ts if last_ts is None else max(last_ts, ts)
+
+        latency = record.get("latency_sec")
+        if isinstance(latency, (int, float)):
+            # Min-heap of the top-N latencies: only N records are kept.
+            entry = (float(latency), seq, {
+                "ts": record.get("ts"),
+                "query": record.get("query"),
+                "latency_sec": latency,
+                "endpoint": record.get("endpoint"),
+                "refusal_reason": record.get("refusal_reason"),
+                "stage_sec": record.get("stage_sec"),
+            })
+            if len(slowest) < top:
+                heapq.heappush(slowest, entry)
+            elif entry[0] > slowest[0][0]:
+                heapq.heapreplace(slowest, entry)
+
+    return {
+        "overall": overall,
+        "groups": groups,
+        "stages": stages,
+        "windows": windows,
+        "slowest": [entry for _, _, entry in sorted(slowest, key=lambda e: -e[0])],
+        "first_ts": first_ts,
+        "last_ts": last_ts,
+    }
+
+
+def report(result: Dict[str, Any], group_by: List[str], window_sec: float, max_windows: int) -> None:
+    overall: Summary = result["overall"]
+
+    print(f"Records: {overall.count}")
+    if result["first_ts"] is not None:
+        span = result["last_ts"] - result["first_ts"]
+        print(f"Span: {fmt_ts(result['first_ts'])} → {fmt_ts(result['last_ts'])} UTC ({span:.0f}s)")
+
+    if overall.latency.count:
+        pct = overall.percentiles()
+        print(
+            "Latency: "
+            + " ".join(f"{name}={value:.3f}s" for name, value in pct.items())
+            + f" mean={overall.latency.mean():.3f}s max={overall.latency.max:.3f}s"
+        )
+
+    print(f"Refusals: {overall.refused}/{overall.count} ({overall.refused / max(overall.count, 1):.1%})")
+    for reason, n in overall.reasons.most_common():
+        print(f"  {reason}: {n}")
+
+    if result["stages"]:
+        print("\n--- Stage latency ---")
+        for name, sketch in sorted(result["stages"].items()):
+            print(
+                f"{name:<10} n={sketch.count:<8} "
+                f"p50={sketch.quantile(0.5) * 1000:.1f}ms "
+                f"p95={sketch.quantile(0.95) * 1000:.1f}ms "
+                f"p99={sketch.quantile(0.99) * 1000:.1f}ms"
+            )
+
+    windows: Counter = result["windows"]
+    if windows:
+        rates = [n / window_sec for n in windows.values()]
+        print(f"\n--- Throughput per {window_sec:g}s window ---")
+        print(
+            f"windows={len(windows)} mean={sum(rates) / len(rates):.2f} req/s "
+            f"peak={max(rates):.2f} req/s"
+        )
+        for index in sorted(windows)[-max_windows:]:
+            print(f"{fmt_ts(index * window_sec)}  {windows[index]:>7}  {windows[index] / window_sec:.2f} req/s")
+
+    if result["groups"]:
+        print(f"\n--- By {', '.join(group_by)} ---")
+        for key, summary in sorted(result["groups"].items(), key=lambda item: -item[1].count):
+            pct = summary.percentiles()
+            label = ", ".join(f"{field}={value}" for field, value in zip(group_by, key))
+            print(
+                f"{label}: n={summary.count} "
+                f"refused={summary.refused / max(summary.count, 1):.1%} "
+                + " ".join(f"{name}={value:.3f}s" for name, value in pct.items())
+            )
+
+    if result["slowest"]:
+        print(f"\n--- Slowest {len(result['slowest'])} ---")
+        for entry in result["slowest"]:
+            print(f"{entry['latency_sec']:.3f}s  {entry['ts']}  {str(entry['query'])[:80]!r}")
+
+
+def to_json(result: Dict[str, Any], group_by: List[str], window_sec: float) -> Dict[str, Any]:
+    def summary_json(summary: Summary) -> Dict[str, Any]:
+        return {
+            "count": summary.count,
+            "refused": summary.refused,
+            "refusal_reasons": dict(summary.reasons),
+            "latency": {
+                **summary.percentiles(),
+                "mean": summary.latency.mean(),
+                "max": summary.latency.max,
+            },
+        }
+
+    return {
+        "overall": summary_json(result["overall"]),
+        "first_ts": result["first_ts"],
+        "last_ts": result["last_ts"],
+        "stages": {
+            name: {f"p{p}": sketch.quantile(p / 100) for p in PERCENTILES}
+            for name, sketch in result["stages"].items()
+        },
+        "throughput": [
+            {"window_start": index * window_sec, "count": n, "rps": n / window_sec}
+            for index, n in sorted(result["windows"].items())
+        ],
+        "groups": [
+            {"key": dict(zip(group_by, key)), **summary_json(summary)}
+            for key, summary in result["groups"].items()
+        ],
+        "slowest": result["slowest"],
+    }
+
+
+# -------------------------
+# Main
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Streaming analysis of RAG query logs.")
+    parser.add_argument("paths", nargs="*", type=Path, default=[DEFAULT_LOG],
+                        help="log files (rotated siblings included) or directories")
+    parser.add_argument("--group-by", default="", help="comma-separated record fields, e.g. llm_model,k,max_distance")
+    parser.add_argument("--window", type=float, default=60.0, help="throughput window in seconds")
+    parser.add_argument("--max-windows", type=int, default=24, help="most recent windows to print")
+    parser.add_argument("--top", type=int, default=10, help="slowest queries to list")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    files = [f for path in args.paths for f in log_files(path)]
+    group_by = [field for field in args.group_by.split(",") if field]
+
+    print("\n==== Query Log Analysis ====\n")
+
+    if not files:
+        print("No log files found.")
+        return
+
+    errors: Dict[str, int] = {}
+    result = analyze(iter_log_records(files, errors), group_by, args.window, args.top)
+
+    print(f"Files: {len(files)} (bad lines skipped: {errors.get('bad_lines', 0)})")
+    report(result, group_by, args.window, args.max_windows)
+
+    print("\n============================\n")
+
+    if args.json:
+        args.json.write_text(json.dumps(to_json(result, group_by, args.window), indent=2, default=str), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
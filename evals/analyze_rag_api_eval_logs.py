@@ -1,43 +1,62 @@
-import json
-from pathlib import Path
-from statistics import mean, median
-
-EVAL_LOG_FILE = Path("evals/rag_api_eval_results_v1.jsonl")
-
+"""
+Summary of the RAG API eval results (pass rate, refusals, retrieval hit
+rate, latency percentiles) in one streaming pass. Reads the results
+file and its rotated or archived siblings.
 
-def main():
-    rows = []
-
-    with open(EVAL_LOG_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            rows.append(json.loads(line))
-
-    if not rows:
-        print("No eval data found.")
-        return
+Imports the repo's packages, so run it as a module from the repo root:
 
-    total = len(rows)
+    python -m evals.analyze_rag_api_eval_logs
+    python -m evals.analyze_rag_api_eval_logs path/to/results.jsonl
+"""
 
-    passes = sum(r.get("passed", False) for r in rows)
+import argparse
+from pathlib import Path
 
-    must_refuse_cases = [r for r in rows if r.get("must_refuse")]
-    correct_refusals = sum(
-        r.get("must_refuse") and r.get("refused") for r in rows
-    )
+from apps.rag.query_log import iter_log_records, log_files
+from evals.analyze_query_logs import PERCENTILES, LatencySketch
 
-    non_refusal_cases = [r for r in rows if not r.get("must_refuse")]
-    retrieval_hits = sum(
-        r.get("hit", False) for r in non_refusal_cases
-    )
+EVAL_LOG_FILE = Path("evals/rag_api_eval_results_v1.jsonl")
 
-    latencies = [r["latency_sec"] for r in rows if "latency_sec" in r]
+MAX_FAILURES_SHOWN = 5
 
-    unexpected_refusals = [
-        r for r in rows
-        if (not r.get("must_refuse")) and r.get("refused")
-    ]
 
-    failures = [r for r in rows if not r.get("passed")]
+def main():
+    parser = argparse.ArgumentParser(description="Summarize RAG API eval logs.")
+    parser.add_argument("path", nargs="?", type=Path, default=EVAL_LOG_FILE)
+    args = parser.parse_args()
+
+    # Single streaming pass: counters and a latency sketch, never the rows.
+    total = 0
+    passes = 0
+    must_refuse_cases = 0
+    correct_refusals = 0
+    non_refusal_cases = 0
+    retrieval_hits = 0
+    unexpected_refusals = 0
+    latencies = LatencySketch()
+    failures = []
+
+    for r in iter_log_records(log_files(args.path)):
+        total += 1
+        passes += bool(r.get("passed", False))
+
+        if r.get("must_refuse"):
+            must_refuse_cases += 1
+            correct_refusals += bool(r.get("refused"))
+        else:
+            non_refusal_cases += 1
+            retrieval_hits += bool(r.get("hit", False))
+            unexpected_refusals += bool(r.get("refused"))
+
+        if "latency_sec" in r:
+            latencies.add(r["latency_sec"])
+
+        if not r.get("passed") and len(failures) < MAX_FAILURES_SHOWN:
+            failures.append(r)
+
+    if not total:
+        print("No eval data found.")
+        return
 
     print("\n==== RAG Eval Analysis ====\n")
 
@@ -47,26 +66,31 @@ def main():
     if non_refusal_cases:
         print(
             f"Retrieval hit rate (non-refusal): "
-            f"{retrieval_hits}/{len(non_refusal_cases)} "
-            f"({retrieval_hits/len(non_refusal_cases):.1%})"
+            f"{retrieval_hits}/{non_refusal_cases} "
+            f"({retrieval_hits/non_refusal_cases:.1%})"
         )
 
     if must_refuse_cases:
         print(
             f"Correct refusal rate: "
-            f"{correct_refusals}/{len(must_refuse_cases)} "
-            f"({correct_refusals/len(must_refuse_cases):.1%})"
+            f"{correct_refusals}/{must_refuse_cases} "
+            f"({correct_refusals/must_refuse_cases:.1%})"
         )
 
-    if latencies:
-        print(f"Avg latency: {mean(latencies):.2f}s")
-        print(f"Median latency: {median(latencies):.2f}s")
+    if latencies.count:
+        print(f"Avg latency: {latencies.mean():.2f}s")
+        print(
+            "Latency "
+            + "/".join(f"p{p}" for p in PERCENTILES)
+            + ": "
+            + " / ".join(f"{latencies.quantile(p / 100):.2f}s" for p in PERCENTILES)
+        )
 
-    print(f"Unexpected refusals: {len(unexpected_refusals)}")
+    print(f"Unexpected refusals: {unexpected_refusals}")
 
     if failures:
         print("\n--- Failed Queries ---")
-        for r in failures[:5]:  # cap at 5
+        for r in failures:
             print(f"- {r['eval_id']}: {r['query']}")
 
     print("\n========================\n")
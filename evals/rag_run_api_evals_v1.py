@@ -1,8 +1,13 @@
+import argparse
+import asyncio
 import json
+import os
+import random
 import time
 from pathlib import Path
+from typing import Any, Dict, List
 
-import requests
+import httpx
 
 
 # -------------------------
@@ -17,146 +22,208 @@ EVAL_LOG_FILE = BASE_DIR / "evals/rag_api_eval_results_v1.jsonl"
 
 TIMEOUT = 60
 
+# Requests in flight at once (the pooled client keeps this many connections)
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "8"))
+
+# Transient failures (connection errors, timeouts, these statuses) are
+# retried with exponential backoff and jitter
+MAX_RETRIES = int(os.getenv("EVAL_MAX_RETRIES", "3"))
+RETRY_BACKOFF_SEC = 0.5
+# Longest pause between attempts, whatever Retry-After the server sends
+RETRY_MAX_BACKOFF_SEC = float(os.getenv("EVAL_RETRY_MAX_BACKOFF_SEC", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 # LOGGING HELPER FUNCTION
 def log_eval_result(payload: dict):
     EVAL_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
     with open(EVAL_LOG_FILE, "a", encoding="utf-8") as log_file:
         log_file.write(json.dumps(payload) + "\n")
 
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
 # -------------------------
-# Main
+# Requests
 # -------------------------
-def main():
+def retry_delay(attempt: int, response: httpx.Response | None) -> float:
+    """
+    Retry-After when the server sends one, else exponential backoff with
+    jitter; either way clamped to 0..RETRY_MAX_BACKOFF_SEC.
+    """
+    delay = RETRY_BACKOFF_SEC * (2 ** attempt) * random.uniform(0.5, 1.5)
 
-    with open(EVAL_CASE_FILE, "r") as eval_file:
-        eval_data = json.load(eval_file)
+    if response is not None:
+        try:
+            delay = float(response.headers["retry-after"])
+        except (KeyError, ValueError):
+            pass
+
+    return min(RETRY_MAX_BACKOFF_SEC, max(0.0, delay))
+
+
+async def post_query(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    query_text: str,
+    max_retries: int,
+) -> Dict[str, Any]:
+    """
+    POST one query, retrying transient failures.
+
+    Latency covers every attempt (and the backoff between them), but not
+    the time spent waiting for a concurrency slot.
+    """
+    async with semaphore:
+        start_time = time.perf_counter()
+        response: httpx.Response | None = None
+        error: str | None = None
+
+        for attempt in range(max_retries + 1):
+            try:
+                response = await client.post(url, json={"query": query_text})
+                error = None
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            except httpx.TransportError as e:
+                response, error = None, f"{type(e).__name__}: {e}"
+
+            if attempt < max_retries:
+                await asyncio.sleep(retry_delay(attempt, response))
+
+        return {
+            "response": response,
+            "error": error,
+            "attempts": attempt + 1,
+            "latency": time.perf_counter() - start_time,
+        }
+
+
+# -------------------------
+# Eval logic
+# -------------------------
+def evaluate(case: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Print one case and build its log record."""
+    eval_id = case["id"]
+    query_text = case["query"]
+    expected_sources = set(case["expected_sources"])
+    must_refuse = case["must_refuse"]
+
+    response = result["response"]
+    latency = result["latency"]
+
+    print(f"--- {eval_id} ---")
+    print(f"Query: {query_text}")
+
+    record = {
+        "ts": time.time(),
+        "eval_id": eval_id,
+        "query": query_text,
+        "must_refuse": must_refuse,
+        "expected_sources": sorted(expected_sources),
+        "latency_sec": latency,
+        "http_status": response.status_code if response is not None else None,
+        "attempts": result["attempts"],
+    }
+
+    if response is None or response.status_code != 200:
+        error = result["error"] or f"HTTP {response.status_code}"
+        print(f"✗ Request failed after {result['attempts']} attempt(s): {error}\n")
+        record.update({"passed": False, "error": error})
+        return record
+
+    response_data = response.json()
 
+    answer = response_data["answer"]
+    model_refused = response_data["refused"]
+    refusal_reason = response_data["refusal_reason"]
+
+    # Build retrieved source set clearly
+    retrieved_sources = set()
+
+    source_list = response_data.get("sources", [])
+    for source_item in source_list:
+        source_name = source_item["source"]
+        retrieved_sources.add(source_name)
+
+    print(f"Answer: {answer}")
+    print(f"Refused: {model_refused}")
+    print(f"Sources: {retrieved_sources}")
+    print(f"Latency: {latency:.2f}s")
+
+    record.update({
+        "answer": answer,
+        "refused": model_refused,
+        "refusal_reason": refusal_reason,
+        "retrieved_sources": sorted(retrieved_sources),
+    })
+
+    if must_refuse:
+        passed = model_refused
+        print("✓ Correct refusal\n" if passed else "✗ Should have refused\n")
+        record["passed"] = passed
+        return record
+
+    # Not must_refuse
+    if model_refused:
+        print("✗ Unexpected refusal\n")
+        record.update({"passed": False, "hit": False})
+        return record
+
+    # Check overlap
+    hit = bool(retrieved_sources & expected_sources)
+    print("✓ Retrieval hit\n" if hit else "✗ Wrong sources\n")
+    record.update({"passed": hit, "hit": hit})
+    return record
+
+
+# -------------------------
+# Main
+# -------------------------
+async def run(eval_data: List[Dict[str, Any]], url: str, concurrency: int, max_retries: int) -> None:
     total_queries = len(eval_data)
 
     retrieval_hits = 0
     correct_refusals = 0
     total_passes = 0
-    total_latency = 0.0
+    failed_requests = 0
+    retries = 0
+    latencies: List[float] = []
 
     print("\n==== API RAG Eval v1 ====\n")
+    print(f"concurrency={concurrency} max_retries={max_retries}\n")
 
-    for case in eval_data:
-
-        eval_id = case["id"]
-        query_text = case["query"]
-        expected_sources = set(case["expected_sources"])
-        must_refuse = case["must_refuse"]
-
-        print(f"--- {eval_id} ---")
-        print(f"Query: {query_text}")
-
-        start_time = time.time()
-
-        response = requests.post(
-            API_URL,
-            json={"query": query_text},
-            timeout=TIMEOUT,
-        )
-
-        latency = time.time() - start_time
-        total_latency += latency
-
-        response_data = response.json()
-        
-        answer = response_data["answer"]
-        model_refused = response_data["refused"]
-        refusal_reason = response_data["refusal_reason"]
-
-        # Build retrieved source set clearly
-        retrieved_sources = set()
-
-        source_list = response_data.get("sources", [])
-        for source_item in source_list:
-            source_name = source_item["source"]
-            retrieved_sources.add(source_name)
-
-        print(f"Answer: {answer}")
-        print(f"Refused: {model_refused}")
-        print(f"Sources: {retrieved_sources}")
-        print(f"Latency: {latency:.2f}s")
-
-        # -------------------------
-        # Eval logic
-        # -------------------------
-        if must_refuse:
-
-            if model_refused:
-                correct_refusals += 1
-                total_passes += 1
-                passed = True
-                print("✓ Correct refusal\n")
-            else:
-                passed = False
-                print("✗ Should have refused\n")
-            log_eval_result({
-                "ts": time.time(),
-                "eval_id": eval_id,
-                "query": query_text,
-                "answer": answer,
-                "must_refuse": True,
-                "refused": model_refused,
-                "refusal_reason": refusal_reason,
-                "passed": passed,
-                "expected_sources": sorted(expected_sources),
-                "retrieved_sources": sorted(retrieved_sources),
-                "latency_sec": latency,
-                "http_status": response.status_code,
-            })
-            continue
-
-        # Not must_refuse
-        if model_refused:
-            print("✗ Unexpected refusal\n")
-            log_eval_result({
-                "ts": time.time(),
-                "eval_id": eval_id,
-                "query": query_text,
-                "answer": answer,
-                "must_refuse": False,
-                "refused": True,
-                "refusal_reason": refusal_reason,
-                "passed": False,
-                "expected_sources": sorted(expected_sources),
-                "retrieved_sources": sorted(retrieved_sources),
-                "hit": False,
-                "latency_sec": latency,
-                "http_status": response.status_code,
-            })
-            continue
-
-        # Check overlap
-        hit = False
-        for source in retrieved_sources:
-            if source in expected_sources:
-                hit = True
-                break
-
-        if hit:
-            retrieval_hits += 1
-            total_passes += 1
-            print("✓ Retrieval hit\n")
-        else:
-            print("✗ Wrong sources\n")
-        log_eval_result({
-            "ts": time.time(),
-            "eval_id": eval_id,
-            "query": query_text,
-            "answer": answer,
-            "must_refuse": False,
-            "refused": False,
-            "refusal_reason": refusal_reason,
-            "passed": hit,
-            "expected_sources": sorted(expected_sources),
-            "retrieved_sources": sorted(retrieved_sources),
-            "hit": hit,
-            "latency_sec": latency,
-            "http_status": response.status_code,
-        })
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    wall_start = time.perf_counter()
+
+    async with httpx.AsyncClient(timeout=TIMEOUT, limits=limits) as client:
+        tasks = [
+            asyncio.create_task(post_query(client, semaphore, url, case["query"], max_retries))
+            for case in eval_data
+        ]
+
+        # Awaiting in case order logs results in dataset order, as soon
+        # as every earlier case has finished.
+        for case, task in zip(eval_data, tasks):
+            result = await task
+            record = evaluate(case, result)
+            log_eval_result(record)
+
+            latencies.append(record["latency_sec"])
+            retries += record["attempts"] - 1
+            failed_requests += "error" in record
+            total_passes += record["passed"]
+            retrieval_hits += record.get("hit", False)
+            correct_refusals += case["must_refuse"] and record["passed"]
+
+    wall = time.perf_counter() - wall_start
+    latencies.sort()
 
     # -------------------------
     # Summary
@@ -166,9 +233,29 @@ def main():
     print(f"Retrieval hit rate: {retrieval_hits}/{total_queries}")
     print(f"Correct refusals: {correct_refusals}")
     print(f"Overall passes: {total_passes}/{total_queries}")
-    print(f"Avg latency: {total_latency/total_queries:.2f}s")
+    print(f"Failed requests: {failed_requests} (retries: {retries})")
+    print(f"Wall time: {wall:.2f}s (sum of latencies: {sum(latencies):.2f}s)")
+    print(f"Avg latency: {sum(latencies)/total_queries:.2f}s")
+    print(
+        f"Latency p50/p95/p99: {percentile(latencies, 50):.2f}s / "
+        f"{percentile(latencies, 95):.2f}s / {percentile(latencies, 99):.2f}s"
+    )
     print("==================\n")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Run the RAG eval set against the API.")
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--concurrency", type=int, default=EVAL_CONCURRENCY)
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES)
+    parser.add_argument("--cases", type=Path, default=EVAL_CASE_FILE)
+    args = parser.parse_args()
+
+    with open(args.cases, "r") as eval_file:
+        eval_data = json.load(eval_file)
+
+    asyncio.run(run(eval_data, args.url, max(1, args.concurrency), max(0, args.max_retries)))
+
+
 if __name__ == "__main__":
     main()
@@ -1,6 +1,9 @@
+import argparse
 import json
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -9,6 +12,8 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
+from apps.rag.numpy_store import QUANTIZATIONS, NumpyVectorStore
+
 
 # -------------------------
 # Paths
@@ -17,6 +22,7 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 
 EVAL_FILE = BASE_DIR / "evals/rag_eval_queries_v1.json"
 PERSIST_DIR = BASE_DIR / "data/vectorstore/langchain_db"
+NUMPY_STORE_DIR = BASE_DIR / "data/vectorstore/langchain_numpy"
 
 
 # -------------------------
@@ -30,7 +36,7 @@ MAX_DISTANCE = 1.05  # retrieval relevance threshold
 # Retrieval helper
 # -------------------------
 def retrieve(
-    vectordb: Chroma,
+    vectordb: Chroma | NumpyVectorStore,
     query: str,
     k: int = K,
 ) -> List[Tuple[Document, float]]:
@@ -39,10 +45,187 @@ def retrieve(
     return filtered
 
 
+def recall_at_k(
+    store: NumpyVectorStore,
+    baseline: NumpyVectorStore,
+    query_embedding: List[float],
+    k: int = K,
+) -> float:
+    """Share of the float32 top-k that the quantized store also returns."""
+    expected = {doc.id for doc, _ in baseline.search_by_vector(query_embedding, k)}
+    got = {doc.id for doc, _ in store.search_by_vector(query_embedding, k)}
+    return len(expected & got) / len(expected) if expected else 1.0
+
+
+# -------------------------
+# Sweep
+# -------------------------
+def retrieve_once(
+    vectordb: Chroma | NumpyVectorStore,
+    query_embeddings: List[List[float]],
+    k: int,
+) -> Tuple[np.ndarray, List[List[str]]]:
+    """
+    Top-k distances and source names for every query, in one store call.
+
+    Distances are padded with inf when the store returns fewer than k.
+    """
+    if isinstance(vectordb, NumpyVectorStore):
+        batched = vectordb.search_by_vectors(query_embeddings, k)
+        distances = [[dist for _, dist in hits] for hits in batched]
+        sources = [[Path(doc.metadata.get("source", "")).name for doc, _ in hits] for hits in batched]
+    else:
+        results = vectordb._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=k,
+            include=["metadatas", "distances"],
+        )
+        distances = results["distances"]
+        sources = [
+            [Path((metadata or {}).get("source", "")).name for metadata in metadatas]
+            for metadatas in results["metadatas"]
+        ]
+
+    padded = np.full((len(query_embeddings), k), np.inf)
+    for i, row in enumerate(distances):
+        padded[i, :len(row)] = row
+
+    return padded, sources
+
+
+def sweep_metrics(
+    eval_data: List[Dict[str, Any]],
+    distances: np.ndarray,
+    sources: List[List[str]],
+    ks: List[int],
+    thresholds: List[float],
+) -> Dict[str, np.ndarray]:
+    """
+    Metrics for every (k, threshold) pair, each of shape (len(ks), len(thresholds)).
+
+    A query keeps the hits ranked below k with distance <= threshold; no
+    kept hit means a refusal. Matches the per-case logic above:
+
+    - hit_rate: answerable queries with an expected source kept
+    - refusal_rate: must-refuse queries with nothing kept
+    - pass_rate: hit for answerable queries, refusal for the rest
+    - recall: share of an answerable query's expected sources kept
+    - chunks: average chunks kept per query (prompt cost)
+    """
+    n_queries, max_k = distances.shape
+    max_expected = max(1, max(len(case["expected_sources"]) for case in eval_data))
+
+    # matches[q, r, j]: hit r of query q comes from expected source j
+    matches = np.zeros((n_queries, max_k, max_expected), dtype=bool)
+    n_expected = np.zeros(n_queries)
+
+    for q, case in enumerate(eval_data):
+        n_expected[q] = len(case["expected_sources"])
+        for j, source in enumerate(case["expected_sources"]):
+            for r, name in enumerate(sources[q]):
+                matches[q, r, j] = name == source
+
+    must_refuse = np.array([case["must_refuse"] for case in eval_data])
+    answerable = ~must_refuse
+
+    ranks = np.arange(max_k)
+    # kept[a, b, q, r]: hit r of query q survives k = ks[a], threshold = thresholds[b]
+    kept = (ranks[None, None, None, :] < np.asarray(ks)[:, None, None, None]) \
+        & (distances[None, None, :, :] <= np.asarray(thresholds)[None, :, None, None])
+
+    any_kept = kept.any(axis=-1)
+    found = (kept[..., None] & matches[None, None]).any(axis=-2)
+    hit = found.any(axis=-1)
+    recall = found.sum(axis=-1) / np.maximum(n_expected, 1)
+
+    return {
+        "hit_rate": hit[..., answerable].mean(axis=-1) if answerable.any() else np.ones(hit.shape[:2]),
+        "refusal_rate": (~any_kept[..., must_refuse]).mean(axis=-1) if must_refuse.any() else np.ones(hit.shape[:2]),
+        "pass_rate": np.where(must_refuse, ~any_kept, hit).mean(axis=-1),
+        "recall": recall[..., answerable].mean(axis=-1) if answerable.any() else np.ones(hit.shape[:2]),
+        "chunks": kept.sum(axis=-1).mean(axis=-1),
+    }
+
+
+def print_sweep(
+    metrics: Dict[str, np.ndarray],
+    ks: List[int],
+    thresholds: List[float],
+    target_hit_rate: float,
+    min_refusal_rate: float,
+) -> None:
+    print("\n==== Retrieval sweep ====\n")
+    print(f"{'k':>3} {'threshold':>9} {'hit_rate':>8} {'refusals':>8} {'pass':>6} {'recall':>6} {'chunks':>6}")
+
+    for a, k in enumerate(ks):
+        for b, threshold in enumerate(thresholds):
+            print(
+                f"{k:>3} {threshold:>9.3f} "
+                f"{metrics['hit_rate'][a, b]:>8.1%} "
+                f"{metrics['refusal_rate'][a, b]:>8.1%} "
+                f"{metrics['pass_rate'][a, b]:>6.1%} "
+                f"{metrics['recall'][a, b]:>6.1%} "
+                f"{metrics['chunks'][a, b]:>6.2f}"
+            )
+
+    # Frontier: for each k, the threshold with the best pass rate (ties go
+    # to the fewest chunks); the first k that reaches the targets is the
+    # cheapest setting.
+    print(f"\n---- Frontier (target hit_rate >= {target_hit_rate:.0%}, refusals >= {min_refusal_rate:.0%}) ----\n")
+
+    cheapest = None
+
+    for a, k in enumerate(ks):
+        ok = (metrics["hit_rate"][a] >= target_hit_rate) & (metrics["refusal_rate"][a] >= min_refusal_rate)
+        candidates = np.flatnonzero(ok) if ok.any() else np.arange(len(thresholds))
+        b = min(candidates, key=lambda i: (-metrics["pass_rate"][a, i], metrics["chunks"][a, i]))
+
+        meets = bool(ok.any())
+        if meets and cheapest is None:
+            cheapest = (k, thresholds[b])
+
+        print(
+            f"k={k:<3} threshold={thresholds[b]:.3f} "
+            f"hit_rate={metrics['hit_rate'][a, b]:.1%} "
+            f"refusals={metrics['refusal_rate'][a, b]:.1%} "
+            f"pass={metrics['pass_rate'][a, b]:.1%} "
+            f"chunks={metrics['chunks'][a, b]:.2f}"
+            f"{'' if meets else '  (below target)'}"
+        )
+
+    if cheapest is None:
+        print("\nNo (k, threshold) in the grid meets the target.")
+    else:
+        print(f"\nCheapest setting: K={cheapest[0]} MAX_DISTANCE={cheapest[1]:.3f}")
+    print("\n=========================\n")
+
+
+def run_sweep(vectordb, embeddings, eval_data: List[Dict[str, Any]], args: argparse.Namespace) -> None:
+    ks = sorted({int(k) for k in args.ks.split(",")})
+    thresholds = sorted({float(t) for t in args.thresholds.split(",")})
+
+    # One embedding call for the whole eval set, one search at the largest k.
+    query_embeddings = embeddings.embed_documents([case["query"] for case in eval_data])
+    distances, sources = retrieve_once(vectordb, query_embeddings, max(ks))
+
+    metrics = sweep_metrics(eval_data, distances, sources, ks, thresholds)
+    print_sweep(metrics, ks, thresholds, args.target_hit_rate, args.min_refusal_rate)
+
+
 # -------------------------
 # Eval logic
 # -------------------------
 def main():
+    parser = argparse.ArgumentParser(description="Retrieval eval over rag_eval_queries_v1.json.")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default="none")
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--sweep", action="store_true", help="evaluate a grid of k and thresholds in one pass")
+    parser.add_argument("--ks", default="1,2,3,4,5,6,8,10")
+    parser.add_argument("--thresholds", default="0.8,0.9,0.95,1.0,1.05,1.1,1.2,1.3")
+    parser.add_argument("--target-hit-rate", type=float, default=0.75)
+    parser.add_argument("--min-refusal-rate", type=float, default=1.0)
+    args = parser.parse_args()
 
     # Load eval dataset
     with open(EVAL_FILE, "r") as eval_file:
@@ -50,12 +233,30 @@ def main():
 
     # Load vector DB
     embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    vectordb = Chroma(
-        persist_directory=str(PERSIST_DIR),
-        embedding_function=embeddings,
-    )
+    baseline = None
 
-    print(f"\nCollection count: {vectordb._collection.count()}\n")
+    if args.backend == "numpy":
+        # Quantized runs are compared against exact float32 search.
+        vectordb = NumpyVectorStore(
+            NUMPY_STORE_DIR,
+            embeddings=embeddings,
+            quantization=args.quantization,
+            rescore_factor=args.rescore_factor,
+        )
+        baseline = NumpyVectorStore(NUMPY_STORE_DIR, embeddings=embeddings)
+        print(f"\nCollection count: {vectordb.count()} (quantization: {args.quantization})\n")
+    else:
+        vectordb = Chroma(
+            persist_directory=str(PERSIST_DIR),
+            embedding_function=embeddings,
+        )
+        print(f"\nCollection count: {vectordb._collection.count()}\n")
+
+    if args.sweep:
+        run_sweep(vectordb, embeddings, eval_data, args)
+        return
+
+    recalls: List[float] = []
 
     total = len(eval_data)
     retrieval_hits = 0
@@ -74,7 +275,16 @@ def main():
         print(f"--- {eval_id} ---")
         print(f"Q: {eval_query}")
 
-        results = retrieve(vectordb, eval_query)
+        if baseline is not None:
+            query_embedding = embeddings.embed_query(eval_query)
+            recalls.append(recall_at_k(vectordb, baseline, query_embedding))
+            results = [
+                (doc, dist)
+                for doc, dist in vectordb.search_by_vector(query_embedding, K)
+                if dist <= MAX_DISTANCE
+            ]
+        else:
+            results = retrieve(vectordb, eval_query)
 
         if not results:
             print("No relevant retrieval.\n")
@@ -121,6 +331,14 @@ def main():
     print(f"Retrieval hit rate: {retrieval_hits}/{total}")
     print(f"Correct refusals: {correct_refusals}")
     print(f"Overall passes: {passes}/{total}")
+
+    if baseline is not None:
+        stats = vectordb.stats()
+        print(f"Recall@{K} vs float32: {sum(recalls) / len(recalls):.3f}")
+        print(
+            f"Scanned vector memory: {stats['scan_bytes'] / 1024 ** 2:.2f} MB "
+            f"(float32: {stats['float32_bytes'] / 1024 ** 2:.2f} MB)"
+        )
     print("==================\n")
 
 
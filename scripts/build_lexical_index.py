@@ -0,0 +1,28 @@
+import time
+from pathlib import Path
+
+from apps.rag.lexical_index import build_index
+from scripts.embed_langchain_chunks import CHUNKS_FILE, iter_chunks
+
+# ---------- Paths ----------
+INDEX_DIR = Path("data/vectorstore/lexical_index")
+
+
+def build(chunks_file: Path = CHUNKS_FILE, index_dir: Path = INDEX_DIR) -> int:
+    """Index chunks.jsonl under the same content-hash ids as the vector store."""
+    return build_index(
+        ((doc.id, doc.page_content) for doc in iter_chunks(chunks_file)),
+        index_dir,
+    )
+
+
+def main():
+    start = time.perf_counter()
+    count = build()
+
+    print(f"Lexical index saved → {INDEX_DIR} ({count} chunks, {time.perf_counter() - start:.1f}s)")
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,402 @@
-from pathlib import Pathimport jsonfrom langchain_text_splitters import TokenTextSplitterfrom langchain_core.documents import Document# ---------- Paths ----------RAW_DIR = Path("data/raw/langchain")OUT_DIR = Path("data/processed/langchain")OUT_DIR.mkdir(parents=True, exist_ok=True)CHUNKS_FILE = OUT_DIR / "chunks.jsonl"# ---------- Step 1: Load ----------docs = []for file in RAW_DIR.rglob("*.mdx"):    try:        text = file.read_text(encoding="utf-8")        # Skip tiny files (navigation, stubs, etc.)        if len(text) < 200:            continue        metadata = {            "source": str(file.relative_to(RAW_DIR))        }        docs.append(            Document(                page_content=text,                metadata=metadata            )        )    except Exception as e:        print(f"Skipping {file}: {e}")print(f"Loaded {len(docs)} docs")# ---------- Step 2: Chunk ----------splitter = TokenTextSplitter(    chunk_size=800,    chunk_overlap=200)chunks = splitter.split_documents(docs)print(f"Created {len(chunks)} chunks")# ---------- Step 3: Cache ----------with open(CHUNKS_FILE, "w", encoding="utf-8") as f:    for chunk in chunks:        record = {            "text": chunk.page_content,            "metadata": chunk.metadata        }        f.write(json.dumps(record) + "\n")print(f"Saved chunks → {CHUNKS_FILE}")print("Done.")
\ No newline at end of file
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import tiktoken
+
+# ---------- Paths ----------
+RAW_DIR = Path("data/raw/langchain")
+OUT_DIR = Path("data/processed/langchain")
+CHUNKS_FILE = OUT_DIR / "chunks.jsonl"
+STATE_FILE = OUT_DIR / "chunk_state.json"
+
+# ---------- Config ----------
+ENCODING = "cl100k_base"  # tokenizer of text-embedding-3-small
+CHUNK_TOKENS = 800
+OVERLAP_TOKENS = 200
+MIN_CHARS = 200  # skip tiny files (navigation, stubs, etc.)
+
+FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})")
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*\S)")
+
+_encoder: tiktoken.Encoding | None = None
+
+
+def encoder() -> tiktoken.Encoding:
+    # One encoder per worker process.
+    global _encoder
+    if _encoder is None:
+        _encoder = tiktoken.get_encoding(ENCODING)
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    return len(encoder().encode(text, disallowed_special=()))
+
+
+# ---------- Step 1: Split into blocks ----------
+@dataclass
+class Block:
+    kind: str        # "text" | "code"
+    text: str
+    tokens: int
+    section: str     # heading path the block sits under, e.g. "Agents > Tools"
+
+
+def split_blocks(text: str) -> List[Block]:
+    """
+    Split markdown into atomic blocks.
+
+    - A fenced code block is one block, never split across chunks
+      unless it alone exceeds the token budget
+    - Paragraphs are separated by blank lines
+    - A heading is glued to the block that follows it, so a chunk never
+      ends on a dangling heading
+    """
+    raw: List[Tuple[str, str]] = []
+    buf: List[str] = []
+
+    def flush() -> None:
+        if buf:
+            raw.append(("text", "\n".join(buf)))
+            buf.clear()
+
+    lines = text.splitlines()
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+        fence = FENCE_RE.match(line)
+
+        if fence:
+            flush()
+            marker = fence.group(1)
+            code = [line]
+            i += 1
+
+            while i < len(lines):
+                code.append(lines[i])
+                closing = lines[i].strip()
+                i += 1
+                if closing.startswith(marker) and not closing.strip(marker[0]):
+                    break
+
+            raw.append(("code", "\n".join(code)))
+            continue
+
+        if HEADING_RE.match(line):
+            flush()
+            raw.append(("heading", line.strip()))
+        elif not line.strip():
+            flush()
+        else:
+            buf.append(line)
+
+        i += 1
+
+    flush()
+
+    blocks: List[Block] = []
+    headings: List[Tuple[int, str]] = []
+    pending: List[str] = []
+
+    for kind, body in raw:
+        if kind == "heading":
+            match = HEADING_RE.match(body)
+            level = len(match.group(1))
+            headings = [h for h in headings if h[0] < level] + [(level, match.group(2))]
+            pending.append(body)
+            continue
+
+        block_text = "\n\n".join(pending + [body])
+        blocks.append(Block(
+            kind=kind,
+            text=block_text,
+            tokens=count_tokens(block_text),
+            section=" > ".join(h[1] for h in headings),
+        ))
+        pending = []
+
+    if pending:
+        block_text = "\n\n".join(pending)
+        blocks.append(Block("text", block_text, count_tokens(block_text), " > ".join(h[1] for h in headings)))
+
+    return blocks
+
+
+# ---------- Step 2: Pack blocks into chunks ----------
+def split_oversized(block: Block, budget: int, overlap: int) -> List[Block]:
+    """Split a single block that exceeds the budget on its own."""
+    pieces: List[Block] = []
+
+    if block.kind == "code":
+        lines = block.text.split("\n")
+        # Keep any glued headings with the first piece; re-open the fence
+        # on every piece so each stays valid markdown.
+        fence_at = next(i for i, line in enumerate(lines) if FENCE_RE.match(line))
+        prefix, opener = lines[:fence_at], lines[fence_at]
+        body = lines[fence_at + 1:]
+        closer = body.pop() if body and FENCE_RE.match(body[-1]) else FENCE_RE.match(opener).group(1)
+
+        current: List[str] = []
+        current_tokens = count_tokens("\n".join(prefix + [opener, closer]))
+
+        for line in body:
+            line_tokens = count_tokens(line) + 1
+            if current and current_tokens + line_tokens > budget:
+                text = "\n".join((prefix if not pieces else []) + [opener] + current + [closer])
+                pieces.append(Block("code", text, count_tokens(text), block.section))
+                current, current_tokens = [], count_tokens("\n".join([opener, closer]))
+            current.append(line)
+            current_tokens += line_tokens
+
+        text = "\n".join((prefix if not pieces else []) + [opener] + current + [closer])
+        pieces.append(Block("code", text, count_tokens(text), block.section))
+        return pieces
+
+    tokens = encoder().encode(block.text, disallowed_special=())
+    step = max(1, budget - overlap)
+
+    for start in range(0, len(tokens), step):
+        window = tokens[start:start + budget]
+        text = encoder().decode(window)
+        pieces.append(Block("text", text, len(window), block.section))
+        if start + budget >= len(tokens):
+            break
+
+    return pieces
+
+
+def pack_blocks(blocks: List[Block], budget: int, overlap: int) -> List[List[Block]]:
+    """
+    Greedily fill chunks up to the token budget.
+
+    Each new chunk starts with the trailing blocks of the previous one
+    (up to `overlap` tokens), so context carries across chunk boundaries
+    without ever cutting a block in half.
+    """
+    chunks: List[List[Block]] = []
+    current: List[Block] = []
+    current_tokens = 0
+
+    for block in blocks:
+        if block.tokens > budget:
+            if current:
+                chunks.append(current)
+            chunks.extend([piece] for piece in split_oversized(block, budget, overlap))
+            current, current_tokens = [], 0
+            continue
+
+        # +1 approximates the "\n\n" separator between blocks.
+        if current and current_tokens + block.tokens + 1 > budget:
+            chunks.append(current)
+
+            carry: List[Block] = []
+            carry_tokens = 0
+            for prev in reversed(current):
+                needed = carry_tokens + prev.tokens + 1
+                if needed > overlap or needed + block.tokens + 1 > budget:
+                    break
+                carry.insert(0, prev)
+                carry_tokens = needed
+
+            current, current_tokens = carry, carry_tokens
+
+        current.append(block)
+        current_tokens += block.tokens + 1
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+# ---------- Step 3: Per-file worker ----------
+def chunk_file(job: Tuple[str, str, str | None]) -> Dict[str, Any]:
+    """
+    Chunk one file (runs in a worker process).
+
+    An unreadable or non-UTF-8 file comes back with an "error" instead of
+    records, so one bad doc does not abort the pool run.
+    """
+    path, source, previous_sha = job
+
+    try:
+        data = Path(path).read_bytes()
+        stat = os.stat(path)
+    except OSError as e:
+        return {"source": source, "error": str(e)}
+
+    sha = hashlib.sha256(data).hexdigest()
+
+    result: Dict[str, Any] = {
+        "source": source,
+        "sha256": sha,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "unchanged": sha == previous_sha,
+        "records": [],
+    }
+
+    if result["unchanged"]:
+        return result
+
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return {**result, "error": str(e)}
+
+    if len(text) < MIN_CHARS:
+        return result
+
+    chunks = pack_blocks(split_blocks(text), CHUNK_TOKENS, OVERLAP_TOKENS)
+
+    for ordinal, blocks in enumerate(chunks):
+        chunk_text = "\n\n".join(block.text for block in blocks)
+        result["records"].append({
+            "text": chunk_text,
+            "metadata": {
+                "source": source,
+                "ordinal": ordinal,
+                "token_count": count_tokens(chunk_text),
+                "section": blocks[0].section,
+            },
+        })
+
+    return result
+
+
+# ---------- Incremental state ----------
+def current_config() -> Dict[str, Any]:
+    return {
+        "encoding": ENCODING,
+        "chunk_tokens": CHUNK_TOKENS,
+        "overlap_tokens": OVERLAP_TOKENS,
+        "min_chars": MIN_CHARS,
+    }
+
+
+def load_state() -> Dict[str, Any]:
+    if not STATE_FILE.exists() or not CHUNKS_FILE.exists():
+        return {}
+
+    state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+
+    # Different chunking parameters invalidate every cached chunk.
+    if state.get("config") != current_config():
+        return {}
+
+    return state
+
+
+def copy_unchanged(unchanged: set, out) -> int:
+    """Stream chunks of unchanged files from the previous chunks.jsonl."""
+    copied = 0
+
+    with open(CHUNKS_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            if json.loads(line)["metadata"].get("source") in unchanged:
+                out.write(line)
+                copied += 1
+
+    return copied
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Token-aware chunking of data/raw/langchain into chunks.jsonl."
+    )
+    parser.add_argument("--full", action="store_true", help="Re-chunk every file.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    state = {} if args.full else load_state()
+    previous: Dict[str, Dict[str, Any]] = state.get("files", {})
+
+    # ---------- Step 1: Find changed files ----------
+    files = sorted(RAW_DIR.rglob("*.mdx"))
+    print(f"Found {len(files)} docs")
+
+    unchanged: set = set()
+    jobs: List[Tuple[str, str, str | None]] = []
+    new_state: Dict[str, Dict[str, Any]] = {}
+
+    for file in files:
+        source = str(file.relative_to(RAW_DIR))
+        stat = file.stat()
+        prev = previous.get(source)
+
+        # Same mtime and size: trust it without reading the file.
+        if prev and prev["mtime_ns"] == stat.st_mtime_ns and prev["size"] == stat.st_size:
+            unchanged.add(source)
+            new_state[source] = prev
+            continue
+
+        jobs.append((str(file), source, prev["sha256"] if prev else None))
+
+    # ---------- Step 2: Chunk in a process pool, streaming output ----------
+    tmp_file = CHUNKS_FILE.with_suffix(".jsonl.tmp")
+    written = 0
+    rechunked = 0
+    skipped: set = set()
+
+    with open(tmp_file, "w", encoding="utf-8") as out:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for result in pool.map(chunk_file, jobs, chunksize=4):
+                source = result["source"]
+
+                if "error" in result:
+                    # Left out of the state, so the next run retries it.
+                    print(f"Skipping {source}: {result['error']}")
+                    skipped.add(source)
+                    continue
+
+                if result["unchanged"]:
+                    # Touched but identical content (hash match).
+                    unchanged.add(source)
+                    new_state[source] = {**previous[source], "mtime_ns": result["mtime_ns"]}
+                    continue
+
+                for record in result["records"]:
+                    out.write(json.dumps(record) + "\n")
+                written += len(result["records"])
+                rechunked += 1
+
+                new_state[source] = {
+                    "mtime_ns": result["mtime_ns"],
+                    "size": result["size"],
+                    "sha256": result["sha256"],
+                    "chunks": len(result["records"]),
+                }
+
+        copied = copy_unchanged(unchanged, out) if unchanged else 0
+
+    tmp_file.replace(CHUNKS_FILE)
+
+    STATE_FILE.write_text(
+        json.dumps({"config": current_config(), "files": new_state}, indent=2),
+        encoding="utf-8",
+    )
+
+    deleted = len(previous.keys() - new_state.keys() - skipped)
+
+    print(f"Re-chunked {rechunked} files → {written} chunks")
+    print(f"Unchanged {len(unchanged)} files → {copied} chunks copied")
+    print(f"Removed {deleted} deleted files")
+    if skipped:
+        print(f"Skipped {len(skipped)} unreadable files")
+    print(f"Saved chunks → {CHUNKS_FILE}")
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import time
+from pathlib import Path
+
+from apps.rag.query_log import ARCHIVE_SUFFIX, compact_log, iter_log_records, log_files
+
+# ---------- Paths ----------
+LOG_FILE = Path("logs/rag_queries_v1.jsonl")
+
+
+def rotated_logs(log_file: Path) -> list[Path]:
+    """Rotated JSONL files (plain or .gz) not archived yet; never the live file."""
+    return [
+        p for p in log_files(log_file)
+        if p != log_file and p.suffix != ARCHIVE_SUFFIX
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact rotated query logs into columnar .npz archives.")
+    parser.add_argument("log_file", nargs="?", type=Path, default=LOG_FILE)
+    parser.add_argument("--keep", action="store_true", help="keep the rotated JSONL files")
+    parser.add_argument("--keep-answers", action="store_true", help="archive the answer text too")
+    args = parser.parse_args()
+
+    files = rotated_logs(args.log_file)
+    if not files:
+        print(f"No rotated logs next to {args.log_file}.")
+        return
+
+    for path in files:
+        start = time.perf_counter()
+        size = path.stat().st_size
+        expected = sum(1 for _ in iter_log_records([path]))
+
+        archive = compact_log(path, keep_answers=args.keep_answers, remove_source=False)
+
+        # Never drop the source unless every record made it into the archive.
+        archived = sum(1 for _ in iter_log_records([archive]))
+        if archived != expected:
+            archive.unlink()
+            print(f"✗ {path.name}: archived {archived} of {expected} records, kept the source")
+            continue
+
+        if not args.keep:
+            path.unlink()
+
+        print(
+            f"{path.name} → {archive.name} "
+            f"({expected} records, {size / 1e6:.1f} MB → {archive.stat().st_size / 1e6:.1f} MB, "
+            f"{time.perf_counter() - start:.1f}s)"
+        )
+
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
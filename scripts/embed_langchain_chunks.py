@@ -1,64 +1,280 @@
+import argparse
+import hashlib
 import json
 import shutil
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Set
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
 from chromadb.config import Settings
 
+from scripts.embedding_scheduler import EmbeddingBatch, EmbeddingScheduler
+
 # ---------- Paths ----------
 CHUNKS_FILE = Path("data/processed/langchain/chunks.jsonl")
 DB_DIR = Path("data/vectorstore/langchain_db")
+MANIFEST_FILE = DB_DIR / "manifest.json"
+CHECKPOINT_FILE = DB_DIR / "ingest_checkpoint.jsonl"
+
+# ---------- Config ----------
+EMBED_MODEL = "text-embedding-3-small"
+BATCH_SIZE = 100  # inputs per embeddings request
+
+
+# ---------- Helpers ----------
+def chunk_id(source: str, text: str) -> str:
+    """Stable chunk id: same source + same text always maps to the same id."""
+    return hashlib.sha256(f"{source}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def iter_chunks(path: Path) -> Iterator[Document]:
+    """
+    Stream chunks.jsonl one line at a time.
+
+    Exact duplicates (same content-hash id) are yielded once. Only ids are
+    remembered, never chunk text, so memory does not grow with corpus size.
+    """
+    seen: Set[str] = set()
+
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            row = json.loads(line)
+            doc_id = chunk_id(row["metadata"].get("source", ""), row["text"])
+
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+
+            yield Document(
+                id=doc_id,
+                page_content=row["text"],
+                metadata=row["metadata"],
+            )
+
+
+def load_manifest() -> dict:
+    if not MANIFEST_FILE.exists():
+        return {}
+
+    # Only the header is needed; avoid parsing the (large) chunk list.
+    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+        try:
+            return json.loads(f.readline())
+        except json.JSONDecodeError:
+            return {}
+
 
-# ---------- Rebuild DB cleanly (dev-friendly) ----------
-if DB_DIR.exists():
-    shutil.rmtree(DB_DIR)
+class ManifestWriter:
+    """
+    Streams the manifest to disk while chunks are being read.
 
-DB_DIR.mkdir(parents=True, exist_ok=True)
+    Format: a JSON header on the first line, then one {"id", "source"}
+    record per indexed chunk. The file is only swapped in on close(), so
+    an interrupted run keeps the previous manifest.
+    """
 
-# ---------- Load chunks ----------
-docs = []
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.tmp_path = path.with_suffix(".tmp")
+        self.count = 0
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+        self._file.write(json.dumps({
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "embed_model": EMBED_MODEL,
+            "chunks_file": str(CHUNKS_FILE),
+        }) + "\n")
 
-with open(CHUNKS_FILE, "r", encoding="utf-8") as file:
-    for line in file:
-        row = json.loads(line)
-        docs.append(
-            Document(
-                page_content=row["text"],   
-                metadata=row["metadata"]
+    def add(self, doc: Document) -> None:
+        self._file.write(json.dumps({
+            "id": doc.id,
+            "source": doc.metadata.get("source", ""),
+        }) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+        self.tmp_path.replace(self.path)
+
+
+def open_store() -> Chroma:
+    # Vectors come from the embedding scheduler, so the store itself
+    # never needs to call the embedding model.
+    return Chroma(
+        persist_directory=str(DB_DIR),
+        client_settings=Settings(
+            anonymized_telemetry=False,
+            is_persistent=True
+        ),
+    )
+
+
+def make_batches(docs: Iterable[Document], size: int = BATCH_SIZE) -> Iterator[EmbeddingBatch]:
+    """Group a document stream into embedding batches, lazily."""
+    batch: List[Document] = []
+
+    for doc in docs:
+        batch.append(doc)
+
+        if len(batch) == size:
+            yield EmbeddingBatch(
+                ids=[d.id for d in batch],
+                texts=[d.page_content for d in batch],
+                metadatas=[d.metadata for d in batch],
             )
+            batch = []
+
+    if batch:
+        yield EmbeddingBatch(
+            ids=[d.id for d in batch],
+            texts=[d.page_content for d in batch],
+            metadatas=[d.metadata for d in batch],
         )
 
-print(f"Loaded {len(docs)} chunks")
-print(f"Embedding {len(docs)} documents...")
-
-# ---------- Embed ----------
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-small",
-    chunk_size=100  # helps avoid rate limits on larger corpora
-)
-
-# vectorstore = Chroma.from_documents(
-#     documents=docs,
-#     embedding=embeddings,
-#     persist_directory=str(DB_DIR)
-# )
-
-vectorstore = Chroma.from_documents(
-    documents=docs,
-    embedding=embeddings,
-    persist_directory=str(DB_DIR),
-    client_settings=Settings(
-        anonymized_telemetry=False,
-        is_persistent=True
+
+def plan_chunks(
+    docs: Iterable[Document],
+    unseen_ids: Set[str],
+    manifest: ManifestWriter,
+    counts: Dict[str, int],
+) -> Iterator[Document]:
+    """
+    Record every chunk in the manifest and pass on only the unindexed ones.
+
+    Indexed ids are removed from unseen_ids as they are matched, so what
+    is left at the end is exactly the set of stale chunks.
+    """
+    for doc in docs:
+        manifest.add(doc)
+
+        if doc.id in unseen_ids:
+            unseen_ids.discard(doc.id)
+            counts["unchanged"] += 1
+            continue
+
+        counts["added"] += 1
+        yield doc
+
+
+def make_writer(vectorstore: Chroma) -> Callable[[EmbeddingBatch, List[List[float]]], None]:
+    written = 0
+
+    def write_batch(batch: EmbeddingBatch, vectors: List[List[float]]) -> None:
+        nonlocal written
+
+        vectorstore._collection.upsert(
+            ids=batch.ids,
+            embeddings=vectors,
+            documents=batch.texts,
+            metadatas=batch.metadatas,
+        )
+
+        written += len(batch.ids)
+        print(f"  embedded {written}")
+
+    return write_batch
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Embed chunks.jsonl into the local Chroma vector store."
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Delete the vector store and re-embed every chunk.",
     )
-)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum embedding requests in flight (adapts down on 429s).",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=None,
+        help="OpenAI-compatible API base URL (default: $OPENAI_BASE_URL or OpenAI).",
+    )
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+
+    if manifest and manifest.get("embed_model") != EMBED_MODEL:
+        print(
+            f"Embedding model changed ({manifest.get('embed_model')} -> "
+            f"{EMBED_MODEL}); forcing a full rebuild."
+        )
+        args.full = True
+
+    # ---------- Rebuild DB cleanly (opt-in) ----------
+    # A checkpoint means a previous run crashed mid-way: resume it
+    # instead of throwing away what it already stored.
+    if args.full and CHECKPOINT_FILE.exists():
+        print(f"Found {CHECKPOINT_FILE}; resuming the interrupted run.")
+    elif args.full and DB_DIR.exists():
+        shutil.rmtree(DB_DIR)
+
+    DB_DIR.mkdir(parents=True, exist_ok=True)
+
+    vectorstore = open_store()
+
+    # ---------- Diff against what is indexed ----------
+    # The collection itself is the source of truth, so a run that crashed
+    # half-way simply picks up the chunks that were not written yet.
+    unseen_ids = set(vectorstore.get(include=[])["ids"])
+
+    # ---------- Stream, embed and write new / changed chunks ----------
+    # chunks.jsonl is read lazily: the scheduler pulls batches only as
+    # fast as it can embed them, so memory stays flat with corpus size.
+    counts = {"unchanged": 0, "added": 0}
+    manifest = ManifestWriter(MANIFEST_FILE)
+
+    scheduler = EmbeddingScheduler(
+        model=EMBED_MODEL,
+        write_batch=make_writer(vectorstore),
+        base_url=args.base_url,
+        max_concurrency=args.concurrency,
+        checkpoint_path=CHECKPOINT_FILE,
+    )
+    stats = scheduler.run(make_batches(
+        plan_chunks(iter_chunks(CHUNKS_FILE), unseen_ids, manifest, counts)
+    ))
+
+    print(
+        f"Embedded {stats.embedded} chunks in {stats.elapsed_sec:.1f}s "
+        f"({stats.rate_limited} rate limits, {stats.retries} retries, "
+        f"concurrency {stats.min_concurrency_seen}-{stats.max_concurrency_seen})"
+    )
+
+    # ---------- Delete stale chunks ----------
+    stale_ids = sorted(unseen_ids)
+    for start in range(0, len(stale_ids), BATCH_SIZE):
+        vectorstore.delete(ids=stale_ids[start:start + BATCH_SIZE])
+
+    manifest.close()
+    CHECKPOINT_FILE.unlink(missing_ok=True)
+
+    print("\n==== Index update ====")
+    print(f"Added:     {counts['added']}")
+    print(f"Unchanged: {counts['unchanged']}")
+    print(f"Deleted:   {len(stale_ids)}")
+    print("======================\n")
+
+    print(f"Vectorstore saved → {DB_DIR}")
+    print("Collection count:", vectorstore._collection.count())
+
+    # The BM25 index is rebuilt from the same chunks, so its ids match.
+    from scripts.build_lexical_index import INDEX_DIR, build
+
+    print(f"Lexical index saved → {INDEX_DIR} ({build()} chunks)")
+    print("Done.")
+
 
-print(f"Vectorstore saved → {DB_DIR}")
-print("Collection count:", vectorstore._collection.count())
-print("Done.")
+if __name__ == "__main__":
+    main()
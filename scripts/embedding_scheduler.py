@@ -0,0 +1,343 @@
+"""
+Concurrent, rate-limit-aware embedding scheduler for ingestion.
+
+Batches are sent to an OpenAI-compatible /embeddings endpoint by a pool
+of workers. Concurrency adapts to the provider (AIMD):
+
+- every 429 halves the concurrency limit and pauses all workers for the
+  server's retry-after (or an exponential backoff, capped at
+  max_backoff_sec)
+- a run of successful batches raises the limit by one again
+
+Finished batches are handed to a writer callback as soon as they land
+(e.g. a Chroma upsert) and recorded in a checkpoint file, so a crashed
+run can resume without re-embedding what was already stored.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import httpx
+
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+# -------------------------
+# Data
+# -------------------------
+@dataclass
+class EmbeddingBatch:
+    ids: List[str]
+    texts: List[str]
+    metadatas: List[Dict[str, Any]]
+
+
+@dataclass
+class SchedulerStats:
+    batches: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    rate_limited: int = 0
+    retries: int = 0
+    min_concurrency_seen: int = 0
+    max_concurrency_seen: int = 0
+    final_concurrency: int = 0
+    elapsed_sec: float = 0.0
+
+    def observe_concurrency(self, limit: int) -> None:
+        if not self.min_concurrency_seen or limit < self.min_concurrency_seen:
+            self.min_concurrency_seen = limit
+        self.max_concurrency_seen = max(self.max_concurrency_seen, limit)
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: Optional[float]) -> None:
+        super().__init__(f"rate limited (retry_after={retry_after})")
+        self.retry_after = retry_after
+
+
+class TransientError(Exception):
+    pass
+
+
+# -------------------------
+# Checkpoint
+# -------------------------
+def load_checkpoint(path: Path) -> Set[str]:
+    """Ids of every chunk a previous run already embedded and stored."""
+    done: Set[str] = set()
+
+    if not path.exists():
+        return done
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                done.update(json.loads(line)["ids"])
+            except (json.JSONDecodeError, KeyError):
+                # A torn last line from a crash; the batch is simply redone.
+                continue
+
+    return done
+
+
+def _append_checkpoint(path: Path, ids: List[str]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"ids": ids}) + "\n")
+
+
+# -------------------------
+# Adaptive concurrency
+# -------------------------
+class AdaptiveLimiter:
+    """AIMD concurrency limit shared by all workers."""
+
+    def __init__(
+        self,
+        initial: int,
+        maximum: int,
+        minimum: int = 1,
+        increase_after: int = 5,
+    ) -> None:
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase_after = increase_after
+
+        self._in_flight = 0
+        self._successes = 0
+        self._resume_at = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            while self._in_flight >= self.limit:
+                await self._cond.wait()
+            self._in_flight += 1
+
+        # Honour a global pause requested by a 429.
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self) -> None:
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    async def on_success(self) -> None:
+        async with self._cond:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    async def on_rate_limit(self, pause_sec: float) -> None:
+        async with self._cond:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+            self._resume_at = max(self._resume_at, time.monotonic() + pause_sec)
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    """Parse retry-after-ms / retry-after the way the OpenAI client does."""
+    retry_ms = resp.headers.get("retry-after-ms")
+    if retry_ms:
+        try:
+            return float(retry_ms) / 1000
+        except ValueError:
+            pass
+
+    retry = resp.headers.get("retry-after")
+    if retry:
+        try:
+            return float(retry)
+        except ValueError:
+            pass
+
+    return None
+
+
+# -------------------------
+# Scheduler
+# -------------------------
+class EmbeddingScheduler:
+
+    def __init__(
+        self,
+        model: str,
+        write_batch: Callable[[EmbeddingBatch, List[List[float]]], None],
+        base_url: str | None = None,
+        api_key: str | None = None,
+        max_concurrency: int = 8,
+        initial_concurrency: int = 4,
+        max_retries: int = 10,
+        timeout: float = 60.0,
+        max_backoff_sec: float = 30.0,
+        checkpoint_path: Path | None = None,
+    ) -> None:
+        self.model = model
+        self.write_batch = write_batch
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.max_concurrency = max_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_backoff_sec = max_backoff_sec
+        self.checkpoint_path = checkpoint_path
+
+        self.stats = SchedulerStats()
+
+    async def _embed(
+        self,
+        client: httpx.AsyncClient,
+        texts: List[str],
+    ) -> List[List[float]]:
+        try:
+            resp = await client.post(
+                f"{self.base_url}/embeddings",
+                json={"model": self.model, "input": texts},
+            )
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            raise TransientError(str(e)) from e
+
+        if resp.status_code == 429:
+            raise RateLimited(_retry_after(resp))
+
+        if resp.status_code >= 500:
+            raise TransientError(f"HTTP {resp.status_code}")
+
+        resp.raise_for_status()
+
+        data = sorted(resp.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    async def _process(
+        self,
+        client: httpx.AsyncClient,
+        limiter: AdaptiveLimiter,
+        write_lock: asyncio.Lock,
+        batch: EmbeddingBatch,
+    ) -> None:
+        for attempt in range(self.max_retries + 1):
+            error: Exception | None = None
+
+            await limiter.acquire()
+
+            try:
+                vectors = await self._embed(client, batch.texts)
+            except (RateLimited, TransientError) as e:
+                error = e
+            finally:
+                await limiter.release()
+                self.stats.observe_concurrency(limiter.limit)
+
+            if error is None:
+                await limiter.on_success()
+                break
+
+            if isinstance(error, RateLimited):
+                self.stats.rate_limited += 1
+                pause = error.retry_after if error.retry_after is not None else min(self.max_backoff_sec, 2 ** attempt)
+                await limiter.on_rate_limit(pause + random.uniform(0, 0.25))
+            else:
+                self.stats.retries += 1
+                await asyncio.sleep(min(self.max_backoff_sec, 2 ** attempt) * random.uniform(0.5, 1.0))
+
+        else:
+            raise RuntimeError(
+                f"Giving up on batch after {self.max_retries} retries "
+                f"(first id {batch.ids[0]})"
+            )
+
+        # The vector store is a single writer; write batches as they finish.
+        async with write_lock:
+            await asyncio.to_thread(self.write_batch, batch, vectors)
+
+            if self.checkpoint_path is not None:
+                await asyncio.to_thread(_append_checkpoint, self.checkpoint_path, batch.ids)
+
+        self.stats.batches += 1
+        self.stats.embedded += len(batch.ids)
+
+    async def arun(self, batches: Iterable[EmbeddingBatch]) -> SchedulerStats:
+        done = load_checkpoint(self.checkpoint_path) if self.checkpoint_path else set()
+
+        limiter = AdaptiveLimiter(
+            initial=self.initial_concurrency,
+            maximum=self.max_concurrency,
+        )
+        write_lock = asyncio.Lock()
+
+        # Bounded hand-off: at most a few batches wait beyond the ones in flight.
+        pending: "asyncio.Queue[Optional[EmbeddingBatch]]" = asyncio.Queue(
+            maxsize=self.max_concurrency * 2
+        )
+
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        start = time.perf_counter()
+
+        async with httpx.AsyncClient(
+            headers=headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_concurrency),
+        ) as client:
+
+            failures: List[BaseException] = []
+
+            async def worker() -> None:
+                while True:
+                    batch = await pending.get()
+                    if batch is None:
+                        return
+                    if failures:
+                        continue  # keep draining so the producer never blocks
+                    try:
+                        await self._process(client, limiter, write_lock, batch)
+                    except Exception as e:
+                        failures.append(e)
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+
+            try:
+                for batch in batches:
+                    if failures:
+                        break
+
+                    if done and all(doc_id in done for doc_id in batch.ids):
+                        self.stats.skipped += len(batch.ids)
+                        continue
+
+                    await pending.put(batch)
+
+                for _ in workers:
+                    await pending.put(None)
+
+                await asyncio.gather(*workers)
+
+            finally:
+                for task in workers:
+                    task.cancel()
+
+        if failures:
+            raise failures[0]
+
+        self.stats.final_concurrency = limiter.limit
+        self.stats.elapsed_sec = time.perf_counter() - start
+
+        return self.stats
+
+    def run(self, batches: Iterable[EmbeddingBatch]) -> SchedulerStats:
+        return asyncio.run(self.arun(batches))
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from langchain_chroma import Chroma
+
+from chromadb.config import Settings
+
+from apps.rag.numpy_store import export_collection
+
+# ---------- Paths ----------
+DB_DIR = Path("data/vectorstore/langchain_db")
+OUT_DIR = Path("data/vectorstore/langchain_numpy")
+
+
+def main():
+    vectorstore = Chroma(
+        persist_directory=str(DB_DIR),
+        client_settings=Settings(
+            anonymized_telemetry=False,
+            is_persistent=True
+        ),
+    )
+
+    print(f"Exporting {vectorstore._collection.count()} vectors from {DB_DIR}...")
+
+    count = export_collection(vectorstore._collection, OUT_DIR)
+
+    print(f"NumPy store saved → {OUT_DIR} ({count} rows)")
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()